@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile
+from .models import Profile, OutgoingEmail
 
 # ProfileAdmin enables the model Profile to be shown in the admin view.
 class ProfileAdmin(admin.ModelAdmin):
@@ -7,3 +7,12 @@ class ProfileAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Profile, ProfileAdmin)
+
+
+# OutgoingEmailAdmin shows the outbox, failed emails have a last_error.
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'recipients', 'created', 'attempts', 'sent', 'last_error']
+    list_filter = ['sent']
+
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -0,0 +1,83 @@
+"""
+    Typeahead lookup of users by the prefix of their email, full name or last name.
+
+    The Profile keeps normalized (lower case, accents removed) copies of the user's email and names in indexed columns.
+    Each column is searched with a range scan on its index, ordered by the index and limited, so the cost doesn't grow
+    with the number of users. On PostgreSQL, a trigram index also finds queries of 3+ characters inside emails.
+"""
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Searched in this order, the email matches come first.
+LOOKUP_COLUMNS = ('lookup_email', 'lookup_name', 'lookup_last_name')
+LOOKUP_FIELDS = ('user_id', 'user__email', 'user__first_name', 'user__last_name', 'user__is_staff')
+TRIGRAM_INDEX = 'account_profile_lookup_email_trgm'
+_trigram_available = {}
+
+
+def normalize(value, max_length=None):
+    """
+        'José  Ávila' -> 'jose avila'
+        Compatibility characters may decompose into several ('ﬀ' -> 'ff'), the result is cut to max_length.
+    """
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    stripped = ''.join(character for character in decomposed if not unicodedata.combining(character))
+    return ' '.join(stripped.lower().split())[:max_length]
+
+
+def has_trigram_index(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    if connection.alias not in _trigram_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [TRIGRAM_INDEX])
+            _trigram_available[connection.alias] = cursor.fetchone() is not None
+    return _trigram_available[connection.alias]
+
+
+def lookup_users(query, limit):
+    """
+        Finds up to limit users whose email, full name or last name start with query.
+        :return: A tuple of the users, dicts with their id, email, first_name, last_name and is_staff, and of the
+        time spent in each lookup in milliseconds, {column: ms}.
+    """
+    from account.models import Profile
+
+    needle = normalize(query)
+    users, timings = [], OrderedDict()
+    if not needle:
+        return users, timings
+
+    profiles = Profile.objects.all()
+    lookups = []
+    for column in LOOKUP_COLUMNS:
+        # The columns hold values cut to their length, a longer query is cut the same way to match them.
+        prefix = needle[:Profile.lookup_max_length(column)]
+        # The range lets SQLite use the index, the prefix match filters out what a collation may let into the range.
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        lookups.append((column, {column + '__gte': prefix, column + '__lt': upper, column + '__startswith': prefix}))
+    if len(needle) >= 3 and has_trigram_index(connections[profiles.db]):
+        lookups.append(('lookup_email_trigram', {'lookup_email__contains': needle}))
+
+    seen = set()
+    for name, lookup in lookups:
+        if len(users) >= limit:
+            break
+        start = time.perf_counter()
+        rows = list(profiles.filter(**lookup).order_by(name.replace('_trigram', ''))
+                    .values_list(*LOOKUP_FIELDS)[:limit])
+        timings[name] = (time.perf_counter() - start) * 1000
+        logger.debug("User lookup %r on %s: %d rows in %.2f ms", needle, name, len(rows), timings[name])
+
+        for user_id, email, first_name, last_name, is_staff in rows:
+            if user_id not in seen and len(users) < limit:
+                seen.add(user_id)
+                users.append({'id': user_id, 'email': email, 'first_name': first_name, 'last_name': last_name,
+                              'is_staff': is_staff})
+    return users, timings
@@ -2,7 +2,25 @@
 This file will implement useful methods for sending emails from withing this package.
 """
 from acrevista.settings import EMAIL_NOREPLY, BASE_URL, SITE_NAME
-from django.core.mail import send_mail
+
+from account.models import OutgoingEmail
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """
+    Puts an email in the outbox, it will be sent by the send_queued_mail command. The email is saved in the current
+    transaction so it's only sent if the change that triggered it is committed.
+    :param subject: The subject of the email.
+    :param message: The body of the email.
+    :param from_email: The sender's email address.
+    :param recipient_list: The email addresses of the recipients.
+    :return: The OutgoingEmail or None if there are no recipients.
+    """
+    recipients = [recipient for recipient in recipient_list if recipient]
+    if not recipients:
+        return None
+    return OutgoingEmail.objects.create(subject=subject, message=message, from_email=from_email,
+                                        recipients='\n'.join(recipients))
 
 
 def send_review_invitation_email(recipient, a_url, d_url):
@@ -29,7 +47,7 @@ def send_review_invitation_email(recipient, a_url, d_url):
     The {site_name} team!
 
     '''.format(site_name=SITE_NAME, baseUrl=BASE_URL, accept_url=a_url, decline_url=d_url)
-    send_mail(subject, message, EMAIL_NOREPLY, (recipient,), fail_silently=False)
+    queue_mail(subject, message, EMAIL_NOREPLY, (recipient,))
 
 
 def send_token_email(recipient, token):
@@ -51,4 +69,4 @@ def send_token_email(recipient, token):
     The {site_name} team!
     
     '''.format(site_name=SITE_NAME, url=url)
-    send_mail(subject, message, EMAIL_NOREPLY, (recipient,), fail_silently=False)
+    queue_mail(subject, message, EMAIL_NOREPLY, (recipient,))
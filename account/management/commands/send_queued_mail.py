@@ -0,0 +1,90 @@
+"""
+    Sends the emails waiting in the outbox.
+"""
+import datetime
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from account.models import OutgoingEmail
+
+# While an email is being sent no other worker can claim it.
+LEASE = datetime.timedelta(minutes=5)
+
+
+class Command(BaseCommand):
+    help = "Sends the queued emails over a single mail server connection, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', default=False,
+                            help="Send the emails that are due and exit instead of polling the outbox.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Emails claimed per batch.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to wait when the outbox is empty.")
+        parser.add_argument('--max-attempts', type=int, default=8, help="Give up on an email after this many tries.")
+        parser.add_argument('--backoff', type=float, default=30,
+                            help="Seconds before the first retry, doubled after each failed attempt.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        connection = get_connection()
+        try:
+            while True:
+                sent = self.drain(connection)
+                if options['once']:
+                    self.stdout.write("Sent {} emails.".format(sent))
+                    return
+                time.sleep(options['interval'])
+        finally:
+            connection.close()
+
+    def drain(self, connection):
+        """
+            Sends every due email, batch after batch, over the connection.
+            :return: The number of sent emails.
+        """
+        sent = 0
+        batch = self.claim()
+        while batch:
+            connection.open()
+            for email in batch:
+                sent += self.send(connection, email)
+            batch = self.claim()
+        return sent
+
+    def claim(self):
+        """
+            Claims a batch of due emails by moving their next attempt after the lease. The update is conditional on
+            the next attempt it read so two workers never claim the same email.
+        """
+        now = timezone.now()
+        due = OutgoingEmail.objects.filter(sent__isnull=True, next_attempt__lte=now,
+                                           attempts__lt=self.options['max_attempts'])
+        claimed = []
+        for email in due[:self.options['batch_size']]:
+            if OutgoingEmail.objects.filter(pk=email.pk, next_attempt=email.next_attempt).update(
+                    next_attempt=now + LEASE):
+                claimed.append(email)
+        return claimed
+
+    def send(self, connection, email):
+        message = EmailMessage(email.subject, email.message, email.from_email, email.recipient_list(),
+                               connection=connection)
+        try:
+            message.send()
+        except Exception as error:
+            email.attempts += 1
+            delay = self.options['backoff'] * 2 ** (email.attempts - 1)
+            email.next_attempt = timezone.now() + datetime.timedelta(seconds=delay)
+            email.last_error = "{}: {}".format(type(error).__name__, error)
+            email.save(update_fields=('attempts', 'next_attempt', 'last_error'))
+            self.stderr.write("Couldn't send email {}: {}".format(email.pk, email.last_error))
+            # The connection may be broken, the next batch opens a new one.
+            connection.close()
+            return 0
+
+        email.attempts += 1
+        email.sent = timezone.now()
+        email.save(update_fields=('attempts', 'sent'))
+        return 1
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models, transaction
+
+from account.lookup import TRIGRAM_INDEX, normalize
+
+
+def fill_lookup_fields(apps, schema_editor):
+    Profile = apps.get_model('account', 'Profile')
+    profiles = Profile.objects.select_related('user').only('user__email', 'user__first_name', 'user__last_name')
+    max_length = {column: Profile._meta.get_field(column).max_length
+                  for column in ('lookup_email', 'lookup_name', 'lookup_last_name')}
+    for profile in profiles.iterator():
+        user = profile.user
+        Profile.objects.filter(pk=profile.pk).update(
+            lookup_email=normalize(user.email, max_length['lookup_email']),
+            lookup_name=normalize('{} {}'.format(user.first_name, user.last_name), max_length['lookup_name']),
+            lookup_last_name=normalize(user.last_name, max_length['lookup_last_name']))
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            schema_editor.execute("CREATE INDEX {} ON account_profile USING gin (lookup_email gin_trgm_ops)".format(
+                TRIGRAM_INDEX))
+    except Exception:
+        # pg_trgm needs a privileged user, the lookup works on prefixes only without it.
+        pass
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS {}".format(TRIGRAM_INDEX))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='lookup_email',
+            field=models.CharField(db_index=True, default='', max_length=254),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='lookup_last_name',
+            field=models.CharField(db_index=True, default='', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='lookup_name',
+            field=models.CharField(db_index=True, default='', max_length=61),
+        ),
+        migrations.RunPython(fill_lookup_fields, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
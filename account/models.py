@@ -1,7 +1,11 @@
 from django.db import models
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
+from django.utils import timezone
+
+from account.lookup import normalize
+from account.principal import forget_principals
 
 
 # The Profile class extends Django's default user model.
@@ -220,6 +224,20 @@ class Profile(models.Model):
     phone = models.CharField(max_length=64, default='')
     country = models.CharField(max_length=64, choices=COUNTRY_CHOICES, default='Romania')
     affiliation = models.CharField(max_length=64, default='')
+    # Normalized copies of the user's email and names for the typeahead lookup, see account.lookup.
+    lookup_email = models.CharField(max_length=254, default='', db_index=True)
+    lookup_name = models.CharField(max_length=61, default='', db_index=True)
+    lookup_last_name = models.CharField(max_length=30, default='', db_index=True)
+
+    def set_lookup_fields(self, user):
+        self.lookup_email = normalize(user.email, self.lookup_max_length('lookup_email'))
+        self.lookup_name = normalize('{} {}'.format(user.first_name, user.last_name),
+                                     self.lookup_max_length('lookup_name'))
+        self.lookup_last_name = normalize(user.last_name, self.lookup_max_length('lookup_last_name'))
+
+    @classmethod
+    def lookup_max_length(cls, column):
+        return cls._meta.get_field(column).max_length
 
     def __srt__(self):
         return "Profile of user: {}".format(self.user.username)
@@ -231,4 +249,79 @@ def create_profile(sender, instance, created, **kwargs):
         Ensure that every new user gets a profile.
     """
     if created:
-        Profile.objects.create(user=instance)
\ No newline at end of file
+        profile = Profile(user=instance)
+        profile.set_lookup_fields(instance)
+        profile.save()
+
+
+def loaded_values(instance, fields):
+    """
+        Returns the values of fields as loaded in instance, for the signals that act on changed fields. Deferred
+        fields are read from __dict__ so they aren't loaded, their unknown values are None and count as a change.
+    """
+    return tuple(instance.__dict__.get(field) for field in fields)
+
+
+def lookup_values(user):
+    return loaded_values(user, ('email', 'first_name', 'last_name'))
+
+
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+def profile_lookup_loaded(sender, instance, **kwargs):
+    instance._lookup_values = lookup_values(instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def profile_lookup_changed(sender, instance, created, raw, **kwargs):
+    """
+        Keep the lookup fields of the profile in sync with the user's email and names.
+    """
+    values = lookup_values(instance)
+    changed = not (created or raw) and values != getattr(instance, '_lookup_values', None)
+    instance._lookup_values = values
+    if changed:
+        profile = Profile()
+        profile.set_lookup_fields(instance)
+        Profile.objects.filter(user=instance).update(lookup_email=profile.lookup_email, lookup_name=profile.lookup_name,
+                                                     lookup_last_name=profile.lookup_last_name)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def principal_user_changed(sender, instance, **kwargs):
+    """
+        Forget the cached principals of a changed or deleted user, see account.principal.
+    """
+    if not kwargs.get('created'):
+        forget_principals([instance.pk])
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def principal_profile_changed(sender, instance, **kwargs):
+    forget_principals([instance.user_id])
+
+
+class OutgoingEmail(models.Model):
+    """
+    An email waiting in the outbox. Emails are written in the same transaction as the change that triggers them
+    and are sent later by the send_queued_mail command, so requests don't wait for the mail server.
+    """
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField(help_text="One email address per line.")
+    created = models.DateTimeField(auto_now_add=True)
+    next_attempt = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent = models.DateTimeField(blank=True, null=True, default=None, db_index=True)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ('next_attempt',)
+
+    def recipient_list(self):
+        return self.recipients.split('\n')
+
+    def __str__(self):
+        return "{} to {}".format(self.subject, ', '.join(self.recipient_list()))
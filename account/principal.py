@@ -0,0 +1,115 @@
+"""
+    A short lived cache of the authenticated users and of their roles in the journal, so authenticating an API request
+    and checking its permissions doesn't need queries.
+
+    An entry is keyed by the user id and the issue time of their token. It holds the user's fields, the pk of their
+    profile, whether they edit a paper under review and the papers they review. Changes to a user, their profile, the
+    editor or status of a paper or its reviewers give the user a new version, which makes their entries stale in every
+    process that shares the cache.
+"""
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+# A deactivated user or a removed role is forgotten at once by the processes that share the cache with the one that
+# changed it, see CACHES in the settings. The others authenticate the old principal until its entry expires.
+PRINCIPAL_CACHE_TIMEOUT = 60
+# The fields of the cached User, in the order of the model as from_db expects. The password is deferred, it's only
+# loaded by the views that check it.
+PRINCIPAL_USER_FIELDS = ('id', 'last_login', 'is_superuser', 'username', 'first_name', 'last_name', 'email',
+                         'is_staff', 'is_active', 'date_joined')
+
+
+def principal_key(user_id, issued_at):
+    return 'account:principal:{}:{}'.format(user_id, issued_at)
+
+
+def principal_version_key(user_id):
+    return 'account:principal-version:{}'.format(user_id)
+
+
+class Principal(object):
+    """
+        An authenticated user and a summary of their roles:
+            - edits_under_review: Whether they edit a paper that is under review.
+            - reviewing: The pks of the papers they review.
+    """
+
+    def __init__(self, user_values, profile_pk, edits_under_review, reviewing, version=None):
+        self.user_values = user_values
+        self.profile_pk = profile_pk
+        self.edits_under_review = edits_under_review
+        self.reviewing = frozenset(reviewing)
+        self.version = version
+
+    def user(self):
+        """
+            Returns the User, attached to this principal.
+        """
+        user = User.from_db(User.objects.db, PRINCIPAL_USER_FIELDS, self.user_values)
+        user.principal = self
+        return user
+
+
+def load_principal(user_id):
+    """
+        Reads the principal of the user from the database, returns None if the user doesn't exist.
+    """
+    from journal.models import Paper
+
+    edits_under_review = 'EXISTS (SELECT 1 FROM {} WHERE editor_id = {}.id AND status = %s)'.format(
+        Paper._meta.db_table, User._meta.db_table)
+    row = User.objects.filter(pk=user_id)\
+        .extra(select={'edits_under_review': edits_under_review}, select_params=[Paper.STATUS_CHOICES[1][0]])\
+        .values_list(*PRINCIPAL_USER_FIELDS + ('profile', 'edits_under_review')).first()
+    if row is None:
+        return None
+
+    reviewing = Paper.reviewers.through.objects.filter(user_id=user_id).values_list('paper_id', flat=True)
+    return Principal(row[:-2], row[-2], bool(row[-1]), list(reviewing))
+
+
+def get_principal(user_id, issued_at):
+    """
+        Returns the cached principal of the user for a token issued at issued_at, None if the user doesn't exist.
+    """
+    key, version_key = principal_key(user_id, issued_at), principal_version_key(user_id)
+    cached = cache.get_many([key, version_key])
+    version = cached.get(version_key)
+    principal = cached.get(key)
+    if principal is None or principal.version != version:
+        principal = load_principal(user_id)
+        if principal is not None:
+            principal.version = version
+            cache.set(key, principal, PRINCIPAL_CACHE_TIMEOUT)
+    return principal
+
+
+def principal_of(user):
+    """
+        Returns the principal of an authenticated user. The users that weren't authenticated with a token, through
+        the session for example, have theirs read from the database once per request.
+    """
+    if getattr(user, 'principal', None) is None:
+        user.principal = load_principal(user.pk)
+    return user.principal
+
+
+def forget_principals(user_ids):
+    """
+        Makes the cached principals of the users stale.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+
+    def new_versions():
+        # An entry outlives the version it was stored with by at most the timeout, a missing version never matches.
+        cache.set_many({principal_version_key(user_id): uuid.uuid4().hex for user_id in user_ids},
+                       PRINCIPAL_CACHE_TIMEOUT)
+
+    new_versions()
+    # A request may have cached the old roles before the change was committed.
+    transaction.on_commit(new_versions)
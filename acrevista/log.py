@@ -0,0 +1,192 @@
+"""
+    Logging that doesn't block the requests: the loggers hand their records to a QueueHandler and a QueueListener
+    thread writes them, as JSON lines with the id, user and route of the request that logged them.
+
+    The request context is read by RequestContextFilter when the record is logged, in the thread that logs it. The
+    queue is bounded, when the writer falls behind the records that don't fit are dropped, counted and reported in the
+    log once there's room again, instead of blocking the requests.
+
+    Every process, the gunicorn workers and the management commands, appends to the same file, which is rotated by an
+    external tool such as logrotate. WatchedFileHandler reopens it once it was moved.
+"""
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import uuid
+
+from django.utils.functional import empty
+from django.utils.module_loading import import_string
+
+LOG_QUEUE_SIZE = 10000
+REQUEST_ID_HEADER = 'HTTP_X_REQUEST_ID'
+REQUEST_ID_RE = re.compile(r'^[\w.-]{1,64}$')
+
+local = threading.local()
+
+
+def build_handler(config):
+    """
+        Builds a handler from a dict with its class, level, formatter class and the arguments of the class.
+    """
+    config = dict(config)
+    handler_class = import_string(config.pop('class'))
+    formatter = config.pop('formatter', None)
+    level = config.pop('level', logging.NOTSET)
+    handler = handler_class(**config)
+    handler.setLevel(level)
+    if formatter:
+        handler.setFormatter(import_string(formatter)())
+    return handler
+
+
+class QueueListener(logging.handlers.QueueListener):
+    """
+        Waits for room on a full queue to stop, instead of failing.
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+        Puts the records on a queue written by a QueueListener thread to handlers, a list of handler configs as read
+        by build_handler. Use it in LOGGING with the '()' key.
+
+        The queue, the listener and its handlers are made by the first record logged in a process. A process forked
+        after the settings were loaded, by gunicorn --preload for instance, makes its own instead of using a copy of
+        a listener thread that doesn't run in it.
+    """
+
+    def __init__(self, handlers, queue_size=LOG_QUEUE_SIZE):
+        super(QueueHandler, self).__init__(None)
+        self.handler_configs = handlers
+        self.queue_size = queue_size
+        self.listener = None
+        self.pid = None
+        self.dropped = self.reported = 0
+        self.start_lock = threading.Lock()
+        # Write what's left on the queue when the process exits.
+        atexit.register(self.close)
+
+    def start(self):
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.queue_size)
+            self.dropped = self.reported = 0
+            self.listener = QueueListener(
+                self.queue, *[build_handler(handler) for handler in self.handler_configs], respect_handler_level=True)
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def prepare(self, record):
+        # The arguments are merged in now, they may change once logged. The traceback is formatted by the listener.
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped > self.reported:
+            self.report_dropped()
+
+    def report_dropped(self):
+        """
+            Logs how many records were dropped since the last report, if there's room on the queue.
+        """
+        dropped = self.dropped - self.reported
+        warning = logging.makeLogRecord({
+            'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+            'msg': '{} log records were dropped, the log queue was full.'.format(dropped)})
+        try:
+            self.queue.put_nowait(warning)
+        except queue.Full:
+            return
+        self.reported += dropped
+
+    def close(self):
+        # The listener of the process this one was forked from doesn't run here.
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+        self.listener = None
+        self.pid = None
+        super(QueueHandler, self).close()
+
+
+def current_request():
+    return getattr(local, 'request', None)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+        Adds the request_id, user_id and route of the current request to the records, None outside of requests.
+    """
+
+    def filter(self, record):
+        request = current_request()
+        record.request_id = record.user_id = record.route = None
+        if request is not None:
+            record.request_id = getattr(request, 'request_id', None)
+            # Only a user that was already loaded, logging mustn't run queries.
+            user = request.__dict__.get('user')
+            if user is not None and getattr(user, '_wrapped', None) is not empty:
+                record.user_id = user.pk
+            match = getattr(request, 'resolver_match', None)
+            if match is not None:
+                record.route = match.url_name or match.view_name
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """
+        Formats a record as a JSON object on one line.
+    """
+    FIELDS = ('request_id', 'user_id', 'route')
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in self.FIELDS:
+            entry[field] = getattr(record, field, None)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestLogMiddleware(object):
+    """
+        Makes the current request available to the logging filter and gives it an id, the X-Request-ID header of the
+        request when it has a valid one, which is sent back in the X-Request-ID header of the response.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.META.get(REQUEST_ID_HEADER, '')
+        request.request_id = request_id if REQUEST_ID_RE.match(request_id) else uuid.uuid4().hex
+        local.request = request
+        try:
+            response = self.get_response(request)
+        finally:
+            local.request = None
+        response['X-Request-ID'] = request.request_id
+        return response
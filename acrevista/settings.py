@@ -45,31 +45,50 @@ ALLOWED_HOSTS = ['*']
 
 
 # Logging
+# The loggers hand their records to a queue, a background thread writes them to mysite.log as JSON lines with the id,
+# user and route of the request, see acrevista/log.py. Every process appends to the file, rotate it with logrotate
+# without copytruncate, the processes reopen it once it was moved.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': "[%(asctime)s] %(levelname)s [%(name)s:%(lineno)s] %(message)s",
-            'datefmt': "%d/%b/%Y %H:%M:%S"
-        },
-        'simple': {
-            'format': '%(levelname)s %(message)s'
+    'filters': {
+        'request': {
+            '()': 'acrevista.log.RequestContextFilter',
         },
     },
     'handlers': {
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': 'mysite.log',
-            'formatter': 'verbose'
+        'queue': {
+            '()': 'acrevista.log.QueueHandler',
+            'filters': ['request'],
+            'handlers': [{
+                'class': 'logging.handlers.WatchedFileHandler',
+                'filename': 'mysite.log',
+                'encoding': 'utf-8',
+                'formatter': 'acrevista.log.JSONFormatter',
+            }],
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['file'],
-            'propagate': True,
-            'level': 'DEBUG',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+        },
+        # Every query is logged at DEBUG when DEBUG is on.
+        'django.db.backends': {
+            'level': os.environ.get('LOG_LEVEL_SQL', 'INFO'),
+        },
+        'account': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+        },
+        'journal': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+        },
+        'api': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
         },
     }
 }
@@ -83,6 +102,9 @@ LOGGING = {
 # SERVER_EMAIL = EMAIL_HOST_USER
 
 # Email Configuration for testing
+# Emails are queued in the outbox and sent by: python manage.py send_queued_mail
+# To see them go through SMTP locally, run: python -m smtpd -n -c DebuggingServer localhost:1025
+# and use the SMTP backend with EMAIL_HOST = 'localhost' and EMAIL_PORT = 1025.
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 # The email address from where to no-reply emails are sent.
@@ -114,6 +136,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',  # First, so it times the whole request.
+    'acrevista.log.RequestLogMiddleware',
+    'api.profiling.SQLProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -131,7 +156,7 @@ MIDDLEWARE = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         # 'rest_framework.authentication.TokenAuthentication', # We'll use JWT because it's the new standard..
-        'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
+        'api.authentication.CachedJSONWebTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -139,14 +164,21 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.BasicAuthentication',
     ),
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
+# The hard limit for the page_size query parameter of the paginated endpoints.
+API_MAX_PAGE_SIZE = 200
+# Maximum number of users returned by the typeahead user lookup.
+USER_LOOKUP_LIMIT = 20
+
 CORS_ORIGIN_ALLOW_ALL = True
 
 JWT_AUTH = {
     'JWT_EXPIRATION_DELTA': datetime.timedelta(days=1),
     'JWT_RESPONSE_PAYLOAD_HANDLER': 'api.account.jwt_response_payload_handler',
-    # 'JWT_PAYLOAD_HANDLER': 'api.payload_handler.jwt_payload_handler',
+    'JWT_PAYLOAD_HANDLER': 'api.account.jwt_payload_handler',
 }
 
 TEMPLATES = [
@@ -247,3 +279,41 @@ STATICFILES_STORAGE = 'whitenoise.django.GzipManifestStaticFilesStorage'
 # Media root for uploads:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'uploads/')
+# Serves MEDIA_ROOT at MEDIA_URL without permission checks, for local development only. The files of the papers and
+# reviews are downloaded through the API, which checks who can see them.
+SERVE_MEDIA = os.environ.get('SERVE_MEDIA') == '1'
+
+# The cached principals (account.principal) and staff emails (journal.mail) are forgotten by the process that changes
+# a user, a paper or its reviewers. With the default per process cache the other gunicorn workers keep using them until
+# they expire, for up to 60 seconds: a deactivated user or a removed editor or reviewer keeps their access there. Set
+# CACHE_DIR to a directory shared by the workers so they see the changes at once.
+CACHE_DIR = os.environ.get('CACHE_DIR')
+if CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+        }
+    }
+
+# Request metrics, served at /metrics in the Prometheus text format. Set METRICS_DIR to a directory shared by the
+# gunicorn workers, and emptied when the server starts, to report them as one. The workers write their metrics there
+# at most every METRICS_FLUSH_INTERVAL seconds.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+# Besides staff, the addresses that can read /metrics without a token, when the request didn't go through a proxy.
+METRICS_ALLOWED_ADDRESSES = ('127.0.0.1', '::1')
+
+# Profiling of the SQL queries of a sample of the requests, the ones with more than SQL_PROFILING_MAX_QUERIES queries
+# or SQL_PROFILING_MAX_SECONDS in queries are logged to api.profiling with their worst statements and where they run.
+SQL_PROFILING = os.environ.get('SQL_PROFILING') == '1'
+SQL_PROFILING_SAMPLE_RATE = 0.01
+SQL_PROFILING_MAX_QUERIES = 20
+SQL_PROFILING_MAX_SECONDS = 0.2
+
+# How the paper and review file downloads are sent: None streams them from Django, 'x-accel-redirect' hands them
+# to nginx and 'x-sendfile' to Apache or lighttpd.
+PAPER_FILES_SENDFILE = None
+# The internal nginx location that aliases MEDIA_ROOT, used with x-accel-redirect:
+# location /protected-media/ { internal; alias /path/to/uploads/; }
+PAPER_FILES_ACCEL_PREFIX = '/protected-media/'
@@ -16,6 +16,8 @@ Including another URLconf
 from django.conf.urls import url, include
 from django.contrib import admin
 from django.views.static import serve
+
+from api.metrics import MetricsView
 from . import settings
 
 
@@ -23,6 +25,10 @@ handler404 = 'account.views.custom_404'
 urlpatterns = [
     url(r'^admin/', admin.site.urls),
     url(r'^api/', include('api.urls', namespace='api', app_name='api')),
-    # Not suitable for production. https://docs.djangoproject.com/en/dev/howto/static-files/deployment/
-    url(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT, 'show_indexes': True})
+    url(r'^metrics$', MetricsView.as_view(), name='metrics'),
 ]
+
+if settings.SERVE_MEDIA:
+    # Not suitable for production, there are no permission checks. Papers and reviews files are downloaded through
+    # the API. https://docs.djangoproject.com/en/dev/howto/static-files/deployment/
+    urlpatterns.append(url(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}))
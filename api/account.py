@@ -2,20 +2,32 @@
     This file will handle API functionality related to user Accounts.
 """
 import datetime
+from calendar import timegm
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from rest_framework import serializers, status, permissions
 from rest_framework.generics import UpdateAPIView, ListAPIView
 from rest_framework.response import Response
 from rest_framework.validators import UniqueValidator
 from rest_framework.views import APIView
-from rest_framework_jwt import authentication
+from rest_framework_jwt.utils import jwt_payload_handler as default_jwt_payload_handler
 
+from account.lookup import lookup_users
 from account.models import Profile
-from acrevista import settings
+from api.authentication import CachedJSONWebTokenAuthentication
 from api.permissions import PublicEndpoint, UserIsEditorInActivePaper
 
 
+def jwt_payload_handler(user):
+    """ Custom payload handler.
+    Adds the time the token was issued at, the authenticated users are cached per token, see account.principal.
+    """
+    payload = default_jwt_payload_handler(user)
+    payload['iat'] = timegm(datetime.datetime.utcnow().utctimetuple())
+    return payload
+
+
 def jwt_response_payload_handler(token, user=None, request=None):
     """ Custom response payload handler.
     This function controls the custom payload after login or token refresh. This data is returned through the web API.
@@ -85,7 +97,7 @@ class TestPermissionsView(APIView):
     test whether an user can access a protected endpoint.
     """
 
-    authentication_classes = (authentication.JSONWebTokenAuthentication,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     @classmethod
@@ -111,7 +123,8 @@ class ChangePasswordView(UpdateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self, queryset=None):
-        obj = self.request.user
+        # The authenticated user may come from the principal cache, changes are made to a fresh copy.
+        obj = User.objects.get(pk=self.request.user.pk)
         return obj
 
     def update(self, request, *args, **kwargs):
@@ -150,7 +163,8 @@ class ChangeNameView(UpdateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self, queryset=None):
-        obj = self.request.user
+        # The authenticated user may come from the principal cache, changes are made to a fresh copy.
+        obj = User.objects.get(pk=self.request.user.pk)
         return obj
 
     def update(self, request, *args, **kwargs):
@@ -166,19 +180,18 @@ class ChangeNameView(UpdateAPIView):
 
 class UserListView(ListAPIView):
     """
-        Ensure that list of users that have email address likely similar to the 'email' query param.
-        A json object containing many UserSerializer data is returned.
+        Typeahead lookup of the users whose email, full name or last name start with the 'email' (or 'q') query param,
+        used by editors to pick reviewers. At most USER_LOOKUP_LIMIT users are returned with their id, email, names
+        and staff status. The time spent in each lookup is reported in the Server-Timing header.
     """
-    model = User
-    serializer_class = UserSerializer
     permission_classes = (permissions.IsAuthenticated, UserIsEditorInActivePaper)
-    queryset = User.objects.all()
 
     def get(self, request, *args, **kwargs):
-        email = request.GET.get('email')
-        if email:
-            users = self.queryset.filter(email__contains=email)
-            serializer = self.serializer_class(users, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+        query = request.GET.get('email') or request.GET.get('q')
+        if query:
+            users, timings = lookup_users(query, settings.USER_LOOKUP_LIMIT)
+            response = Response(users, status=status.HTTP_200_OK)
+            response['Server-Timing'] = ', '.join('{};dur={:.2f}'.format(name, ms) for name, ms in timings.items())
+            return response
 
         return Response({"details": "The GET param email is missing!"}, status=status.HTTP_400_BAD_REQUEST)
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from api.metrics import instrument_connection
+        # Connected here so the connections opened before the first request are instrumented too.
+        connection_created.connect(instrument_connection, dispatch_uid='api.metrics.instrument_connection')
@@ -0,0 +1,79 @@
+"""
+    This file serves the choice lists of the models. They're fixed when the code is loaded, so each one is rendered
+    and compressed once and served as bytes, without going through the Rest Framework's negotiation and rendering.
+"""
+import gzip
+import hashlib
+import io
+import json
+import re
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+
+from account.models import Profile
+from journal.models import Paper, Review
+
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+# The choices only change with a deploy, clients revalidate daily with the ETag.
+CHOICES_MAX_AGE = 24 * 60 * 60
+
+
+def gzip_bytes(data):
+    # mtime=0 keeps the output identical between processes and deploys.
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as compressed:
+        compressed.write(data)
+    return buffer.getvalue()
+
+
+class PrecomputedJSONView(object):
+    """
+        A view that always returns the same JSON document. The identity and gzip encodings are rendered when the view
+        is created, each with its own strong ETag.
+    """
+
+    def __init__(self, data):
+        self.body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.gzipped = gzip_bytes(self.body)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+    def __call__(self, request):
+        gzipped = bool(ACCEPTS_GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        etag = self.etag + '-gzip' if gzipped else self.etag
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(self.gzipped if gzipped else self.body, content_type='application/json')
+            if gzipped:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = quote_etag(etag)
+        response['Cache-Control'] = 'public, max-age={}'.format(CHOICES_MAX_AGE)
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+    def as_view(self):
+        return require_safe(self)
+
+
+def choice_values(choices):
+    """
+        ( ('Romania', 'Romania'), ...) -> ['Romania', ...], in the order of the model.
+    """
+    return [choice[0] for choice in choices]
+
+
+def choice_labels(choices):
+    """
+        ( ('0', 'Consider after Major Changes.'), ...) -> [{'value': '0', 'label': 'Consider after...'}, ...]
+    """
+    return [{'value': value, 'label': label} for value, label in choices]
+
+
+valid_titles = PrecomputedJSONView(choice_values(Profile.TITLE_CHOICES)).as_view()
+valid_countries = PrecomputedJSONView(choice_values(Profile.COUNTRY_CHOICES)).as_view()
+valid_paper_statuses = PrecomputedJSONView(choice_labels(Paper.STATUS_CHOICES)).as_view()
+valid_review_appropriate = PrecomputedJSONView(choice_labels(Review.APPROPRIATE_CHOICES)).as_view()
+valid_review_recommendations = PrecomputedJSONView(choice_labels(Review.RECOMMENDATION_CHOICES)).as_view()
@@ -0,0 +1,66 @@
+"""
+    Conditional GET support for the paper endpoints, unchanged resources are answered with 304 Not Modified
+    before anything is serialized.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+
+def make_etag(*parts):
+    return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+
+
+def not_modified(request, etag):
+    """
+        :return: A 304 response if the client already has the representation identified by etag, None otherwise.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_validators(response, etag)
+    return response
+
+
+def set_validators(response, etag):
+    response['ETag'] = quote_etag(etag)
+    # Clients should revalidate every time, the responses depend on the user.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class ConditionalListMixin(object):
+    """
+        Lists whose model has an updated timestamp. The ETag is derived from the number of rows and the newest updated
+        timestamp of the queryset, one aggregate query, along with the user and the query string so each page and
+        page size get their own. Lists that depend on more than their rows override list_stamp.
+    """
+
+    def list_stamp(self):
+        """
+            Returns the values the ETag is derived from, besides the user and the query string.
+        """
+        stamp = self.get_queryset().aggregate(count=Count('pk'), updated=Max('updated'))
+        return stamp['count'], stamp['updated']
+
+    def list(self, request, *args, **kwargs):
+        etag = make_etag(request.user.pk, request.get_full_path(), *self.list_stamp())
+        return not_modified(request, etag) or \
+            set_validators(super(ConditionalListMixin, self).list(request, *args, **kwargs), etag)
+
+
+class ConditionalRetrieveMixin(object):
+    """
+        Details of a model with an updated timestamp, the ETag is derived from it with a single column query.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        updated = self.get_queryset().filter(**lookup).values_list('updated', flat=True).first()
+        if updated is None:  # Let the view answer with 404.
+            return super(ConditionalRetrieveMixin, self).retrieve(request, *args, **kwargs)
+
+        etag = make_etag(request.user.pk, request.get_full_path(), updated)
+        return not_modified(request, etag) or \
+            set_validators(super(ConditionalRetrieveMixin, self).retrieve(request, *args, **kwargs), etag)
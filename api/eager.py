@@ -0,0 +1,88 @@
+"""
+    This file derives the select_related/prefetch_related calls needed by a serializer from its declared fields.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+
+# Plans are computed once per (serializer, model) pair, serializer fields don't change at runtime.
+# Prefetch objects are built on every call because Django mutates them when they're nested.
+_PLANS = {}
+
+
+def _related_field(model, source):
+    """
+        Returns the model field for source if it's a relation, None otherwise.
+    """
+    try:
+        field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+
+def _plan(serializer_class, model, prefix=''):
+    """
+        Walks the serializer fields and returns a tuple (select_related, prefetch_related).
+        Forward foreign keys and one to one fields are joined, everything that returns many rows is prefetched
+        with a queryset that is eager loaded using the nested serializer. The entries of prefetch_related are
+        (lookup, model, serializer_class) tuples, serializer_class is None for plain primary key relations.
+    """
+    select, prefetch = [], []
+    for field in serializer_class().fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+
+        relation = _related_field(model, field.source)
+        if relation is None:
+            continue
+
+        lookup = prefix + field.source
+        related_model = relation.related_model
+        if isinstance(field, serializers.ListSerializer):
+            prefetch.append((lookup, related_model, field.child.__class__))
+        elif isinstance(field, ManyRelatedField):
+            prefetch.append((lookup, related_model, None))
+        elif isinstance(field, serializers.BaseSerializer) and not (relation.many_to_many or relation.one_to_many):
+            select.append(lookup)
+            nested_select, nested_prefetch = _plan(field.__class__, related_model, lookup + '__')
+            select += nested_select
+            prefetch += nested_prefetch
+    return select, prefetch
+
+
+def eager_load(queryset, serializer_class):
+    """
+        Ensure that serializing the queryset with serializer_class runs a constant number of queries.
+        :param queryset: The queryset that will be serialized.
+        :param serializer_class: The serializer used on each object of the queryset.
+        :return: The queryset with the needed select_related and prefetch_related calls.
+    """
+    key = (serializer_class, queryset.model)
+    if key not in _PLANS:
+        _PLANS[key] = _plan(serializer_class, queryset.model)
+
+    select, prefetch = _PLANS[key]
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        lookups = []
+        for lookup, model, nested_serializer_class in prefetch:
+            if nested_serializer_class is None:
+                lookups.append(lookup)
+            else:
+                nested = eager_load(model._default_manager.all(), nested_serializer_class)
+                lookups.append(Prefetch(lookup, queryset=nested))
+        queryset = queryset.prefetch_related(*lookups)
+    return queryset
+
+
+class EagerLoadingMixin(object):
+    """
+        Generic view mixin that eager loads the view's queryset based on the view's serializer.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super(EagerLoadingMixin, self).filter_queryset(queryset)
+        return eager_load(queryset, self.get_serializer_class())
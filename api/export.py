@@ -0,0 +1,36 @@
+"""
+    This file streams the export of the papers and their reviews to the staff.
+"""
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.journal import PAPER__STATUS_CHOICES
+from journal.export import EXPORT_CONTENT_TYPES, export_papers
+from journal.models import Paper
+
+
+class PaperExportView(APIView):
+    """
+        Streams all the papers with their submitter's profile, editor, reviewers and reviews as NDJSON, one paper
+        per line, or as CSV, one review per row. The response is written while the papers are read, a chunk at a time.
+        :param export_format: ndjson or csv.
+        :param status: Only export the papers with this status.
+    """
+    permission_classes = (IsAuthenticated, IsAdminUser)
+
+    def get(self, request, export_format=None, *args, **kwargs):
+        papers = Paper.objects.all()
+        paper_status = request.query_params.get('status')
+        if paper_status:
+            if paper_status not in PAPER__STATUS_CHOICES:
+                return Response({"details": "Invalid paper status!"}, status=status.HTTP_400_BAD_REQUEST)
+            papers = papers.filter(status=paper_status)
+
+        response = StreamingHttpResponse(export_papers(export_format, papers),
+                                         content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = 'attachment; filename="papers.{}"'.format(export_format)
+        response['Cache-Control'] = 'private, no-store'
+        return response
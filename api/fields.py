@@ -0,0 +1,33 @@
+"""
+    Serializer fields shared by the API views.
+"""
+from django.core.urlresolvers import reverse
+from rest_framework import serializers
+
+from journal.models import Review
+
+
+def file_url(field_file):
+    """
+        Returns the URL of the API view that downloads field_file, a file of a paper or of a review, after checking
+        that the user can see it. The storage URL under MEDIA_URL isn't served.
+    """
+    instance = field_file.instance
+    if isinstance(instance, Review):
+        return reverse('api:api-review-file', kwargs={'pk': instance.pk})
+    return reverse('api:api-paper-file', kwargs={'pk': instance.pk, 'field': field_file.field.name})
+
+
+class ProtectedFileField(serializers.FileField):
+    """
+        A FileField represented by the URL of its download view, see file_url.
+    """
+
+    def to_representation(self, value):
+        if not value or not value.instance.pk:
+            return None
+        url = file_url(value)
+        request = self.context.get('request', None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
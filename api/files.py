@@ -0,0 +1,181 @@
+"""
+    This file will handle the downloads of the files attached to papers and reviews.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+
+from journal.models import Paper, Review
+from journal.storage import paper_storage
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange(object):
+    """
+        A file object that ends after length bytes from its current position. It keeps the file's fileno() so servers
+        with a wsgi.file_wrapper, gunicorn for instance, send it with os.sendfile() instead of reading it in Python.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+        Parses a single range Range header.
+        :return: The (start, end) of the range, end included. None if the whole file should be sent and False if the
+        range can't be satisfied. Multiple ranges are answered with the whole file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:  # The last end bytes.
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def file_etag(name, stat):
+    """
+        Blobs are named after the SHA-256 of their content, which is a strong ETag. Files uploaded before the content
+        addressed storage get one made of their modification time and size.
+    """
+    base, _ = os.path.splitext(os.path.basename(name))
+    if name.startswith(paper_storage.prefix + '/') and len(base) == 64:
+        return base
+    return '{:x}-{:x}'.format(int(stat.st_mtime), stat.st_size)
+
+
+def serve_file(request, field_file, download_name):
+    """
+        Sends field_file with support for conditional and range requests. Depending on PAPER_FILES_SENDFILE the file
+        is handed to the front proxy or streamed from the file descriptor.
+    """
+    if not field_file:
+        raise Http404("No file.")
+    try:
+        path = field_file.path
+        stat = os.stat(path)
+    except (OSError, NotImplementedError):
+        raise Http404("File not found.")
+
+    etag = file_etag(field_file.name, stat)
+    headers = {
+        'ETag': quote_etag(etag),
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': 'private, max-age=0, must-revalidate',
+    }
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = build_file_response(request, field_file.name, path, stat.st_size, etag)
+        if response.status_code != 416:
+            headers['Content-Type'] = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+            headers['Content-Disposition'] = 'attachment; filename="{}"'.format(download_name)
+
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def build_file_response(request, name, path, size, etag):
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range and if_range and etag not in parse_etags(if_range):
+        byte_range = None  # The client has another version, send the whole file.
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{}'.format(size)
+        return response
+
+    sendfile = settings.PAPER_FILES_SENDFILE
+    if sendfile:
+        # The proxy handles Range itself.
+        response = HttpResponse()
+        if sendfile == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.PAPER_FILES_ACCEL_PREFIX + name
+        else:
+            response['X-Sendfile'] = path
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    file = open(path, 'rb')
+    file.seek(start)
+    response = FileResponse(FileRange(file, end - start + 1), status=206 if byte_range else 200)
+    response.block_size = 64 * 1024
+    response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    if byte_range:
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+    return response
+
+
+class PaperFileView(generics.GenericAPIView):
+    """
+        Downloads a file of a paper. The paper's submitter, editor and reviewers and the staff users can download its
+        files.
+        :param pk: The primary key of the paper.
+        :param field: One of manuscript, cover_letter, supplementary_materials.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self, *args, **kwargs):
+        user = self.request.user
+        if user.is_staff:
+            return Paper.objects.all()
+
+        # The reviewers read the files they review, a subquery doesn't repeat the paper for each of its reviewers.
+        reviewed = Paper.reviewers.through.objects.filter(user=user).values('paper')
+        return Paper.objects.all().filter(Q(user=user) | Q(editor=user) | Q(pk__in=reviewed))
+
+    def get(self, request, pk=None, field=None, *args, **kwargs):
+        paper = generics.get_object_or_404(self.get_queryset().only(field), pk=pk)
+        field_file = getattr(paper, field)
+        extension = os.path.splitext(field_file.name)[1]
+        return serve_file(request, field_file, 'paper-{}-{}{}'.format(paper.pk, field, extension))
+
+
+class ReviewFileView(generics.GenericAPIView):
+    """
+        Downloads the additional file of a review. The review's author, the paper's editor and the staff users can
+        download it.
+        :param pk: The primary key of the review.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self, *args, **kwargs):
+        if self.request.user.is_staff:
+            return Review.objects.all()
+
+        return Review.objects.all().filter(Q(user=self.request.user) | Q(paper__editor=self.request.user))
+
+    def get(self, request, pk=None, *args, **kwargs):
+        review = generics.get_object_or_404(self.get_queryset().only('additional_file'), pk=pk)
+        extension = os.path.splitext(review.additional_file.name)[1]
+        return serve_file(request, review.additional_file, 'review-{}{}'.format(review.pk, extension))
@@ -2,8 +2,10 @@
     This file will handle API commands related to the Journal functionality of the application.
 """
 import itertools
+from collections import OrderedDict
 
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from django.http import Http404
 from rest_framework import status, serializers, generics
@@ -11,14 +13,33 @@ from rest_framework.decorators import permission_classes, api_view
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from api.conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from api.eager import EagerLoadingMixin, eager_load
+from api.fields import ProtectedFileField
+from api.pagination import RankedPagination
 from api.permissions import PublicEndpoint, UserCanReview, UserIsEditor
 from api.profile import UserDetailsSerializer
-from journal.models import Paper, JOURNAL_PAPER_FILE_VALIDATOR, Review
+from journal.dashboard import dashboard_stamp, editor_papers, pending_reviewers
+from journal.models import Author, Paper, JOURNAL_PAPER_FILE_VALIDATOR, Review, PaperCounter
+from journal.reviewers import change_reviewers, MAX_REVIEWER_CHANGES
+from journal.search import search_papers
+from journal.summary import review_summaries, MAX_SUMMARY_PAPERS
+from journal.transitions import change_editor, review_saved, TransitionConflict
 
 PAPER__STATUS_CHOICES = set(itertools.chain.from_iterable(Paper.STATUS_CHOICES))
 REVIEW_APPROPRIATE_CHOICES = set(itertools.chain.from_iterable(Review.APPROPRIATE_CHOICES))
 REVIEW_RECOMMENDATION_CHOICES = set(itertools.chain.from_iterable(Review.RECOMMENDATION_CHOICES))
+# Answered with a 409 when the paper kept changing during a status transition, the request can be retried.
+PAPER_CONFLICT = "The paper was changed by another request, try again."
+ALREADY_REVIEWED = "You've already submitted a review for this paper!"
+
+# Breakdowns supported by papers_count, PaperCounter name -> key in the response.
+PAPER_COUNT_BREAKDOWNS = {
+    'status': OrderedDict(('status:' + choice[0], choice[0]) for choice in Paper.STATUS_CHOICES),
+    'editor': OrderedDict((('editor:yes', 'with_editor'), ('editor:no', 'without_editor'))),
+}
 
 
 @api_view(['GET'])
@@ -26,29 +47,40 @@ REVIEW_RECOMMENDATION_CHOICES = set(itertools.chain.from_iterable(Review.RECOMME
 def papers_count(request):
     """
     Retrieve the number of submitted papers.
+    Use ?by=status or ?by=editor to retrieve the number of papers for each status or with and without an editor.
     """
-    return Response(Paper.objects.count(), status=status.HTTP_200_OK)
+    by = request.query_params.get('by')
+    if by is None:
+        return Response(PaperCounter.get_values(('total',))['total'], status=status.HTTP_200_OK)
+
+    breakdown = PAPER_COUNT_BREAKDOWNS.get(by)
+    if breakdown is None:
+        return Response({"details": "Invalid value for by, use one of: status, editor."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    values = PaperCounter.get_values(list(breakdown))
+    return Response(OrderedDict((key, values[name]) for name, key in breakdown.items()), status=status.HTTP_200_OK)
 
 
 @api_view(['POST', 'DELETE'])
 @permission_classes((IsAuthenticated, IsAdminUser))
+@transaction.atomic
 def set_editor(request, pk):
     """
         Ensure that a staff member can set itself as an editor.
         :param pk - Paper's primary key on which to set the editor.
     """
     try:
-        paper = Paper.objects.get(id=pk)
+        paper = Paper.objects.only('status', 'editor').get(id=pk)
         if paper and request.method == 'POST':
-            paper.editor = request.user
-            paper.save()
+            change_editor(paper, request.user)
             return Response({"details": "set"}, status=status.HTTP_200_OK)
         elif paper and request.method == 'DELETE':
-            paper.editor = None
-            paper.save()
+            change_editor(paper, None)
             return Response({"details": "deleted"}, status=status.HTTP_200_OK)
     except Paper.DoesNotExist:
         return Response({"details": "Paper not found!"}, status.HTTP_404_NOT_FOUND)
+    except TransitionConflict:
+        return Response({"details": PAPER_CONFLICT}, status=status.HTTP_409_CONFLICT)
 
 
 class PaperSerializer(serializers.ModelSerializer):
@@ -62,12 +94,12 @@ class PaperSerializer(serializers.ModelSerializer):
     authors = serializers.CharField(max_length=4096, required=True)
     status = serializers.CharField(default="processing")
     reviewers = UserDetailsSerializer(read_only=True, many=True)
-    manuscript = serializers.FileField(allow_empty_file=False, allow_null=False, required=True,
-                                       validators=[JOURNAL_PAPER_FILE_VALIDATOR])
-    cover_letter = serializers.FileField(allow_empty_file=False, allow_null=False, required=True,
-                                         validators=[JOURNAL_PAPER_FILE_VALIDATOR])
-    supplementary_materials = serializers.FileField(allow_null=True, required=False,
-                                                    validators=[JOURNAL_PAPER_FILE_VALIDATOR])
+    manuscript = ProtectedFileField(allow_empty_file=False, allow_null=False, required=True,
+                                    validators=[JOURNAL_PAPER_FILE_VALIDATOR])
+    cover_letter = ProtectedFileField(allow_empty_file=False, allow_null=False, required=True,
+                                      validators=[JOURNAL_PAPER_FILE_VALIDATOR])
+    supplementary_materials = ProtectedFileField(allow_null=True, required=False,
+                                                 validators=[JOURNAL_PAPER_FILE_VALIDATOR])
 
     def validate_status(self, value):
         if value not in PAPER__STATUS_CHOICES:
@@ -143,7 +175,62 @@ class AddRemoveReviewerView(generics.RetrieveUpdateDestroyAPIView):
         return Response({"details": "Paper or User not found!"}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PaperDetailView(generics.RetrieveAPIView):
+class ReviewerChangeSerializer(serializers.Serializer):
+    """
+        Serializer for one operation of the bulk reviewer changes.
+    """
+    paper = serializers.IntegerField()
+    add = serializers.ListField(child=serializers.IntegerField(), required=False)
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+
+class BulkReviewerView(APIView):
+    """
+        Adds and removes the reviewers of many papers in one transaction. The body is a list of operations:
+            [{"paper": 1, "add": [2, 3], "remove": [4]}, ...]
+        Invalid operations, missing papers and missing users are reported in errors, the rest is applied. The response
+        has the reviewers added to and removed from each paper and the errors:
+            {"papers": [{"paper": 1, "added": [2, 3], "removed": [4]}, ...],
+             "errors": [{"operation": 1, "paper": 5, "details": "Paper not found!"}, ...]}
+    """
+    permission_classes = (IsAuthenticated, IsAdminUser)
+
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return Response({"details": "Expected a list of operations!"}, status=status.HTTP_400_BAD_REQUEST)
+
+        operations, errors = [], []
+        for index, data in enumerate(request.data):
+            serializer = ReviewerChangeSerializer(data=data)
+            if serializer.is_valid():
+                operation = serializer.validated_data
+                operations.append((index, operation['paper'], operation.get('add', []), operation.get('remove', [])))
+            else:
+                errors.append(OrderedDict([('operation', index), ('details', serializer.errors)]))
+
+        if sum(len(add) + len(remove) for _, _, add, remove in operations) > MAX_REVIEWER_CHANGES:
+            return Response({"details": "At most {} reviewers can be changed at once!".format(MAX_REVIEWER_CHANGES)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        changes, change_errors = change_reviewers([operation[1:] for operation in operations])
+        for change_error in change_errors:
+            # Report the position of the operation in the request.
+            change_error['operation'] = operations[change_error['operation']][0]
+        errors = sorted(errors + change_errors, key=lambda item: item['operation'])
+        return Response({"papers": changes, "errors": errors}, status=status.HTTP_200_OK)
+
+
+def visible_papers(user):
+    """
+        Returns the papers whose details the user can see: the ones they submitted or edit, all of them for staff.
+    """
+    if user.is_staff:
+        return Paper.objects.all()
+
+    return Paper.objects.all().filter(Q(user=user) | Q(editor=user))
+
+
+class PaperDetailView(ConditionalRetrieveMixin, EagerLoadingMixin, generics.RetrieveAPIView):
     """
         Retrieve the detail of a single paper where it's submitter or editor is the user.
         Staff users can use this view to retrieve details for all papers.
@@ -153,13 +240,28 @@ class PaperDetailView(generics.RetrieveAPIView):
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self, *args, **kwargs):
-        if self.request.user.is_staff:
-            return Paper.objects.all()
+        return visible_papers(self.request.user)
+
 
-        return Paper.objects.all().filter(Q(user=self.request.user) | Q(editor=self.request.user))
+class PaperSearchView(EagerLoadingMixin, generics.ListAPIView):
+    """
+        Full text search over the title, description and authors of the papers the user can see, best match first.
+        :param q: The words to search for, the last one matches prefixes.
+    """
+    serializer_class = PaperSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = RankedPagination
+
+    def get_queryset(self, *args, **kwargs):
+        return search_papers(visible_papers(self.request.user), self.request.query_params.get('q', ''))
 
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('q', '').strip():
+            return Response({"details": "The q parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        return super(PaperSearchView, self).list(request, *args, **kwargs)
 
-class PaperListSubmittedView(generics.ListCreateAPIView):
+
+class PaperListSubmittedView(ConditionalListMixin, EagerLoadingMixin, generics.ListCreateAPIView):
     """
         This view lists the papers currently belonging to a user and lets the user submit it's own papers.
     """
@@ -172,13 +274,14 @@ class PaperListSubmittedView(generics.ListCreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = PaperSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            with transaction.atomic():
+                serializer.save(user=request.user)
             return Response(serializer.data)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PaperListAllView(generics.ListAPIView):
+class PaperListAllView(ConditionalListMixin, EagerLoadingMixin, generics.ListAPIView):
     """
         This view lists the all the papers.
     """
@@ -187,7 +290,7 @@ class PaperListAllView(generics.ListAPIView):
     permission_classes = (IsAuthenticated, IsAdminUser)
 
 
-class PaperListEditorSelfView(generics.ListAPIView):
+class PaperListEditorSelfView(ConditionalListMixin, EagerLoadingMixin, generics.ListAPIView):
     """
         This view lists the papers where the user is the editor.
     """
@@ -198,7 +301,45 @@ class PaperListEditorSelfView(generics.ListAPIView):
         return Paper.objects.all().filter(editor=self.request.user)
 
 
-class PaperListEditorView(generics.ListAPIView):
+class EditorDashboardSerializer(serializers.ModelSerializer):
+    """
+        Serializer for a paper on the editor dashboard, with the progress of its reviews.
+    """
+    reviewers_count = serializers.IntegerField(read_only=True)
+    reviews_count = serializers.IntegerField(read_only=True)
+    pending_reviewers = UserDetailsSerializer(read_only=True, many=True)
+    has_editor_review = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Paper
+        fields = ('id', 'user', 'title', 'status', 'created', 'updated', 'reviewers_count', 'reviews_count',
+                  'pending_reviewers', 'has_editor_review')
+
+
+class EditorDashboardView(ConditionalListMixin, generics.ListAPIView):
+    """
+        Lists the papers where the user is the editor, with the number of reviewers, the number of submitted reviews,
+        the reviewers who haven't submitted theirs yet and whether the editor review was submitted.
+    """
+    serializer_class = EditorDashboardSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self, *args, **kwargs):
+        return editor_papers(self.request.user)
+
+    def list_stamp(self):
+        return dashboard_stamp(self.request.user)
+
+    def paginate_queryset(self, queryset):
+        papers = super(EditorDashboardView, self).paginate_queryset(queryset)
+        if papers is not None:
+            pending = pending_reviewers([paper.pk for paper in papers])
+            for paper in papers:
+                paper.pending_reviewers = pending[paper.pk]
+        return papers
+
+
+class PaperListEditorView(ConditionalListMixin, EagerLoadingMixin, generics.ListAPIView):
     """
         This view lists the papers that have an editor.
     """
@@ -209,7 +350,7 @@ class PaperListEditorView(generics.ListAPIView):
         return Paper.objects.all().exclude(editor__isnull=True)
 
 
-class PaperListReviewerView(generics.ListAPIView):
+class PaperListReviewerView(ConditionalListMixin, EagerLoadingMixin, generics.ListAPIView):
     """
         This view lists the papers where the user is a reviewer.
     """
@@ -220,7 +361,33 @@ class PaperListReviewerView(generics.ListAPIView):
         return Paper.objects.all().filter(reviewers=self.request.user)
 
 
-class PaperListNoEditorView(generics.ListAPIView):
+class PaperListAuthorView(ConditionalListMixin, EagerLoadingMixin, generics.ListAPIView):
+    """
+        This view lists the papers written by an author, found by email, affiliation or country.
+        :param email: The email of the author, case insensitive.
+        :param affiliation: The affiliation of an author.
+        :param country: The country of an author.
+    """
+    serializer_class = PaperSerializer
+    permission_classes = (IsAuthenticated, IsAdminUser)
+    author_filters = ('email', 'affiliation', 'country')
+
+    def get_queryset(self, *args, **kwargs):
+        filters = {name: self.request.query_params[name].strip() for name in self.author_filters
+                   if self.request.query_params.get(name, '').strip()}
+        if 'email' in filters:
+            filters['email'] = filters['email'].lower()
+        # The authors are found through the indexes of the Author table, a paper is listed once.
+        return Paper.objects.all().filter(pk__in=Author.objects.filter(**filters).values('paper_id'))
+
+    def list(self, request, *args, **kwargs):
+        if not any(request.query_params.get(name, '').strip() for name in self.author_filters):
+            return Response({"details": "One of the GET params email, affiliation or country is missing!"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return super(PaperListAuthorView, self).list(request, *args, **kwargs)
+
+
+class PaperListNoEditorView(ConditionalListMixin, EagerLoadingMixin, generics.ListAPIView):
     """
         This view lists the papers that don't have an editor.
     """
@@ -273,21 +440,27 @@ class ReviewAddView(generics.CreateAPIView):
         self.check_object_permissions(request=request, obj=obj)
         return obj
 
-    def check_if_review_has_been_submitted(self, request=None, paper=None):
-        """
-            Ensure that an user will submit only one review per paper.
-        """
-        review_exists = self.queryset.filter(user=request.user, paper=paper).exists()
-        if review_exists:
-            self.permission_denied(request, "You've already submitted a review for this paper!")
+    def already_reviewed(self, request, paper):
+        return Review.objects.filter(user=request.user, paper=paper).exists()
 
     def post(self, request, pk=None, *args, **kwargs):
         serializer = ReviewSerializer(data=request.data)
         if serializer.is_valid():
             paper = self.check_if_user_is_reviewer(request=request, pk=request.data['paper'])
-            self.check_if_review_has_been_submitted(request, paper.id)
-            is_editor_review = paper.editor == request.user
-            serializer.save(user=request.user, editor_review=is_editor_review)
+            if self.already_reviewed(request, paper):
+                self.permission_denied(request, ALREADY_REVIEWED)
+            is_editor_review = paper.editor_id == request.user.pk
+            try:
+                with transaction.atomic():
+                    review_saved(serializer.save(user=request.user, editor_review=is_editor_review))
+            except IntegrityError:
+                # Reviews are unique per user and paper, a concurrent request may have added one since the check.
+                # Any other integrity error is a bug, it isn't reported as a duplicate.
+                if not self.already_reviewed(request, paper):
+                    raise
+                self.permission_denied(request, ALREADY_REVIEWED)
+            except TransitionConflict:
+                return Response({"details": PAPER_CONFLICT}, status=status.HTTP_409_CONFLICT)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -334,7 +507,11 @@ class ReviewRetrieveUpdateView(generics.RetrieveUpdateAPIView):
         review = self.get_object(pk=pk)
         serializer = self.serializer_class(review, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                with transaction.atomic():
+                    review_saved(serializer.save())
+            except TransitionConflict:
+                return Response({"details": PAPER_CONFLICT}, status=status.HTTP_409_CONFLICT)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -352,7 +529,7 @@ class ReviewListView(generics.ListAPIView):
     def get_object(self, pk=None):
         paper = get_object_or_404(self.paper_queryset, pk=pk)
         self.check_object_permissions(request=self.request, obj=paper)
-        return paper.reviews
+        return eager_load(paper.reviews.all(), self.serializer_class)
 
     def get(self, request, pk=None, *args, **kwargs):
         reviews = self.get_object(pk=pk)
@@ -360,6 +537,48 @@ class ReviewListView(generics.ListAPIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class ReviewSummaryView(APIView):
+    """
+        Returns the summary of the reviews of a paper: the counts of the recommendations and of the appropriate values,
+        the mean score and the editor verdict. See journal.summary.review_summaries.
+    """
+    permission_classes = (IsAuthenticated, UserIsEditor)
+
+    def get(self, request, pk=None, *args, **kwargs):
+        summaries = review_summaries(Paper.objects.filter(pk=pk))
+        if not summaries:
+            raise Http404
+        # The summary has what UserIsEditor checks, the paper isn't read again.
+        self.check_object_permissions(request, Paper(pk=summaries[0]['paper'], editor_id=summaries[0]['editor']))
+        return Response(summaries[0], status=status.HTTP_200_OK)
+
+
+class ReviewSummaryListView(APIView):
+    """
+        Returns the summaries of the reviews of many papers, identified by pk:
+            GET ?papers=1,2,3
+        Staff get the summaries of all of them, editors of the ones they edit, the others are left out.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            pks = {int(pk) for pk in request.query_params.get('papers', '').split(',') if pk.strip()}
+        except ValueError:
+            return Response({"details": "The papers GET param must be a list of ids!"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not pks:
+            return Response({"details": "The papers GET param is missing!"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(pks) > MAX_SUMMARY_PAPERS:
+            return Response({"details": "At most {} papers can be summarized at once!".format(MAX_SUMMARY_PAPERS)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        papers = Paper.objects.filter(pk__in=pks)
+        if not request.user.is_staff:
+            papers = papers.filter(editor=request.user)
+        return Response(review_summaries(papers), status=status.HTTP_200_OK)
+
+
 class EditorReviewView(generics.ListAPIView):
     """
         Returns the editor review for the specified paper.
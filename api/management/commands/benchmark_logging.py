@@ -0,0 +1,157 @@
+"""
+    Measures what logging costs the requests: the synchronous file handler used before against the queue handler of
+    LOGGING, as configured and with every logger at DEBUG so both write the same records. A slow disk can be simulated
+    with a latency added to every write.
+"""
+import copy
+import logging
+import logging.config
+import logging.handlers
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+# The configuration before the queue handler: every record is formatted and written to the file by the thread that
+# logs it, under the handler's lock.
+FILE_LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {
+            'format': "[%(asctime)s] %(levelname)s [%(name)s:%(lineno)s] %(message)s",
+            'datefmt': "%d/%b/%Y %H:%M:%S"
+        },
+    },
+    'handlers': {
+        'file': {
+            'level': 'DEBUG',
+            'class': 'logging.FileHandler',
+            'filename': 'mysite.log',
+            'formatter': 'verbose'
+        },
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['file'],
+            'propagate': True,
+            'level': 'DEBUG',
+        },
+    }
+}
+
+
+class SlowDiskMixin(object):
+    """
+        Waits write_latency seconds after every write, as a busy or network disk would.
+    """
+    write_latency = 0
+
+    def flush(self):
+        super(SlowDiskMixin, self).flush()
+        time.sleep(self.write_latency)
+
+
+class SlowFileHandler(SlowDiskMixin, logging.FileHandler):
+    pass
+
+
+class SlowWatchedFileHandler(SlowDiskMixin, logging.handlers.WatchedFileHandler):
+    pass
+
+
+SLOW_HANDLERS = {
+    'logging.FileHandler': __name__ + '.SlowFileHandler',
+    'logging.handlers.WatchedFileHandler': __name__ + '.SlowWatchedFileHandler',
+}
+
+
+def queue_logging(level=None):
+    config = copy.deepcopy(settings.LOGGING)
+    if level is not None:
+        for logger in config['loggers'].values():
+            logger['level'] = level
+    return config
+
+
+def log_to(config, directory, slow=False):
+    """
+        Returns config with its log files moved to directory, written through the slow handlers if slow.
+    """
+    config = copy.deepcopy(config)
+    for handler in config['handlers'].values():
+        for target in [handler] + handler.get('handlers', []):
+            if 'filename' in target:
+                target['filename'] = os.path.join(directory, os.path.basename(target['filename']))
+            if slow and target.get('class') in SLOW_HANDLERS:
+                target['class'] = SLOW_HANDLERS[target['class']]
+    return config
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the cost of logging per record and per request, with the file and the queue handlers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=5000,
+                            help="Records logged in a burst per configuration.")
+        parser.add_argument('--requests', type=int, default=1000, help="Requests made per configuration.")
+        parser.add_argument('--url', default='/api/papers/count/',
+                            help="The URL requested, it should run queries, which are logged at DEBUG.")
+        parser.add_argument('--write-latency-ms', type=float, default=0,
+                            help="Simulates a slow disk, every write to the log files waits this long.")
+
+    def handle(self, *args, **options):
+        configurations = (
+            ('file, DEBUG', FILE_LOGGING),
+            ('queue, DEBUG', queue_logging('DEBUG')),
+            ('queue, LOGGING', queue_logging()),
+        )
+        self.stdout.write("DEBUG is {}, queries are logged at DEBUG only when it's on.".format(settings.DEBUG))
+        self.stdout.write("{:>16} {:>14} {:>14} {:>10} {:>14}".format(
+            "logging", "us / record", "written in ms", "dropped", "us / request"))
+        SlowDiskMixin.write_latency = options['write_latency_ms'] / 1000
+        slow = options['write_latency_ms'] > 0
+        directory = tempfile.mkdtemp()
+        try:
+            for name, config in configurations:
+                logging.config.dictConfig(log_to(config, directory, slow))
+                record, written, dropped = self.measure_records(options['records'])
+                logging.config.dictConfig(log_to(config, directory, slow))
+                request = self.measure_requests(options['url'], options['requests'])
+                self.stdout.write("{:>16} {:>14.2f} {:>14.1f} {:>10} {:>14.1f}".format(
+                    name, record, written, dropped, request))
+        finally:
+            logging.config.dictConfig(settings.LOGGING)
+            shutil.rmtree(directory)
+
+    def measure_records(self, count):
+        """
+            Returns the time a logging call takes in the thread that logs, in microseconds, the time until all the
+            records are written, in milliseconds, and the number of records dropped by a full queue.
+        """
+        logger = logging.getLogger('django.benchmark')
+        start = time.perf_counter()
+        for index in range(count):
+            logger.info("Benchmark record %d of %d", index, count)
+        logged = time.perf_counter() - start
+        # Stopping the handlers waits for the queue to be written.
+        handlers = logging.getLogger('django').handlers
+        for handler in handlers:
+            handler.close()
+        written = time.perf_counter() - start
+        return logged / count * 1e6, written * 1000, sum(getattr(handler, 'dropped', 0) for handler in handlers)
+
+    def measure_requests(self, url, count):
+        """
+            Returns the time of a request, in microseconds.
+        """
+        client = Client()
+        client.get(url)
+        start = time.perf_counter()
+        for _ in range(count):
+            client.get(url)
+        return (time.perf_counter() - start) / count * 1e6
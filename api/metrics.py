@@ -0,0 +1,282 @@
+"""
+    Request metrics in the Prometheus text format: the number of requests by route, method and status, and
+    histograms of the latency, the number and time of the SQL queries and the response size by route. The routes are
+    the names of the URL patterns, api-papers-all for instance.
+
+    Every process counts its own requests in memory. With METRICS_DIR set, each process also writes its counts to a
+    file of its own in that directory, at most every METRICS_FLUSH_INTERVAL seconds, and /metrics adds up the files of
+    all the processes, so the gunicorn workers are reported as one. The files of exited workers are kept so the
+    counters never go down, empty the directory when the server is restarted.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.permissions import BasePermission
+from rest_framework.views import APIView
+
+from api.profiling import record_query
+
+# The upper bounds of the histogram buckets, +Inf is implied.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# name -> (type, help, buckets)
+METRICS = OrderedDict((
+    ('acrevista_http_requests_total', ('counter', 'Requests by route, method and status.', None)),
+    ('acrevista_http_request_duration_seconds',
+     ('histogram', 'Time to the response by route, the body of streamed responses is not included.', LATENCY_BUCKETS)),
+    ('acrevista_http_request_queries', ('histogram', 'SQL queries per request by route.', QUERY_COUNT_BUCKETS)),
+    ('acrevista_http_request_query_seconds',
+     ('histogram', 'Time spent in SQL queries per request by route.', LATENCY_BUCKETS)),
+    ('acrevista_http_response_size_bytes', ('histogram', 'Size of the response body by route.', SIZE_BUCKETS)),
+))
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Registry(object):
+    """
+        The metrics of this process. Counters are {(name, labels): value}, histograms {(name, labels): [bucket
+        counts..., sum, count]}, where labels is a tuple of (label, value) pairs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.flushed = 0
+        self.path = None
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            key = (name, labels)
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        with self.lock:
+            key = (name, labels)
+            histogram = self.values.get(key)
+            if histogram is None:
+                histogram = self.values[key] = [0] * (len(buckets) + 2)
+            # Buckets are cumulative when rendered, only the first one that fits is counted here.
+            histogram[bisect.bisect_left(buckets, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return [[name, list(labels), list(value) if isinstance(value, list) else value]
+                    for (name, labels), value in self.values.items()]
+
+    def flush(self, force=False):
+        """
+            Writes the metrics of this process to its file in METRICS_DIR, if it's set.
+        """
+        directory = getattr(settings, 'METRICS_DIR', None)
+        now = time.time()
+        if not directory or not (force or now - self.flushed >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)):
+            return
+        self.flushed = now
+        if self.path is None:
+            # The start time tells a new process apart from an exited one with the same pid.
+            self.path = os.path.join(directory, 'metrics-{}-{}.json'.format(os.getpid(), int(now * 1000)))
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temporary, self.path)
+
+    def collect(self):
+        """
+            Returns the metrics of all the processes, in the same shape as values.
+        """
+        self.flush(force=True)
+        totals = {}
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            snapshots = [self.snapshot()]
+        else:
+            snapshots = []
+            for name in os.listdir(directory):
+                if name.startswith('metrics-') and name.endswith('.json'):
+                    try:
+                        with open(os.path.join(directory, name)) as file:
+                            snapshots.append(json.load(file))
+                    except (OSError, ValueError):  # Written or removed right now.
+                        continue
+        for snapshot in snapshots:
+            for name, labels, value in snapshot:
+                key = (name, tuple(tuple(label) for label in labels))
+                if isinstance(value, list):
+                    total = totals.setdefault(key, [0] * len(value))
+                    for index, item in enumerate(value):
+                        total[index] += item
+                else:
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+registry = Registry()
+atexit.register(registry.flush, force=True)
+
+
+def format_labels(labels):
+    return '{' + ','.join('{}="{}"'.format(label, str(value).replace('\\', r'\\').replace('"', r'\"'))
+                          for label, value in labels) + '}' if labels else ''
+
+
+def render(totals):
+    """
+        Returns the metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines.append('# HELP {} {}'.format(name, description))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for (metric, labels), value in sorted(totals.items(), key=lambda item: item[0]):
+            if metric != name:
+                continue
+            if kind == 'counter':
+                lines.append('{}{} {}'.format(name, format_labels(labels), value))
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(name, format_labels(labels + (('le', bound),)), cumulative))
+            lines.append('{}_sum{} {}'.format(name, format_labels(labels), value[-2]))
+            lines.append('{}_count{} {}'.format(name, format_labels(labels), value[-1]))
+    return '\n'.join(lines) + '\n'
+
+
+class TimedCursor(object):
+    """
+        Wraps a DB-API cursor to count the queries it runs and the time they take on its connection. It sits under
+        Django's cursor wrappers so the queries are counted with and without DEBUG.
+    """
+
+    def __init__(self, cursor, connection):
+        self.cursor = cursor
+        self.connection = connection
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def timed(self, method, args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.connection.metrics_queries += 1
+            self.connection.metrics_query_time += elapsed
+            record_query(args[0], elapsed)
+
+    def execute(self, *args):
+        return self.timed(self.cursor.execute, args)
+
+    def executemany(self, *args):
+        return self.timed(self.cursor.executemany, args)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """
+        Receiver of connection_created, makes the connection count its queries.
+    """
+    if getattr(connection, 'metrics_queries', None) is not None:
+        return
+    connection.metrics_queries, connection.metrics_query_time = 0, 0.0
+    create_cursor = connection.create_cursor
+    connection.create_cursor = lambda *args: TimedCursor(create_cursor(*args), connection)
+
+
+def query_stats():
+    queries, seconds = 0, 0.0
+    for connection in connections.all():
+        queries += getattr(connection, 'metrics_queries', 0)
+        seconds += getattr(connection, 'metrics_query_time', 0.0)
+    return queries, seconds
+
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.view_name
+
+
+def counted(content, route):
+    """
+        Yields the chunks of a streamed response and records its size once it's sent.
+    """
+    size = 0
+    try:
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        registry.observe('acrevista_http_response_size_bytes', (('route', route),), size)
+        registry.flush()
+
+
+class MetricsMiddleware(object):
+    """
+        Records the metrics of every request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries, seconds = query_stats()
+        start = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        end_queries, end_seconds = query_stats()
+
+        route = route_of(request)
+        labels = (('route', route),)
+        registry.inc('acrevista_http_requests_total',
+                     labels + (('method', request.method), ('status', response.status_code)))
+        registry.observe('acrevista_http_request_duration_seconds', labels, elapsed)
+        registry.observe('acrevista_http_request_queries', labels, end_queries - queries)
+        registry.observe('acrevista_http_request_query_seconds', labels, end_seconds - seconds)
+        if not response.streaming:
+            registry.observe('acrevista_http_response_size_bytes', labels, len(response.content))
+        elif response.has_header('Content-Length'):
+            registry.observe('acrevista_http_response_size_bytes', labels, int(response['Content-Length']))
+        elif getattr(response, 'file_to_stream', None) is None:
+            response.streaming_content = counted(response.streaming_content, route)
+        registry.flush()
+        return response
+
+
+class CanReadMetrics(BasePermission):
+    """
+        Staff can read the metrics, and so can requests from METRICS_ALLOWED_ADDRESSES that didn't go through a proxy.
+    """
+
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        allowed = getattr(settings, 'METRICS_ALLOWED_ADDRESSES', ('127.0.0.1', '::1'))
+        return request.META.get('REMOTE_ADDR') in allowed and 'HTTP_X_FORWARDED_FOR' not in request.META
+
+
+class MetricsView(APIView):
+    """
+        Returns the metrics of all the processes in the Prometheus text format.
+    """
+    permission_classes = (CanReadMetrics,)
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(render(registry.collect()), content_type=CONTENT_TYPE)
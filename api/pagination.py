@@ -0,0 +1,159 @@
+"""
+    This file defines the pagination classes used by the API.
+"""
+from base64 import b64decode, b64encode
+from collections import OrderedDict, namedtuple
+from urllib import parse
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+KeysetCursor = namedtuple('KeysetCursor', ['reverse', 'position'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+        Opaque cursor pagination keyed on every field of `ordering`, not only on the first one.
+        The cursor holds the values of the last row seen, so fetching page N is a single index range scan
+        that costs the same as fetching the first page, no OFFSET is ever used.
+
+        The last field of the ordering must be unique (usually the primary key) in order to break ties.
+    """
+    ordering = ('-created', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        if reverse:
+            queryset = queryset.order_by(*self.reversed_ordering())
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.cursor is not None:
+            try:
+                queryset = queryset.filter(self.position_filter(self.cursor))
+            except (ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Fetch one extra row to find out if there is another page in the current direction.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def reversed_ordering(self):
+        return tuple(field[1:] if field.startswith('-') else '-' + field for field in self.ordering)
+
+    def position_filter(self, cursor):
+        """
+            Builds the row value comparison (a, b) < (x, y) as (a < x) OR (a = x AND b < y), which works on every
+            backend and can be satisfied from a composite index on the ordering fields.
+        """
+        query = Q()
+        for index, field in enumerate(self.ordering):
+            descending = field.startswith('-') != cursor.reverse
+            name = field.lstrip('-')
+            lookup = {name + ('__lt' if descending else '__gt'): cursor.position[index]}
+            for previous in range(index):
+                lookup[self.ordering[previous].lstrip('-')] = cursor.position[previous]
+            query |= Q(**lookup)
+        return query
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(KeysetCursor(reverse=False, position=self.get_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(KeysetCursor(reverse=True, position=self.get_position(self.page[0])))
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip('-'))
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = tokens['p']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return KeysetCursor(reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = '1'
+
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class RankedPagination(LimitOffsetPagination):
+    """
+        Limit/offset pagination for results ordered by relevance, which have no stable key to seek to.
+        No COUNT query is run, one extra row is fetched to find out if there is a next page.
+        The responses have the same shape as the KeysetPagination ones.
+    """
+    default_limit = settings.REST_FRAMEWORK['PAGE_SIZE']
+    max_limit = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.request = request
+
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
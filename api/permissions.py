@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from account.principal import principal_of
+
 
 class UserOwnsProfile(permissions.BasePermission):
     """
@@ -7,7 +9,7 @@ class UserOwnsProfile(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        is_owner = obj.pk == request.user.profile.pk
+        is_owner = obj.pk == principal_of(request.user).profile_pk
         is_admin = request.user.is_staff
         return is_owner or is_admin
 
@@ -26,9 +28,9 @@ class UserCanReview(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        is_reviewer = obj.reviewers.filter(id=request.user.id).exists()
+        is_reviewer = obj.pk in principal_of(request.user).reviewing
         is_admin = request.user.is_staff
-        is_editor = obj.editor == request.user
+        is_editor = obj.editor_id == request.user.pk
         return is_reviewer or is_admin or is_editor
 
 
@@ -39,7 +41,7 @@ class UserIsEditor(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         is_admin = request.user.is_staff
-        is_editor = obj.editor == request.user
+        is_editor = obj.editor_id == request.user.pk
         return is_admin or is_editor
 
 
@@ -49,6 +51,4 @@ class UserIsEditorInActivePaper(permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        from journal.models import Paper
-        paper_exists = Paper.objects.filter(editor=request.user, status=Paper.STATUS_CHOICES[1][0]).exists()
-        return paper_exists
+        return principal_of(request.user).edits_under_review
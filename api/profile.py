@@ -6,12 +6,11 @@ import itertools
 from django.contrib.auth.models import User
 from django.http import Http404
 from rest_framework import serializers, status, permissions
-from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from account.models import Profile
-from api.permissions import UserOwnsProfile, PublicEndpoint
+from api.permissions import UserOwnsProfile
 
 # Flatten the tuple choices into a nice set
 # ( ('Romania', 'Romania), ...) -> { 'Romania', ...}
@@ -19,24 +18,6 @@ PROFILE_VALID_COUNTRIES = set(itertools.chain.from_iterable(Profile.COUNTRY_CHOI
 PROFILE_VALID_TITLES = set(itertools.chain.from_iterable(Profile.TITLE_CHOICES))
 
 
-@api_view(['GET'])
-@permission_classes((PublicEndpoint,))
-def valid_titles(request):
-    """
-        Return the set of valid titles as defined in the profile model.
-    """
-    return Response(PROFILE_VALID_TITLES, status=status.HTTP_200_OK)
-
-
-@api_view(['GET'])
-@permission_classes((PublicEndpoint,))
-def valid_countries(request):
-    """
-        Return the set of valid country names as defined in the profile model.
-    """
-    return Response(PROFILE_VALID_COUNTRIES, status=status.HTTP_200_OK)
-
-
 class UserDetailsSerializer(serializers.ModelSerializer):
     """
         UserDetailsSerializer is a serializer like UserSerializer but includes only safe to read fields.
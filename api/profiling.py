@@ -0,0 +1,146 @@
+"""
+    Opt-in profiling of the SQL queries of requests, to find the views and serializer fields that run too many queries
+    or slow ones.
+
+    With SQL_PROFILING on, SQL_PROFILING_SAMPLE_RATE of the requests are profiled: every query they run is recorded
+    with its duration, its fingerprint (the statement without its values), the serializer field being read, if any,
+    and the frames of the project's code that ran it. Profiled requests with more than SQL_PROFILING_MAX_QUERIES
+    queries or more than SQL_PROFILING_MAX_SECONDS spent in them are logged as warnings to the api.profiling logger,
+    with their worst statements. The queries are seen by the cursor wrapper of api.metrics, requests that aren't
+    profiled only pay for a thread local lookup per query. Queries run while a streamed response is sent aren't
+    profiled.
+"""
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.fields import Field
+
+logger = logging.getLogger(__name__)
+local = threading.local()
+
+# The code that is reported in the stacks, the packages installed in the project's directory aren't.
+PROJECT_DIR = settings.BASE_DIR + os.sep
+IGNORED_PATHS = ('site-packages', 'dist-packages', os.path.join('api', 'metrics.py'),
+                 os.path.join('api', 'profiling.py'))
+STACK_DEPTH = 5
+TOP_STATEMENTS = 5
+
+FINGERPRINT_RES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),  # Strings.
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),  # Numbers.
+    (re.compile(r'%s|\?'), '?'),  # Parameters.
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),  # IN lists of any length.
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    """
+        Returns the statement with its values replaced, so the statements that differ only in their values are
+        grouped: SELECT ... WHERE "id" IN (1, 2, 3) -> SELECT ... WHERE "id" IN (...)
+    """
+    for regex, replacement in FINGERPRINT_RES:
+        sql = regex.sub(replacement, sql)
+    return sql.strip()
+
+
+def caller():
+    """
+        Returns the serializer field being read, as Serializer.field, and the innermost frames of the project's code,
+        as path:line in function.
+    """
+    field, stack = None, []
+    frame = sys._getframe(2)
+    while frame is not None and (field is None or len(stack) < STACK_DEPTH):
+        code = frame.f_code
+        if field is None:
+            instance = frame.f_locals.get('self')
+            if isinstance(instance, Field) and instance.field_name and instance.parent is not None:
+                field = '{}.{}'.format(instance.parent.__class__.__name__, instance.field_name)
+        path = code.co_filename
+        if len(stack) < STACK_DEPTH and path.startswith(PROJECT_DIR) and \
+                not any(part in path for part in IGNORED_PATHS):
+            stack.append('{}:{} in {}'.format(path[len(PROJECT_DIR):], frame.f_lineno, code.co_name))
+        frame = frame.f_back
+    return field, stack
+
+
+class Profile(object):
+    """
+        The queries of a profiled request, grouped by fingerprint.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements = OrderedDict()
+
+    def record(self, sql, seconds):
+        self.queries += 1
+        self.seconds += seconds
+        key = fingerprint(sql)
+        statement = self.statements.get(key)
+        if statement is None:
+            field, stack = caller()
+            # The field and stack of the first execution stand for all of them.
+            statement = self.statements[key] = {'count': 0, 'seconds': 0.0, 'field': field, 'stack': stack}
+        statement['count'] += 1
+        statement['seconds'] += seconds
+
+    def worst(self, count=TOP_STATEMENTS):
+        return sorted(self.statements.items(), key=lambda item: -item[1]['seconds'])[:count]
+
+
+def record_query(sql, seconds):
+    """
+        Called for every query by the cursor wrapper, records it if the request is profiled.
+    """
+    profile = getattr(local, 'profile', None)
+    if profile is not None:
+        profile.record(sql, seconds)
+
+
+def report(request, profile, elapsed):
+    match = getattr(request, 'resolver_match', None)
+    route = (match.url_name or match.view_name) if match else 'unmatched'
+    lines = ['{} {} ({}): {} queries in {:.1f} ms of {:.1f} ms'.format(
+        request.method, request.get_full_path(), route, profile.queries, profile.seconds * 1000, elapsed * 1000)]
+    for sql, statement in profile.worst():
+        lines.append('  {}x {:.1f} ms{}: {}'.format(
+            statement['count'], statement['seconds'] * 1000,
+            ' reading ' + statement['field'] if statement['field'] else '', sql[:500]))
+        lines += ['    at ' + frame for frame in statement['stack']]
+    logger.warning('\n'.join(lines))
+
+
+class SQLProfilingMiddleware(object):
+    """
+        Profiles a sample of the requests and logs the ones over the thresholds.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'SQL_PROFILING', False) or \
+                random.random() >= getattr(settings, 'SQL_PROFILING_SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        profile = local.profile = Profile()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            local.profile = None
+        elapsed = time.perf_counter() - start
+        if profile.queries > getattr(settings, 'SQL_PROFILING_MAX_QUERIES', 20) or \
+                profile.seconds > getattr(settings, 'SQL_PROFILING_MAX_SECONDS', 0.2):
+            report(request, profile, elapsed)
+        return response
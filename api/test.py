@@ -1,12 +1,44 @@
+import csv
+import datetime
+import gzip
+import hashlib
+import io
 import json
-from django.core.urlresolvers import reverse
-from rest_framework.test import APITestCase
+import logging
+import os
+import shutil
+import time
+from io import StringIO
+from tempfile import mkdtemp
+from django.core.urlresolvers import Resolver404, resolve, reverse
+from rest_framework.test import APITestCase, APITransactionTestCase
+from django.contrib import admin
 from django.contrib.auth.models import User
-from rest_framework import status
+from rest_framework import serializers, status
+from rest_framework_jwt.settings import api_settings
+from acrevista import log
 from api import journal
+from api import metrics
+from api import profiling
+from unittest import mock, skipUnless
+from django.db import IntegrityError, connection, transaction
+from django.test import override_settings
 from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.core.exceptions import ValidationError
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
 from django.core.files import temp as tempfile
-from journal.models import Paper, Review
+from django.core.files.uploadedfile import SimpleUploadedFile
+from account.models import OutgoingEmail, Profile
+from account.principal import get_principal
+from journal.mail import send_mail_new_review, get_staff_members, STAFF_RECIPIENTS_CACHE_KEY
+from journal.admin import PaperAdmin, ReviewAdmin
+from journal.authors import parse_authors
+from journal.models import Author, Paper, Review, PaperCounter, StoredFile, JOURNAL_PAPER_FILE_VALIDATOR
+from journal.transitions import change_editor, review_saved, transition, TransitionConflict
 
 
 class AccountsTest(APITestCase):
@@ -336,6 +368,726 @@ class ProfileTest(APITestCase):
         response = self.client.get(self.get_valid_countries, None, content_type='application/json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_choices_are_stable_and_cacheable(self):
+        """
+            Ensure that the choice lists keep the model order and are served with ETags, compressed on request.
+        """
+        response = self.client.get(self.get_valid_titles)
+        self.assertEqual(json.loads(response.content.decode('utf-8')), ['Dr', 'Professor', 'Miss', 'Mr', 'Mrs', 'Ms'])
+        self.assertIn('max-age', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client.get(self.get_valid_titles, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.get_valid_titles, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(gzip.decompress(response.content).decode('utf-8'))[0], 'Dr')
+
+        response = self.client.get(reverse('api:api-review-valid-recommendations'))
+        self.assertEqual(json.loads(response.content.decode('utf-8'))[0],
+                         {'value': '0', 'label': 'Consider after Major Changes.'})
+        response = self.client.post(self.get_valid_titles)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """
+        An email backend that can't reach the mail server.
+    """
+
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError("Connection refused")
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutgoingEmailTest(APITestCase):
+    """
+        Ensure that emails are queued in the outbox and sent by the send_queued_mail command.
+    """
+
+    def send_queued_mail(self, **options):
+        call_command('send_queued_mail', once=True, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def test_email_is_queued_until_the_worker_runs(self):
+        send_mail_new_review("A paper", "author@example.com")
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.filter(sent__isnull=True).count(), 1)
+
+        self.send_queued_mail()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["author@example.com"])
+        self.assertEqual(mail.outbox[0].subject, "New review: A paper")
+        self.assertIsNotNone(OutgoingEmail.objects.get().sent)
+
+        self.send_queued_mail()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_email_without_recipients_is_not_queued(self):
+        send_mail_new_review("A paper", "")
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+    def test_failed_email_is_retried_with_backoff(self):
+        send_mail_new_review("A paper", "author@example.com")
+        with override_settings(EMAIL_BACKEND='api.test.FailingEmailBackend'):
+            self.send_queued_mail(backoff=60)
+        email = OutgoingEmail.objects.get()
+        self.assertIsNone(email.sent)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("Connection refused", email.last_error)
+        self.assertGreater(email.next_attempt, email.created + datetime.timedelta(seconds=50))
+
+        # Not due yet.
+        self.send_queued_mail()
+        self.assertEqual(len(mail.outbox), 0)
+
+        OutgoingEmail.objects.update(next_attempt=email.created)
+        self.send_queued_mail()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(OutgoingEmail.objects.get().attempts, 2)
+
+    def test_worker_gives_up_after_max_attempts(self):
+        send_mail_new_review("A paper", "author@example.com")
+        OutgoingEmail.objects.update(attempts=3)
+        self.send_queued_mail(max_attempts=3)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class StaffRecipientsTest(APITestCase):
+    """
+        Ensure that the cached staff emails follow the changes to the staff members.
+    """
+
+    def setUp(self):
+        cache.delete(STAFF_RECIPIENTS_CACHE_KEY)
+        self.editor = User.objects.create_user('editor', 'editor@example.com', 'password', is_staff=True)
+        User.objects.create_user('noemail', '', 'password', is_staff=True)
+        self.user = User.objects.create_user('user', 'user@example.com', 'password')
+
+    def test_staff_members_are_cached(self):
+        self.assertEqual(get_staff_members(), ['editor@example.com'])
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(get_staff_members(), ['editor@example.com'])
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_cache_is_invalidated_by_staff_changes(self):
+        get_staff_members()
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(get_staff_members(), ['editor@example.com', 'user@example.com'])
+
+        self.editor.email = 'new@example.com'
+        self.editor.save()
+        self.assertEqual(get_staff_members(), ['new@example.com', 'user@example.com'])
+
+        User.objects.get(pk=self.user.pk).delete()
+        self.assertEqual(get_staff_members(), ['new@example.com'])
+
+        user = User.objects.only('pk').get(pk=self.editor.pk)
+        user.is_staff = False
+        user.save()
+        self.assertEqual(get_staff_members(), [])
+
+        user = User.objects.create_user('another', 'another@example.com', 'password', is_staff=True)
+        self.assertEqual(get_staff_members(), ['another@example.com'])
+        User.objects.only('pk').get(pk=user.pk).delete()
+        self.assertEqual(get_staff_members(), [])
+
+    def test_other_users_dont_invalidate_the_cache(self):
+        get_staff_members()
+        self.user.first_name = 'Name'
+        self.user.save()
+        User.objects.create_user('another', 'another@example.com', 'password')
+        with CaptureQueriesContext(connection) as context:
+            get_staff_members()
+        self.assertEqual(len(context.captured_queries), 0)
+
+
+class PrincipalCacheTest(APITestCase):
+    """
+        Ensure that the authenticated users and their roles are cached per token and follow the changes to them.
+    """
+
+    def setUp(self):
+        self.editor = User.objects.create_user('editor', 'editor@example.com', 'password', is_staff=True)
+        self.user = User.objects.create_user('user', 'user@example.com', 'password')
+        self.paper = Paper.objects.create(user=self.user, title="Paper", description="Abstract", authors="Authors")
+        self.token = self.token_for(self.user)
+
+    def token_for(self, user):
+        return "JWT {}".format(api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(user)))
+
+    def test_authenticated_user_is_cached(self):
+        url = reverse('api:api-test-protected')
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=self.token).status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_disabled_user_is_rejected(self):
+        url = reverse('api:api-test-protected')
+        self.client.get(url, HTTP_AUTHORIZATION=self.token)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(url, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_roles_follow_paper_changes(self):
+        payload = api_settings.JWT_PAYLOAD_HANDLER(self.editor)
+        self.assertFalse(get_principal(self.editor.pk, payload['iat']).edits_under_review)
+        change_editor(self.paper, self.editor)
+        self.assertTrue(get_principal(self.editor.pk, payload['iat']).edits_under_review)
+
+        self.assertEqual(get_principal(self.user.pk, payload['iat']).reviewing, frozenset())
+        self.paper.reviewers.add(self.user)
+        self.assertEqual(get_principal(self.user.pk, payload['iat']).reviewing, {self.paper.pk})
+        self.user.paper_set.clear()
+        self.assertEqual(get_principal(self.user.pk, payload['iat']).reviewing, frozenset())
+
+        Paper.objects.get(pk=self.paper.pk).delete()
+        self.assertFalse(get_principal(self.editor.pk, payload['iat']).edits_under_review)
+
+    def test_removed_reviewer_cant_review(self):
+        self.paper.reviewers.add(self.user)
+        url = reverse('api:api-review-add')
+        data = {'paper': self.paper.pk, 'appropriate': 'appropriate', 'recommendation': '+1', 'comment': 'Fine.'}
+        self.client.get(reverse('api:api-test-protected'), HTTP_AUTHORIZATION=self.token)
+        self.paper.reviewers.clear()
+        response = self.client.post(url, data, format='json', HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class QueryPlanTest(APITestCase):
+    """
+        Ensure that the hot filters on papers and reviews are answered from their composite indexes and that a user
+        can't store two reviews of a paper.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('user', 'user@example.com', 'password')
+        self.paper = Paper.objects.create(user=self.user, editor=self.user, status='under_review')
+
+    def index_on(self, model, columns):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        return next(name for name, constraint in constraints.items()
+                    if constraint['columns'] == list(columns) and (constraint['index'] or constraint['unique']))
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    @skipUnless(connection.vendor == 'sqlite', "The plans are read in SQLite's format.")
+    def test_hot_filters_use_composite_indexes(self):
+        # As in the EXISTS of the principal, the editor's papers newest first have their own index.
+        plan = self.query_plan(Paper.objects.filter(editor=self.user, status='under_review').order_by())
+        self.assertIn(self.index_on(Paper, ('editor_id', 'status')), plan)
+
+        plan = self.query_plan(Paper.objects.filter(editor=self.user).order_by('-created', '-id'))
+        self.assertIn(self.index_on(Paper, ('editor_id', 'created')), plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        plan = self.query_plan(Paper.objects.filter(user=self.user).order_by('-created'))
+        self.assertIn(self.index_on(Paper, ('user_id', 'created')), plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        plan = self.query_plan(Review.objects.filter(paper=self.paper, editor_review=True))
+        self.assertIn(self.index_on(Review, ('paper_id', 'editor_review')), plan)
+
+        plan = self.query_plan(Review.objects.filter(user=self.user, paper=self.paper))
+        self.assertIn(self.index_on(Review, ('user_id', 'paper_id')), plan)
+
+    def test_review_is_unique_per_user_and_paper(self):
+        review = {'user': self.user, 'paper': self.paper, 'editor_review': False, 'appropriate': 'appropriate',
+                  'recommendation': '+1'}
+        Review.objects.create(**review)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Review.objects.create(**review)
+        self.assertEqual(self.paper.reviews.count(), 1)
+
+
+class MetricsTest(APITestCase):
+    """
+        Ensure that the requests are measured by route and the metrics of all the processes are served to staff and
+        local scrapers.
+    """
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        self.token = "JWT {}".format(api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(self.staff)))
+
+    def test_requests_are_measured_by_route(self):
+        self.client.get(reverse('api:api-papers-count'))
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION=self.token, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        text = response.content.decode('utf-8')
+        self.assertIn('acrevista_http_requests_total{route="api-papers-count",method="GET",status="200"}', text)
+        self.assertIn('acrevista_http_request_queries_bucket{route="api-papers-count",le="1"}', text)
+        self.assertIn('acrevista_http_response_size_bytes_count{route="api-papers-count"}', text)
+
+    def test_queries_are_counted(self):
+        totals = metrics.registry.collect()
+        before = totals.get(('acrevista_http_request_queries', (('route', 'api-papers-count'),)))
+        self.client.get(reverse('api:api-papers-count'))
+        after = metrics.registry.collect()[('acrevista_http_request_queries', (('route', 'api-papers-count'),))]
+        # One more request that ran one query.
+        self.assertEqual(after[-1] - (before[-1] if before else 0), 1)
+        self.assertEqual(after[-2] - (before[-2] if before else 0), 1)
+
+    def test_only_staff_and_local_scrapers_can_read_metrics(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='127.0.0.1').status_code, status.HTTP_200_OK)
+        self.assertIn(self.client.get(url, REMOTE_ADDR='10.0.0.1').status_code,
+                      (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.assertIn(self.client.get(url, REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='10.0.0.1').status_code,
+                      (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_processes_are_added_up(self):
+        directory = mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        labels = [['route', 'api-papers-count'], ['method', 'GET'], ['status', 200]]
+        with open(os.path.join(directory, 'metrics-1-1.json'), 'w') as file:
+            json.dump([['acrevista_http_requests_total', labels, 41]], file)
+
+        with override_settings(METRICS_DIR=directory):
+            registry = metrics.Registry()
+            registry.inc('acrevista_http_requests_total', tuple(tuple(label) for label in labels))
+            text = metrics.render(registry.collect())
+        self.assertIn('acrevista_http_requests_total{route="api-papers-count",method="GET",status="200"} 42', text)
+        self.assertEqual(len(os.listdir(directory)), 2)
+
+
+class SQLProfilingTest(APITestCase):
+    """
+        Ensure that the profiled requests over the thresholds are logged with their worst statements and where they
+        run.
+    """
+
+    def test_statements_are_fingerprinted(self):
+        sql = 'SELECT "a" FROM "t" WHERE "id" IN (1, 2,3) AND "b" = \'x\'\n  LIMIT 21'
+        self.assertEqual(profiling.fingerprint(sql),
+                         'SELECT "a" FROM "t" WHERE "id" IN (...) AND "b" = ? LIMIT ?')
+        self.assertEqual(profiling.fingerprint('SELECT "a" FROM "t" WHERE "id" IN (%s, %s)'),
+                         'SELECT "a" FROM "t" WHERE "id" IN (...)')
+
+    def test_queries_are_traced_to_serializer_fields(self):
+        user = User.objects.create_user('user', 'user@example.com', 'password')
+        paper = Paper.objects.create(user=user)
+
+        class ReviewCountSerializer(serializers.ModelSerializer):
+            review_count = serializers.IntegerField(source='reviews.count')
+
+            class Meta:
+                model = Paper
+                fields = ('id', 'review_count')
+
+        profile = profiling.local.profile = profiling.Profile()
+        try:
+            ReviewCountSerializer(paper).data
+        finally:
+            profiling.local.profile = None
+        (sql, statement), = profile.worst()
+        self.assertIn('journal_review', sql)
+        self.assertEqual(statement['field'], 'ReviewCountSerializer.review_count')
+        self.assertIn('api/test.py', statement['stack'][0])
+
+    def test_requests_over_the_thresholds_are_logged(self):
+        url = reverse('api:api-papers-count')
+        with override_settings(SQL_PROFILING=True, SQL_PROFILING_SAMPLE_RATE=1.0, SQL_PROFILING_MAX_QUERIES=0):
+            with self.assertLogs('api.profiling', 'WARNING') as logs:
+                self.client.get(url)
+        self.assertIn('GET {} (api-papers-count): 1 queries'.format(url), logs.output[0])
+        self.assertIn('journal_papercounter', logs.output[0])
+
+        # Requests out of the sample aren't profiled.
+        with override_settings(SQL_PROFILING=True, SQL_PROFILING_SAMPLE_RATE=0.0, SQL_PROFILING_MAX_QUERIES=0):
+            with self.assertRaises(AssertionError), self.assertLogs('api.profiling', 'WARNING'):
+                self.client.get(url)
+
+
+class LoggingTest(APITestCase):
+    """
+        Ensure that the records are written by the queue listener as JSON lines with the request's id, user and route.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('user', 'user@example.com', 'password')
+        self.token = "JWT {}".format(api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(self.user)))
+
+    def test_records_have_the_request_context(self):
+        stream = StringIO()
+        handler = log.QueueHandler([{'class': 'logging.StreamHandler', 'stream': stream,
+                                     'formatter': 'acrevista.log.JSONFormatter'}])
+        handler.addFilter(log.RequestContextFilter())
+        logger = logging.getLogger('api.profiling')
+        logger.addHandler(handler)
+        try:
+            with override_settings(SQL_PROFILING=True, SQL_PROFILING_SAMPLE_RATE=1.0, SQL_PROFILING_MAX_QUERIES=0):
+                response = self.client.get(reverse('api:api-test-protected'), HTTP_AUTHORIZATION=self.token,
+                                           HTTP_X_REQUEST_ID='request-1')
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+        self.assertEqual(response['X-Request-ID'], 'request-1')
+        record = json.loads(stream.getvalue().splitlines()[0])
+        self.assertEqual(record['level'], 'WARNING')
+        self.assertEqual(record['logger'], 'api.profiling')
+        self.assertEqual(record['request_id'], 'request-1')
+        self.assertEqual(record['user_id'], self.user.pk)
+        self.assertEqual(record['route'], 'api-test-protected')
+
+    def stream_handler(self, stream, **kwargs):
+        return log.QueueHandler([{'class': 'logging.StreamHandler', 'stream': stream,
+                                  'formatter': 'acrevista.log.JSONFormatter'}], **kwargs)
+
+    def record(self, msg, *args):
+        return logging.LogRecord('api', logging.INFO, __file__, 0, msg, args, None)
+
+    def test_dropped_records_are_reported(self):
+        stream = StringIO()
+        handler = self.stream_handler(stream, queue_size=2)
+        handler.start()
+        # The writer falls behind.
+        handler.listener.stop()
+        for index in range(3):
+            handler.handle(self.record('Record %d', index))
+        self.assertEqual(handler.dropped, 1)
+        handler.listener.start()
+        while not handler.queue.empty():
+            time.sleep(0.01)
+        handler.handle(self.record('Record 3'))
+        handler.close()
+
+        messages = [json.loads(line)['message'] for line in stream.getvalue().splitlines()]
+        self.assertEqual(messages, ['Record 0', 'Record 1', 'Record 3',
+                                    '1 log records were dropped, the log queue was full.'])
+
+    def test_forked_process_starts_its_own_listener(self):
+        stream = StringIO()
+        handler = self.stream_handler(stream)
+        handler.handle(self.record('In the parent'))
+        parent = handler.listener
+        try:
+            with mock.patch('acrevista.log.os.getpid', return_value=os.getpid() + 1):
+                handler.handle(self.record('In the child'))
+                self.assertIsNot(handler.listener, parent)
+                handler.close()
+        finally:
+            parent.stop()
+        self.assertEqual(len(stream.getvalue().splitlines()), 2)
+
+    def test_requests_get_an_id(self):
+        response = self.client.get(reverse('api:api-papers-count'), HTTP_X_REQUEST_ID='not valid!')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+        self.assertIsNone(log.current_request())
+
+
+class StatusTransitionTest(APITestCase):
+    """
+        Ensure that the status of a paper follows its editor and editor review through conditional updates that
+        don't lose concurrent changes.
+    """
+
+    def setUp(self):
+        self.editor = User.objects.create_user('editor', 'editor@example.com', 'password', is_staff=True)
+        self.user = User.objects.create_user('user', 'user@example.com', 'password')
+        self.paper = Paper.objects.create(user=self.user, title="Paper", description="Abstract", authors="Authors")
+
+    def assertCountersAreExact(self):
+        names = ['total', 'editor:yes', 'editor:no'] + ['status:' + choice[0] for choice in Paper.STATUS_CHOICES]
+        counted = PaperCounter.get_values(names)
+        PaperCounter.rebuild()
+        self.assertEqual(counted, PaperCounter.get_values(names))
+
+    def test_transitions_follow_the_table(self):
+        self.assertTrue(change_editor(self.paper, self.editor))
+        self.assertEqual(self.paper.status, 'under_review')
+        self.assertTrue(transition(self.paper, 'editor_accepted'))
+        # A paper that was decided keeps its status when it loses its editor.
+        self.assertFalse(change_editor(self.paper, None))
+        self.assertFalse(transition(self.paper, 'editor_assigned'))
+
+        paper = Paper.objects.get(pk=self.paper.pk)
+        self.assertEqual((paper.status, paper.editor_id), ('accepted', None))
+        self.assertCountersAreExact()
+
+    def test_stale_paper_moves_from_its_current_status(self):
+        stale = Paper.objects.get(pk=self.paper.pk)
+        change_editor(self.paper, self.editor)
+        # The review was submitted with the paper read before the editor was set, the editor isn't overwritten.
+        self.assertTrue(transition(stale, 'editor_rejected'))
+        paper = Paper.objects.get(pk=self.paper.pk)
+        self.assertEqual((paper.status, paper.editor_id), ('preliminary_reject', self.editor.pk))
+        self.assertEqual((stale.status, stale.editor_id), ('preliminary_reject', self.editor.pk))
+        self.assertCountersAreExact()
+
+        change_editor(Paper.objects.get(pk=self.paper.pk), None)
+        self.assertFalse(transition(stale, 'editor_removed'))
+        self.assertEqual(Paper.objects.get(pk=self.paper.pk).editor_id, None)
+
+    def test_transition_gives_up_on_a_paper_that_keeps_changing(self):
+        stale = Paper.objects.get(pk=self.paper.pk)
+        change_editor(self.paper, self.editor)
+        # An outdated snapshot where another user edits the paper is read again and again.
+        with mock.patch('journal.transitions.current_state', return_value=('under_review', self.user.pk)):
+            with self.assertRaises(TransitionConflict), transaction.atomic():
+                transition(stale, 'editor_rejected')
+        self.assertEqual(Paper.objects.get(pk=self.paper.pk).status, 'under_review')
+
+    def test_admin_changes_go_through_the_transitions(self):
+        self.paper.editor = self.editor
+        PaperAdmin(Paper, admin.site).save_model(None, self.paper, mock.Mock(changed_data=['editor']), True)
+        self.assertEqual(Paper.objects.get(pk=self.paper.pk).status, 'under_review')
+
+        review = Review(user=self.editor, paper=self.paper, editor_review=True, appropriate='appropriate',
+                        recommendation='+2')
+        ReviewAdmin(Review, admin.site).save_model(None, review, mock.Mock(changed_data=[]), False)
+        self.assertEqual(Paper.objects.get(pk=self.paper.pk).status, 'accepted')
+        self.assertCountersAreExact()
+
+    def test_editor_review_only_writes_the_status(self):
+        change_editor(self.paper, self.editor)
+        review = Review.objects.create(user=self.editor, paper=self.paper, editor_review=True,
+                                       appropriate='appropriate', recommendation='+2')
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(review_saved(review))
+        updates = [query['sql'] for query in context.captured_queries
+                   if query['sql'].startswith('UPDATE "{}"'.format(Paper._meta.db_table))]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"title"', updates[0].split('WHERE')[0])
+        self.assertEqual(Paper.objects.get(pk=self.paper.pk).status, 'accepted')
+
+    def test_editor_review_through_the_api_sets_the_status(self):
+        token = "JWT {}".format(api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(self.editor)))
+        self.client.post(reverse('api:api-papers-editor-add', kwargs={'pk': self.paper.pk}),
+                         HTTP_AUTHORIZATION=token)
+        data = {'paper': self.paper.pk, 'appropriate': 'appropriate', 'recommendation': '-1', 'comment': 'No.'}
+        response = self.client.post(reverse('api:api-review-add'), data, format='json', HTTP_AUTHORIZATION=token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Paper.objects.get(pk=self.paper.pk).status, 'preliminary_reject')
+
+        data['recommendation'] = '+2'
+        response = self.client.put(reverse('api:api-paper-review', kwargs={'pk': self.paper.pk}), data,
+                                   format='json', HTTP_AUTHORIZATION=token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Paper.objects.get(pk=self.paper.pk).status, 'accepted')
+        self.assertCountersAreExact()
+
+
+class FileValidatorTest(APITestCase):
+    """
+        Ensure that the paper file validator sniffs the content type without consuming the file.
+    """
+    def test_validator_rewinds_file_and_hashes_content(self):
+        content = b"This is a plain text paper." * 100
+        upload = SimpleUploadedFile("paper.txt", content)
+        JOURNAL_PAPER_FILE_VALIDATOR(upload)
+        self.assertEqual(upload.read(), content)
+        self.assertEqual(upload.sha256, hashlib.sha256(content).hexdigest())
+
+    def test_validator_rejects_unsupported_content_type(self):
+        upload = SimpleUploadedFile("paper.txt", b"\x89PNG\r\n\x1a\n" + b"\x00" * 64)
+        with self.assertRaises(ValidationError):
+            JOURNAL_PAPER_FILE_VALIDATOR(upload)
+
+
+class PaperStorageTest(APITransactionTestCase):
+    """
+        Ensure that paper files are stored once per content and removed with their last reference.
+    """
+    def setUp(self):
+        self.media_root = mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+        self.test_user = User.objects.create_user('testuser', 'test@example.com', 'testpassword')
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def create_paper(self, content):
+        return Paper.objects.create(user=self.test_user, title="Same files",
+                                    manuscript=SimpleUploadedFile("manuscript.txt", content),
+                                    cover_letter=SimpleUploadedFile("cover_letter.txt", content))
+
+    def test_identical_files_are_stored_once(self):
+        content = b"The same text in every file."
+        first = self.create_paper(content)
+        second = self.create_paper(content)
+
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(first.manuscript.name, "blobs/{}/{}/{}.txt".format(digest[:2], digest[2:4], digest))
+        self.assertEqual(second.cover_letter.name, first.manuscript.name)
+        self.assertEqual(StoredFile.objects.get(pk=digest).references, 4)
+
+        path = second.manuscript.path
+        first.delete()
+        self.assertEqual(StoredFile.objects.get(pk=digest).references, 2)
+        self.assertTrue(os.path.exists(path))
+
+        second.delete()
+        self.assertFalse(StoredFile.objects.filter(pk=digest).exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_replaced_files_are_released(self):
+        old, new = b"The first version.", b"The second version."
+        paper = Paper.objects.get(pk=self.create_paper(old).pk)
+        path = paper.manuscript.path
+        paper.manuscript = SimpleUploadedFile("manuscript.txt", new)
+        paper.save()
+        self.assertEqual(StoredFile.objects.get(pk=hashlib.sha256(old).hexdigest()).references, 1)
+        self.assertEqual(StoredFile.objects.get(pk=hashlib.sha256(new).hexdigest()).references, 1)
+
+        review = Review.objects.create(user=self.test_user, paper=paper, editor_review=False,
+                                       appropriate='appropriate', recommendation='+1',
+                                       additional_file=SimpleUploadedFile("review.txt", old))
+        self.assertEqual(StoredFile.objects.get(pk=hashlib.sha256(old).hexdigest()).references, 2)
+        review = Review.objects.get(pk=review.pk)
+        review.additional_file = SimpleUploadedFile("review.txt", new)
+        review.save()
+        paper.cover_letter = SimpleUploadedFile("cover_letter.txt", new)
+        paper.save()
+        self.assertFalse(StoredFile.objects.filter(pk=hashlib.sha256(old).hexdigest()).exists())
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(StoredFile.objects.get(pk=hashlib.sha256(new).hexdigest()).references, 3)
+
+    def test_existing_files_are_migrated(self):
+        paper = Paper.objects.create(user=self.test_user)
+        for name in ("papers/1/manuscript.txt", "papers/1/cover_letter.txt"):
+            os.makedirs(os.path.join(self.media_root, "papers/1"), exist_ok=True)
+            with open(os.path.join(self.media_root, name), "wb") as original:
+                original.write(b"An old upload.")
+        Paper.objects.filter(pk=paper.pk).update(manuscript="papers/1/manuscript.txt",
+                                                 cover_letter="papers/1/cover_letter.txt")
+
+        call_command('migrate_media_to_blobs', stdout=StringIO())
+        paper.refresh_from_db()
+        self.assertTrue(paper.manuscript.name.startswith("blobs/"))
+        self.assertEqual(paper.manuscript.name, paper.cover_letter.name)
+        self.assertEqual(paper.manuscript.read(), b"An old upload.")
+        self.assertEqual(StoredFile.objects.get(name=paper.manuscript.name).references, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, "papers/1/manuscript.txt")))
+
+
+class PaperFileTest(APITestCase):
+    """
+        Ensure that paper and review files are downloaded with permission checks, conditional and range requests.
+    """
+    content = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+    def setUp(self):
+        self.media_root = mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root, PAPER_FILES_SENDFILE=None)
+        self.settings.enable()
+        self.author = User.objects.create_user('author', 'author@example.com', 'testpassword')
+        self.other = User.objects.create_user('other', 'other@example.com', 'testpassword')
+        self.paper = Paper.objects.create(user=self.author, title="Paper",
+                                          manuscript=SimpleUploadedFile("manuscript.pdf", self.content),
+                                          cover_letter=SimpleUploadedFile("cover_letter.pdf", b"Cover letter"))
+        self.url = reverse('api:api-paper-file', kwargs={'pk': self.paper.pk, 'field': 'manuscript'})
+        self.client.force_authenticate(user=self.author)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_owner_can_download_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['ETag'], '"{}"'.format(hashlib.sha256(self.content).hexdigest()))
+        self.assertIn('paper-{}-manuscript.pdf'.format(self.paper.pk), response['Content-Disposition'])
+
+    def test_other_users_cant_download_file(self):
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_reviewers_can_download_file(self):
+        reviewer = User.objects.create_user('reviewer', 'reviewer@example.com', 'testpassword')
+        self.paper.reviewers.add(reviewer, self.author)
+        self.client.force_authenticate(user=reviewer)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+
+        # The submitter is found once even when they review their own paper.
+        self.client.force_authenticate(user=self.author)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_missing_file_is_not_found(self):
+        url = reverse('api:api-paper-file', kwargs={'pk': self.paper.pk, 'field': 'supplementary_materials'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/{}'.format(len(self.content)))
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b"".join(response.streaming_content), self.content[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(b"".join(response.streaming_content), self.content[1000:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes={}-'.format(len(self.content)))
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_file_is_handed_to_the_proxy(self):
+        with override_settings(PAPER_FILES_SENDFILE='x-accel-redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.paper.manuscript.name)
+        self.assertEqual(response.content, b"")
+
+    def test_review_file_permissions(self):
+        editor = User.objects.create_user('editor', 'editor@example.com', 'testpassword')
+        Paper.objects.filter(pk=self.paper.pk).update(editor=editor)
+        review = Review.objects.create(paper=self.paper, user=self.other, editor_review=False,
+                                       appropriate='appropriate', recommendation='+1', comment='Fine.',
+                                       additional_file=SimpleUploadedFile("review.pdf", self.content))
+        url = reverse('api:api-review-file', kwargs={'pk': review.pk})
+
+        for user, expected in ((self.other, status.HTTP_200_OK), (editor, status.HTTP_200_OK),
+                               (self.author, status.HTTP_404_NOT_FOUND)):
+            self.client.force_authenticate(user=user)
+            self.assertEqual(self.client.get(url).status_code, expected)
+
+    def test_payloads_link_to_the_download_views(self):
+        response = self.client.get(reverse('api:api-paper-detail', kwargs={'pk': self.paper.pk}))
+        self.assertEqual(response.data['manuscript'], 'http://testserver' + self.url)
+        self.assertIsNone(response.data['supplementary_materials'])
+        self.assertIn(self.url, PaperAdmin.file_link(self.paper))
+        # The storage URL isn't served, it would skip the permission checks.
+        with self.assertRaises(Resolver404):
+            resolve(self.paper.manuscript.url)
+
 
 class PaperTest(APITestCase):
     """
@@ -373,13 +1125,57 @@ class PaperTest(APITestCase):
         response = self.client.get(self.papers_count, None, content_type='application/json')
         self.assertEqual(response.data, 1)
 
+    def test_get_number_of_papers_by_status(self):
+        """
+            Ensure that the paper counters follow paper creation, status and editor changes and deletion.
+        """
+        paper = Paper.objects.create(user=self.test_user)
+        Paper.objects.create(user=self.test_user, editor=self.test_user, status='under_review')
+
+        response = self.client.get(self.papers_count, {'by': 'status'})
+        self.assertEqual(response.data, {'processing': 1, 'under_review': 1, 'preliminary_reject': 0, 'accepted': 0})
+
+        change_editor(paper, self.test_user)
+        review_saved(Review.objects.create(user=self.test_user, paper=paper, appropriate="appropriate",
+                                           editor_review=True, recommendation="+2"))
+        response = self.client.get(self.papers_count, {'by': 'status'})
+        self.assertEqual(response.data, {'processing': 0, 'under_review': 1, 'preliminary_reject': 0, 'accepted': 1})
+
+        Paper.objects.get(pk=paper.pk).delete()
+        response = self.client.get(self.papers_count, {'by': 'editor'})
+        self.assertEqual(response.data, {'with_editor': 1, 'without_editor': 0})
+        self.assertEqual(self.client.get(self.papers_count).data, 1)
+
+        # Rebuilding from the table gives the same counts.
+        counters = dict(PaperCounter.objects.values_list('name', 'value'))
+        PaperCounter.rebuild()
+        self.assertEqual(dict(PaperCounter.objects.values_list('name', 'value')), counters)
+
+        response = self.client.get(self.papers_count, {'by': 'title'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_missing_paper_counters_count_zero(self):
+        """
+            Ensure that reading the counts never rebuilds the counters and that missing counters start at 0.
+        """
+        PaperCounter.objects.all().delete()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.papers_count, {'by': 'status'})
+        self.assertEqual(response.data, {'processing': 0, 'under_review': 0, 'preliminary_reject': 0, 'accepted': 0})
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertFalse(PaperCounter.objects.exists())
+
+        Paper.objects.create(user=self.test_user)
+        self.assertEqual(PaperCounter.get_values(['total', 'status:processing', 'editor:no', 'editor:yes']),
+                         {'total': 1, 'status:processing': 1, 'editor:no': 1, 'editor:yes': 0})
+
     def test_user_can_get_own_papers(self):
         """
             Ensure than an user can list it's own submitted papers.
         """
         response = self.client.get(self.papers_submitted, None, content_type='application/json',
                                    HTTP_AUTHORIZATION=self.authorization_header)
-        self.assertEqual(response.data, [])
+        self.assertEqual(response.data["results"], [])
 
         Paper.objects.create(user=self.test_user)
         response = self.client.get(self.papers_submitted, None, content_type='application/json',
@@ -387,7 +1183,7 @@ class PaperTest(APITestCase):
 
         # The response will now be an array of order dicts that will have the user pk equal to the test user's.
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["user"]["id"], self.test_user.pk)
+        self.assertEqual(response.data["results"][0]["user"]["id"], self.test_user.pk)
 
     def test_user_can_list_all_papers(self):
         """
@@ -405,7 +1201,173 @@ class PaperTest(APITestCase):
         response = self.client.get(self.papers_all, None, content_type='application/json',
                                    HTTP_AUTHORIZATION=self.authorization_header)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_user_can_page_through_all_papers(self):
+        """
+            Ensure that the paper lists are paginated with an opaque cursor and that pages don't overlap.
+        """
+        self.test_user.is_staff = True
+        self.test_user.save()
+        papers = [Paper.objects.create(user=self.test_user, title=str(i)) for i in range(5)]
+
+        response = self.client.get(self.papers_all, {'page_size': 2}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["previous"])
+        titles = [paper["title"] for paper in response.data["results"]]
+
+        while response.data["next"]:
+            response = self.client.get(response.data["next"], HTTP_AUTHORIZATION=self.authorization_header)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles += [paper["title"] for paper in response.data["results"]]
+        self.assertEqual(titles, [paper.title for paper in reversed(papers)])
+
+        # Going back returns the previous page.
+        response = self.client.get(response.data["previous"], HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual([paper["title"] for paper in response.data["results"]], ["2", "1"])
+
+    def test_papers_page_size_is_capped(self):
+        """
+            Ensure that the page size can't go over the configured maximum and that invalid cursors are rejected.
+        """
+        from api.pagination import KeysetPagination
+
+        self.test_user.is_staff = True
+        self.test_user.save()
+        for _ in range(3):
+            Paper.objects.create(user=self.test_user)
+
+        max_page_size = KeysetPagination.max_page_size
+        try:
+            KeysetPagination.max_page_size = 2
+            response = self.client.get(self.papers_all, {'page_size': 1000},
+                                       HTTP_AUTHORIZATION=self.authorization_header)
+        finally:
+            KeysetPagination.max_page_size = max_page_size
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(self.papers_all, {'cursor': 'garbage'}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_paper_list_runs_constant_number_of_queries(self):
+        """
+            Ensure that listing papers doesn't run extra queries for each paper's user, editor and reviewers.
+        """
+        self.test_user.is_staff = True
+        self.test_user.save()
+        reviewers = [User.objects.create_user('reviewer{}'.format(i), 'r{}@example.com'.format(i), 'pass')
+                     for i in range(3)]
+
+        def list_papers():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(self.papers_all, HTTP_AUTHORIZATION=self.authorization_header)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        Paper.objects.create(user=self.test_user, editor=reviewers[0]).reviewers.add(*reviewers)
+        queries = list_papers()
+
+        for reviewer in reviewers:
+            Paper.objects.create(user=reviewer, editor=self.test_user).reviewers.add(*reviewers)
+        self.assertEqual(list_papers(), queries)
+
+    def test_unchanged_papers_are_not_modified(self):
+        """
+            Ensure that polling unchanged papers returns 304 without serializing them.
+        """
+        reviewer = User.objects.create_user('reviewer', 'reviewer@example.com', 'pass')
+        paper = Paper.objects.create(user=self.test_user, title="Polled")
+        detail = reverse('api:api-paper-detail', kwargs={'pk': paper.pk})
+
+        for url in (self.papers_submitted, detail):
+            response = self.client.get(url, HTTP_AUTHORIZATION=self.authorization_header)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etag = response['ETag']
+
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, HTTP_AUTHORIZATION=self.authorization_header, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(len(context.captured_queries), 1)  # The validator, the user is cached.
+
+            paper.reviewers.add(reviewer)
+            response = self.client.get(url, HTTP_AUTHORIZATION=self.authorization_header, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response['ETag'], etag)
+            paper.reviewers.clear()
+
+    def test_paper_etag_follows_changes(self):
+        """
+            Ensure that the paper lists change their ETag when papers or their users change.
+        """
+        paper = Paper.objects.create(user=self.test_user, title="Polled")
+
+        def etag():
+            return self.client.get(self.papers_submitted, HTTP_AUTHORIZATION=self.authorization_header)['ETag']
+
+        first = etag()
+        self.assertEqual(etag(), first)
+        paper.title = "Changed"
+        paper.save()
+        second = etag()
+        self.assertNotEqual(second, first)
+
+        self.test_user.first_name = "Renamed"
+        self.test_user.save()
+        third = etag()
+        self.assertNotEqual(third, second)
+
+        Paper.objects.create(user=self.test_user, title="Another")
+        fourth = etag()
+        self.assertNotEqual(fourth, third)
+        paper.delete()
+        self.assertNotEqual(etag(), fourth)
+
+    def test_search_papers(self):
+        """
+            Ensure that papers are found by their title, description and authors, best match first, and that users only
+            find the papers they can see.
+        """
+        other = User.objects.create_user('other', 'other@example.com', 'pass')
+        in_description = Paper.objects.create(user=self.test_user, title="Neural networks",
+                                              description="Applied to graph coloring.", authors="(Ann, Lee)")
+        in_title = Paper.objects.create(user=self.test_user, title="Graph coloring heuristics",
+                                        description="A survey.", authors="(Bob, Ray)")
+        Paper.objects.create(user=other, title="Graph coloring for others", description="Hidden.", authors="")
+        search = reverse('api:api-papers-search')
+
+        def found(query, **params):
+            params['q'] = query
+            response = self.client.get(search, params, HTTP_AUTHORIZATION=self.authorization_header)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [paper['id'] for paper in response.data['results']]
+
+        self.assertEqual(found("graph coloring"), [in_title.pk, in_description.pk])
+        self.assertEqual(found("colo"), [in_title.pk, in_description.pk])  # Prefix of the last word.
+        self.assertEqual(found("ray"), [in_title.pk])
+        self.assertEqual(found("graph OR \"neural"), [])  # Operators are plain words.
+
+        response = self.client.get(search, {'q': 'graph', 'limit': 1}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get(response.data['next'], HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual([paper['id'] for paper in response.data['results']], [in_description.pk])
+        self.assertIsNone(response.data['next'])
+
+        # The index follows updates and deletes.
+        in_description.title = "Convolutions"
+        in_description.save()
+        self.assertEqual(found("neural"), [])
+        self.assertEqual(found("convolutions"), [in_description.pk])
+        in_title.delete()
+        self.assertEqual(found("heuristics"), [])
+
+        self.test_user.is_staff = True
+        self.test_user.save()
+        self.assertEqual(len(found("graph")), 2)
+
+        response = self.client.get(search, {'q': ' '}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_user_can_list_editor_self_papers(self):
         """
@@ -416,7 +1378,7 @@ class PaperTest(APITestCase):
         response = self.client.get(reverse("api:api-papers-editor-self"), None, content_type='application/json',
                                    HTTP_AUTHORIZATION=self.authorization_header)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["editor"]["id"], self.test_user.pk)
+        self.assertEqual(response.data["results"][0]["editor"]["id"], self.test_user.pk)
 
     def test_user_can_list_editor_papers(self):
         """
@@ -434,7 +1396,7 @@ class PaperTest(APITestCase):
         response = self.client.get(self.papers_no_editor, None, content_type='application/json',
                                    HTTP_AUTHORIZATION=self.authorization_header)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["title"], "NoEditorPaper")
+        self.assertEqual(response.data["results"][0]["title"], "NoEditorPaper")
 
     def test_user_can_list_no_editor_papers(self):
         """
@@ -452,7 +1414,7 @@ class PaperTest(APITestCase):
         response = self.client.get(self.papers_no_editor, None, content_type='application/json',
                                    HTTP_AUTHORIZATION=self.authorization_header)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["title"], "NoEditorPaper")
+        self.assertEqual(response.data["results"][0]["title"], "NoEditorPaper")
 
     def test_user_can_submit_a_paper(self):
         """
@@ -612,6 +1574,153 @@ class PaperTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(paper.reviewers.last(), None)
 
+    def test_staff_can_change_reviewers_in_bulk(self):
+        """
+            Ensure that a staff member can add and remove the reviewers of many papers at once and that the invalid
+            operations are reported without aborting the batch.
+        """
+        url = reverse('api:api-papers-reviewers-bulk')
+        first = Paper.objects.create(user=self.test_user)
+        second = Paper.objects.create(user=self.test_user)
+        reviewers = [User.objects.create_user('reviewer{}'.format(i), '', 'password') for i in range(3)]
+        first.reviewers.add(reviewers[0])
+        data = [
+            {'paper': first.pk, 'add': [reviewers[1].pk, reviewers[2].pk], 'remove': [reviewers[0].pk]},
+            {'paper': second.pk, 'add': [reviewers[0].pk, 999999]},
+            {'paper': 999999, 'add': [reviewers[0].pk]},
+            {'paper': 'first'},
+        ]
+
+        response = self.client.post(url, data, format='json', HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.test_user.is_staff = True
+        self.test_user.save()
+        stamp = Paper.objects.get(pk=first.pk).updated
+        response = self.client.post(url, data, format='json', HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['papers'], [
+            {'paper': first.pk, 'added': [reviewers[1].pk, reviewers[2].pk], 'removed': [reviewers[0].pk]},
+            {'paper': second.pk, 'added': [reviewers[0].pk], 'removed': []},
+        ])
+        self.assertEqual([(error['operation'], error.get('user')) for error in response.data['errors']],
+                         [(1, 999999), (2, None), (3, None)])
+        self.assertEqual(set(first.reviewers.all()), {reviewers[1], reviewers[2]})
+        self.assertEqual(list(second.reviewers.all()), [reviewers[0]])
+        self.assertGreater(Paper.objects.get(pk=first.pk).updated, stamp)
+
+        # Applying the same batch again changes nothing.
+        response = self.client.post(url, data[:2], format='json', HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.data['papers'], [
+            {'paper': first.pk, 'added': [], 'removed': []},
+            {'paper': second.pk, 'added': [], 'removed': []},
+        ])
+
+        response = self.client.post(url, {'paper': first.pk}, format='json',
+                                    HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staff_can_export_papers(self):
+        """
+            Ensure that a staff member can export the papers with their reviews as NDJSON and CSV.
+        """
+        reviewer = User.objects.create_user('reviewer', 'reviewer@example.com', 'password')
+        papers = [Paper.objects.create(user=self.test_user, title="Paper {}".format(i)) for i in range(3)]
+        papers[0].reviewers.add(reviewer)
+        Review.objects.create(paper=papers[0], user=reviewer, editor_review=False, appropriate='appropriate',
+                              recommendation='+1', comment='Fine.', confidential_comment='Really fine.')
+        ndjson = reverse('api:api-papers-export', kwargs={'export_format': 'ndjson'})
+        response = self.client.get(ndjson, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.test_user.is_staff = True
+        self.test_user.save()
+        response = self.client.get(ndjson, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual([line['id'] for line in lines], [paper.pk for paper in papers])
+        self.assertEqual(lines[0]['submitter']['email'], 'test@example.com')
+        self.assertEqual(lines[0]['submitter']['country'], 'Romania')
+        self.assertEqual([reviewer['email'] for reviewer in lines[0]['reviewers']], ['reviewer@example.com'])
+        self.assertEqual(lines[0]['reviews'][0]['confidential_comment'], 'Really fine.')
+        self.assertEqual(lines[1]['reviews'], [])
+
+        response = self.client.get(reverse('api:api-papers-export', kwargs={'export_format': 'csv'}),
+                                   {'status': 'processing'}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual([row['paper_id'] for row in rows], [str(paper.pk) for paper in papers])
+        self.assertEqual(rows[0]['reviewers'], 'reviewer@example.com')
+        self.assertEqual(rows[0]['review_recommendation'], '+1')
+        self.assertEqual(rows[1]['review_id'], '')
+
+        response = self.client.get(ndjson, {'status': 'lost'}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_reads_papers_in_chunks(self):
+        """
+            Ensure that the export command reads a constant number of papers per query.
+        """
+        for i in range(5):
+            Paper.objects.create(user=self.test_user, title="Paper {}".format(i))
+        output = StringIO()
+        with CaptureQueriesContext(connection) as context:
+            call_command('export_papers', format='ndjson', chunk_size=2, stdout=output)
+        self.assertEqual(len(output.getvalue().splitlines()), 5)
+        # 3 chunks of papers, reviewers and reviews and the query that finds no more papers.
+        self.assertEqual(len(context.captured_queries), 3 * 3 + 1)
+
+    def test_paper_authors_are_parsed(self):
+        """
+            Ensure that the authors text is parsed into Author rows that follow its changes.
+        """
+        self.assertEqual(parse_authors("(Ann, Lee, Ann@Example.com, University, Inc., Romania, Yes)\n(Bob, Ray)"), [
+            {'first_name': 'Ann', 'last_name': 'Lee', 'email': 'ann@example.com', 'affiliation': 'University, Inc.',
+             'country': 'Romania', 'corresponding': True},
+            {'first_name': 'Bob', 'last_name': 'Ray', 'email': '', 'affiliation': '', 'country': '',
+             'corresponding': False},
+        ])
+        self.assertEqual(parse_authors("no authors"), [])
+
+        paper = Paper.objects.create(user=self.test_user, authors="(Ann, Lee, ann@example.com, MIT, Romania, Yes)")
+        self.assertEqual(list(paper.author_list.values_list('email', 'position')), [('ann@example.com', 0)])
+        paper = Paper.objects.get(pk=paper.pk)
+        paper.authors += "\n(Bob, Ray, bob@example.com, MIT, Romania, No)"
+        paper.save()
+        self.assertEqual(list(paper.author_list.values_list('email', flat=True)),
+                         ['ann@example.com', 'bob@example.com'])
+
+        with CaptureQueriesContext(connection) as context:
+            Paper.objects.get(pk=paper.pk).save()
+        self.assertFalse([query for query in context.captured_queries if 'journal_author' in query['sql']])
+
+        Author.objects.all().delete()
+        call_command('build_authors', batch_size=1, stdout=StringIO())
+        self.assertEqual(Author.objects.count(), 2)
+
+    def test_staff_can_list_papers_by_author(self):
+        """
+            Ensure that a staff member can find the papers of an author by email, affiliation or country.
+        """
+        url = reverse('api:api-papers-by-author')
+        first = Paper.objects.create(user=self.test_user, authors="(Ann, Lee, ann@example.com, MIT, Romania, Yes)\n"
+                                                                  "(Bob, Ray, bob@example.com, MIT, Romania, No)")
+        Paper.objects.create(user=self.test_user, authors="(Bob, Ray, bob@example.com, CMU, Spain, Yes)")
+        response = self.client.get(url, {'email': 'ann@example.com'}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.test_user.is_staff = True
+        self.test_user.save()
+        response = self.client.get(url, {'email': 'Ann@Example.com'}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual([paper['id'] for paper in response.data['results']], [first.pk])
+        response = self.client.get(url, {'email': 'bob@example.com'}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(url, {'affiliation': 'MIT'}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual([paper['id'] for paper in response.data['results']], [first.pk])
+        response = self.client.get(url, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_user_can_list_reviewer_papers(self):
         """
             Ensure than an editor can list papers where he's assigned as a reviewer.
@@ -623,7 +1732,7 @@ class PaperTest(APITestCase):
         response = self.client.get(reverse('api:api-papers-reviewer'), None, content_type='application/json',
                                    HTTP_AUTHORIZATION=self.authorization_header)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
 
     def test_user_can_submit_review(self):
         """
@@ -657,6 +1766,28 @@ class PaperTest(APITestCase):
                                     HTTP_AUTHORIZATION=self.authorization_header)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_only_a_duplicate_review_is_reported_as_such(self):
+        """
+            Ensure that a review added by a concurrent request is reported and other integrity errors aren't hidden.
+        """
+        paper = Paper.objects.create(user=self.test_user)
+        paper.reviewers.add(self.test_user)
+        data = {"paper": paper.id, "appropriate": "not_appropriate", "recommendation": "0", "comment": "test"}
+        url = reverse('api:api-review-add')
+        with mock.patch('api.journal.review_saved', side_effect=IntegrityError('NOT NULL constraint failed')), \
+                self.assertRaises(IntegrityError):
+            self.client.post(url, data, format='json', HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(paper.reviews.count(), 0)
+
+        Review.objects.create(user=self.test_user, paper=paper, editor_review=False, appropriate='appropriate',
+                              recommendation='+1')
+        # The other request added its review after this one checked.
+        with mock.patch('api.journal.ReviewAddView.already_reviewed', side_effect=[False, True]):
+            response = self.client.post(url, data, format='json', HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['detail'], "You've already submitted a review for this paper!")
+        self.assertEqual(paper.reviews.count(), 1)
+
     def test_user_can_submit_editor_review(self):
         """
             Ensure an editor can submit an editor review.
@@ -737,7 +1868,9 @@ class PaperTest(APITestCase):
                                    HTTP_AUTHORIZATION=self.authorization_header)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
-        Review.objects.create(user=self.test_user, paper=paper,
+        # A user reviews a paper once, the editor review is another user's.
+        editor = User.objects.create_user('editor', 'editor@example.com', 'password')
+        Review.objects.create(user=editor, paper=paper,
                               appropriate="appropriate", editor_review=True,
                               recommendation="0")
         response = self.client.get(reverse('api:api-paper-reviews-editor', kwargs={'pk': paper.id}),
@@ -745,6 +1878,94 @@ class PaperTest(APITestCase):
                                    HTTP_AUTHORIZATION=self.authorization_header)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_editor_can_get_review_summaries(self):
+        """
+            Ensure that the editor of a paper gets the summary of its reviews in one query, and that the batch
+            summaries leave out the papers the user doesn't edit.
+        """
+        paper = Paper.objects.create(user=self.test_user, editor=self.test_user)
+        other_paper = Paper.objects.create(user=self.test_user)
+        for index, recommendation in enumerate(['+2', '0', '0']):
+            reviewer = User.objects.create_user('reviewer{}'.format(index), 'reviewer{}@example.com'.format(index),
+                                                'password')
+            Review.objects.create(user=reviewer, paper=paper, editor_review=False, appropriate="appropriate",
+                                  recommendation=recommendation, comment="A long comment.")
+        Review.objects.create(user=self.test_user, paper=paper, editor_review=True, appropriate="appropriate",
+                              recommendation="+1")
+        url = reverse('api:api-paper-reviews-summary', kwargs={'pk': paper.pk})
+
+        self.client.get(url, HTTP_AUTHORIZATION=self.authorization_header)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('comment', context.captured_queries[0]['sql'])
+        self.assertEqual(response.data['reviews'], 3)
+        self.assertEqual(response.data['recommendations'], {'+2': 1, '+1': 0, '0': 2, '-1': 0, '-2': 0})
+        self.assertEqual(response.data['appropriate'], {'appropriate': 3, 'not_appropriate': 0})
+        self.assertAlmostEqual(response.data['mean_score'], 2 / 3)
+        self.assertEqual(response.data['editor_verdict'], {'recommendation': '+1', 'appropriate': 'appropriate'})
+
+        response = self.client.get(reverse('api:api-paper-reviews-summary', kwargs={'pk': other_paper.pk}),
+                                   HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        url = reverse('api:api-papers-reviews-summary')
+        response = self.client.get(url, {'papers': '{},{}'.format(paper.pk, other_paper.pk)},
+                                   HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([summary['paper'] for summary in response.data], [paper.pk])
+
+        self.test_user.is_staff = True
+        self.test_user.save()
+        response = self.client.get(url, {'papers': '{},{}'.format(paper.pk, other_paper.pk)},
+                                   HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual([summary['paper'] for summary in response.data], [paper.pk, other_paper.pk])
+        self.assertEqual(response.data[1]['reviews'], 0)
+        self.assertIsNone(response.data[1]['mean_score'])
+        self.assertIsNone(response.data[1]['editor_verdict'])
+
+        response = self.client.get(url, {'papers': 'one,two'}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_editor_dashboard_shows_review_progress(self):
+        """
+            Ensure that the editor dashboard lists the papers of the editor with the progress of their reviews, in a
+            fixed number of queries, and that its ETag follows the reviews.
+        """
+        paper = Paper.objects.create(user=self.test_user, editor=self.test_user)
+        Paper.objects.create(user=self.test_user, editor=self.test_user)
+        Paper.objects.create(user=self.test_user)
+        reviewers = [User.objects.create_user('reviewer{}'.format(index), 'reviewer{}@example.com'.format(index),
+                                              'password') for index in range(2)]
+        paper.reviewers.add(*reviewers)
+        Review.objects.create(user=reviewers[0], paper=paper, editor_review=False, appropriate="appropriate",
+                              recommendation="0")
+        url = reverse('api:api-dashboard-editor')
+
+        self.client.get(url, HTTP_AUTHORIZATION=self.authorization_header)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context.captured_queries), 3)
+        self.assertEqual(len(response.data['results']), 2)
+        summary = response.data['results'][1]
+        self.assertEqual(summary['id'], paper.pk)
+        self.assertEqual(summary['reviewers_count'], 2)
+        self.assertEqual(summary['reviews_count'], 1)
+        self.assertEqual([reviewer['id'] for reviewer in summary['pending_reviewers']], [reviewers[1].pk])
+        self.assertFalse(summary['has_editor_review'])
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=self.authorization_header,
+                                         HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        Review.objects.create(user=reviewers[1], paper=paper, editor_review=False, appropriate="appropriate",
+                              recommendation="+1")
+        response = self.client.get(url, HTTP_AUTHORIZATION=self.authorization_header, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][1]['reviews_count'], 2)
+        self.assertEqual(response.data['results'][1]['pending_reviewers'], [])
+
     def test_user_can_retrieve_user_list(self):
         """
             Ensure that an user who is an editor to an active paper with status under_review can query the user list.
@@ -754,11 +1975,54 @@ class PaperTest(APITestCase):
                                    content_type='application/json',
                                    HTTP_AUTHORIZATION=self.authorization_header)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
-        # Status will be automatically changed to under review.
-        paper.editor = self.test_user
-        paper.save()
+        # The paper is under review once it has an editor.
+        change_editor(paper, self.test_user)
 
         response = self.client.get("{0}?email={1}".format(reverse('api:api-list-users'), "test"),
                                    content_type='application/json',
                                    HTTP_AUTHORIZATION=self.authorization_header)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_lookup_matches_prefixes(self):
+        """
+            Ensure that the user lookup finds users by the prefix of their email, full name or last name, ignoring
+            case and accents, and returns a capped list.
+        """
+        Paper.objects.create(user=self.test_user, editor=self.test_user, status='under_review')
+        jose = User.objects.create_user('jose', 'Jose.Avila@example.com', 'pass', first_name='José',
+                                        last_name='Ávila')
+        url = reverse('api:api-list-users')
+
+        def found(query):
+            response = self.client.get(url, {'email': query}, HTTP_AUTHORIZATION=self.authorization_header)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('lookup_email;dur=', response['Server-Timing'])
+            return [user['id'] for user in response.data]
+
+        self.assertEqual(found("jose.a"), [jose.pk])
+        self.assertEqual(found("JOSÉ ÁV"), [jose.pk])
+        self.assertEqual(found("avi"), [jose.pk])
+        self.assertEqual(found("example"), [])  # Not a prefix.
+
+        jose.email = 'pepe@example.com'
+        jose.last_name = 'Garcia'
+        jose.save()
+        self.assertEqual(found("jose.a"), [])
+        self.assertEqual(found("pepe"), [jose.pk])
+        self.assertEqual(found("garc"), [jose.pk])
+
+        response = self.client.get(url, {'email': 'pepe'}, HTTP_AUTHORIZATION=self.authorization_header)
+        self.assertEqual(response.data[0], {'id': jose.pk, 'email': 'pepe@example.com', 'first_name': 'José',
+                                            'last_name': 'Garcia', 'is_staff': False})
+
+        # 'ﬀ' decomposes into 'ff', the normalized names are cut to their columns.
+        ligatures = User.objects.create_user('ligatures', 'ligatures@example.com', 'pass', first_name='ﬀ' * 30,
+                                             last_name='ﬀ' * 30)
+        profile = Profile.objects.get(user=ligatures)
+        self.assertEqual((profile.lookup_name, profile.lookup_last_name), ('f' * 60 + ' ', 'f' * 30))
+        self.assertEqual(found('ﬀ' * 30 + ' ' + 'ﬀ' * 30), [ligatures.pk])
+
+        for i in range(5):
+            User.objects.create_user('many{}'.format(i), 'many{}@example.com'.format(i), 'pass')
+        with override_settings(USER_LOOKUP_LIMIT=3):
+            self.assertEqual(len(found("many")), 3)
@@ -0,0 +1,251 @@
+"""
+    Per-endpoint performance budgets.
+
+    Every route in api/urls.py is called against a dataset seeded by the generate_data command and must stay under
+    its budget for SQL queries and response size. The dataset size can be raised through the BUDGET_USERS and
+    BUDGET_PAPERS environment variables. Wall time depends on the machine, its budgets are only checked with
+    BUDGET_TIMING=1 and can be scaled for slow machines with BUDGET_TIME_FACTOR.
+    Set API_BUDGET_REPORT to a file path to get a JSON report that can be compared across commits.
+"""
+import json
+import os
+import shutil
+import time
+from io import StringIO
+from tempfile import mkdtemp
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_jwt.settings import api_settings
+
+from api import urls
+from journal.export import EXPORT_CHUNK_SIZE
+from journal.models import Paper, Review
+from journal.summary import MAX_SUMMARY_PAPERS
+
+USERS = int(os.environ.get('BUDGET_USERS', 2000))
+PAPERS = int(os.environ.get('BUDGET_PAPERS', 500))
+TIMING = os.environ.get('BUDGET_TIMING') == '1'
+TIME_FACTOR = float(os.environ.get('BUDGET_TIME_FACTOR', 1))
+REPORT_PATH = os.environ.get('API_BUDGET_REPORT')
+
+PASSWORD = 'testpassword'
+
+
+def budget(queries, ms=250, kb=64):
+    return {'queries': queries, 'ms': ms, 'bytes': kb * 1024}
+
+
+# url name -> budget. Endpoints that hash passwords get a bigger time budget.
+# The first request made with a token, or after the user's roles changed, loads the user and their roles with 2 queries,
+# the following ones are authenticated from the principal cache without queries.
+BUDGETS = {
+    'api-token-verify': budget(2),
+    'api-token-refresh': budget(1),
+    'api-token-login': budget(2, ms=1000),
+    'api-register': budget(3, ms=1000),
+    'api-change-password': budget(4, ms=2000),
+    'api-change-user-details': budget(6),
+    'api-list-users': budget(3, kb=8),
+    'api-profile-valid-titles': budget(0),
+    'api-profile-valid-counties': budget(0),
+    'api-papers-valid-statuses': budget(0),
+    'api-review-valid-appropriate': budget(0),
+    'api-review-valid-recommendations': budget(0),
+    'api-get-profile': budget(4),
+    'api-papers-count': budget(1),
+    'api-papers-search': budget(2, kb=128),
+    'api-papers-all': budget(3, kb=128),
+    'api-papers-editor': budget(3, kb=128),
+    'api-papers-editor-self': budget(3, kb=128),
+    'api-dashboard-editor': budget(3, kb=128),
+    'api-papers-reviewer': budget(5, kb=128),
+    'api-papers-editor-add': budget(4),
+    'api-papers-reviewer-add': budget(6),
+    'api-papers-reviewers-bulk': budget(9),
+    'api-papers-no-editor': budget(3, kb=128),
+    'api-papers-by-author': budget(3, kb=128),
+    # The export grows with the dataset, a chunk of papers costs 3 queries.
+    'api-papers-export': budget(3 + 3 * (PAPERS // EXPORT_CHUNK_SIZE + 1), ms=max(250, PAPERS // 2), kb=8 * PAPERS),
+    'api-paper-detail': budget(3),
+    'api-paper-review': budget(5),
+    'api-paper-reviews': budget(3),
+    'api-paper-reviews-editor': budget(3),
+    'api-paper-reviews-summary': budget(1),
+    'api-papers-reviews-summary': budget(1),
+    'api-papers-submitted': budget(3, kb=128),
+    'api-review-add': budget(6),
+    'api-paper-file': budget(1),
+    'api-review-file': budget(1),
+    'api-test-protected': budget(0),
+}
+
+
+class EndpointBudgetTest(APITestCase):
+    """
+        Ensure that every API endpoint stays within its query, time and size budget.
+    """
+    results = []
+    tokens = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root, PAPER_FILES_SENDFILE=None)
+        cls.media_settings.enable()
+        super(EndpointBudgetTest, cls).setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_data', users=USERS, papers=PAPERS, password=PASSWORD, seed=42, stdout=StringIO())
+        cls.editor = User.objects.filter(is_staff=True, editor_papers__status='under_review').first()
+        cls.paper = Paper.objects.filter(editor=cls.editor, status='under_review').first()
+        cls.reviewer = cls.paper.reviewers.exclude(reviews__paper=cls.paper).first()
+        if cls.reviewer is None:
+            cls.reviewer = User.objects.create_user('reviewer', 'reviewer@example.com', PASSWORD)
+            cls.paper.reviewers.add(cls.reviewer)
+        cls.reviewed_paper = Review.objects.first().paper
+        cls.paper.manuscript = SimpleUploadedFile('manuscript.pdf', b'%PDF-1.4' + b'0' * 32 * 1024)
+        cls.paper.save()
+        cls.editor_review = Review.objects.create(
+            paper=cls.paper, user=cls.editor, editor_review=True, appropriate='appropriate', recommendation='0',
+            comment='Editor comment', confidential_comment='',
+            additional_file=SimpleUploadedFile('review.pdf', b'%PDF-1.4' + b'1' * 1024))
+
+    @classmethod
+    def tearDownClass(cls):
+        super(EndpointBudgetTest, cls).tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root)
+        if REPORT_PATH and cls.results:
+            with open(REPORT_PATH, 'w') as report:
+                json.dump({'users': USERS, 'papers': PAPERS, 'endpoints': cls.results}, report, indent=2)
+
+    def token(self, user):
+        # Clients keep their token between requests, the authenticated users are cached per token.
+        if user.pk not in self.tokens:
+            payload = api_settings.JWT_PAYLOAD_HANDLER(user)
+            self.tokens[user.pk] = "JWT {}".format(api_settings.JWT_ENCODE_HANDLER(payload))
+        return self.tokens[user.pk]
+
+    def endpoints(self):
+        """
+            Returns a list of (url name, method, url, data, user, expected status).
+            Read only endpoints come first, the ones that change data come last.
+        """
+        paper, reviewer, editor = self.paper, self.reviewer, self.editor
+        author = self.reviewed_paper.user
+        review_user = self.reviewed_paper.reviews.first().user
+        token = self.token(author)[4:]
+        return [
+            ('api-token-verify', 'post', '/api/token-verify/', {'token': token}, None, status.HTTP_200_OK),
+            ('api-token-refresh', 'post', reverse('api:api-token-refresh'), {'token': token}, None,
+             status.HTTP_400_BAD_REQUEST),  # JWT_ALLOW_REFRESH is disabled.
+            ('api-token-login', 'post', reverse('api:api-token-login'),
+             {'username': author.username, 'password': PASSWORD}, None, status.HTTP_200_OK),
+            ('api-profile-valid-titles', 'get', reverse('api:api-profile-valid-titles'), None, None,
+             status.HTTP_200_OK),
+            ('api-profile-valid-counties', 'get', reverse('api:api-profile-valid-counties'), None, None,
+             status.HTTP_200_OK),
+            ('api-papers-valid-statuses', 'get', reverse('api:api-papers-valid-statuses'), None, None,
+             status.HTTP_200_OK),
+            ('api-review-valid-appropriate', 'get', reverse('api:api-review-valid-appropriate'), None, None,
+             status.HTTP_200_OK),
+            ('api-review-valid-recommendations', 'get', reverse('api:api-review-valid-recommendations'), None, None,
+             status.HTTP_200_OK),
+            ('api-get-profile', 'get', reverse('api:api-get-profile', kwargs={'pk': author.profile.pk}), None,
+             author, status.HTTP_200_OK),
+            ('api-list-users', 'get', reverse('api:api-list-users') + '?email=synthetic', None, editor,
+             status.HTTP_200_OK),
+            ('api-papers-count', 'get', reverse('api:api-papers-count'), None, None, status.HTTP_200_OK),
+            ('api-papers-search', 'get', reverse('api:api-papers-search') + '?q=synthetic', None, editor,
+             status.HTTP_200_OK),
+            ('api-papers-all', 'get', reverse('api:api-papers-all'), None, editor, status.HTTP_200_OK),
+            ('api-papers-editor', 'get', reverse('api:api-papers-editor'), None, editor, status.HTTP_200_OK),
+            ('api-papers-editor-self', 'get', reverse('api:api-papers-editor-self'), None, editor,
+             status.HTTP_200_OK),
+            ('api-dashboard-editor', 'get', reverse('api:api-dashboard-editor'), None, editor, status.HTTP_200_OK),
+            ('api-papers-reviewer', 'get', reverse('api:api-papers-reviewer'), None, reviewer, status.HTTP_200_OK),
+            ('api-papers-export', 'get', reverse('api:api-papers-export', kwargs={'export_format': 'ndjson'}), None,
+             editor, status.HTTP_200_OK),
+            ('api-papers-by-author', 'get', reverse('api:api-papers-by-author') + '?email=' +
+             paper.author_list.first().email, None, editor, status.HTTP_200_OK),
+            ('api-papers-no-editor', 'get', reverse('api:api-papers-no-editor'), None, editor, status.HTTP_200_OK),
+            ('api-papers-submitted', 'get', reverse('api:api-papers-submitted'), None, author, status.HTTP_200_OK),
+            ('api-paper-detail', 'get', reverse('api:api-paper-detail', kwargs={'pk': paper.pk}), None, editor,
+             status.HTTP_200_OK),
+            ('api-paper-review', 'get', reverse('api:api-paper-review', kwargs={'pk': self.reviewed_paper.pk}),
+             None, review_user, status.HTTP_200_OK),
+            ('api-paper-reviews', 'get', reverse('api:api-paper-reviews', kwargs={'pk': paper.pk}), None, editor,
+             status.HTTP_200_OK),
+            ('api-paper-reviews-editor', 'get', reverse('api:api-paper-reviews-editor', kwargs={'pk': paper.pk}),
+             None, editor, status.HTTP_200_OK),
+            ('api-paper-reviews-summary', 'get', reverse('api:api-paper-reviews-summary', kwargs={'pk': paper.pk}),
+             None, editor, status.HTTP_200_OK),
+            ('api-papers-reviews-summary', 'get', reverse('api:api-papers-reviews-summary') + '?papers=' +
+             ','.join(str(pk) for pk in Paper.objects.values_list('pk', flat=True)[:MAX_SUMMARY_PAPERS]), None,
+             editor, status.HTTP_200_OK),
+            ('api-paper-file', 'get', reverse('api:api-paper-file', kwargs={'pk': paper.pk, 'field': 'manuscript'}),
+             None, editor, status.HTTP_200_OK),
+            ('api-review-file', 'get', reverse('api:api-review-file', kwargs={'pk': self.editor_review.pk}), None,
+             editor, status.HTTP_200_OK),
+            ('api-test-protected', 'get', reverse('api:api-test-protected'), None, author, status.HTTP_200_OK),
+            ('api-papers-reviewer-add', 'put', reverse('api:api-papers-reviewer-add', kwargs={'pk': paper.pk}),
+             {'user_pk': author.pk}, editor, status.HTTP_200_OK),
+            ('api-papers-reviewers-bulk', 'post', reverse('api:api-papers-reviewers-bulk'),
+             [{'paper': paper.pk, 'add': [review_user.pk], 'remove': [author.pk]},
+              {'paper': self.reviewed_paper.pk, 'add': [author.pk]}], editor, status.HTTP_200_OK),
+            ('api-papers-editor-add', 'post', reverse('api:api-papers-editor-add', kwargs={'pk': paper.pk}), None,
+             editor, status.HTTP_200_OK),
+            ('api-review-add', 'post', reverse('api:api-review-add'),
+             {'paper': paper.pk, 'appropriate': 'appropriate', 'recommendation': '+1', 'comment': 'Fine.'},
+             reviewer, status.HTTP_200_OK),
+            ('api-change-user-details', 'put', reverse('api:api-change-user-details'),
+             {'first_name': 'New', 'last_name': 'Name'}, author, status.HTTP_200_OK),
+            ('api-change-password', 'put', reverse('api:api-change-password'),
+             {'old_password': PASSWORD, 'new_password': 'anotherpassword'}, author, status.HTTP_200_OK),
+            ('api-register', 'post', reverse('api:api-register'),
+             {'email': 'new@example.com', 'password': 'somepassword', 'first_name': 'A', 'last_name': 'B'}, None,
+             status.HTTP_201_CREATED),
+        ]
+
+    def measure(self, method, url, data, user):
+        headers = {'HTTP_AUTHORIZATION': self.token(user)} if user else {}
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, data, format='json', **headers)
+            # Streamed bodies are produced while they're read, that's part of the cost.
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = (time.perf_counter() - start) * 1000
+        return response, content, len(context.captured_queries), elapsed
+
+    def test_every_route_has_a_budget(self):
+        """
+            Ensure that new routes can't be added without a budget.
+        """
+        names = {pattern.name or pattern.regex.pattern.strip('^/$') for pattern in urls.urlpatterns}
+        names = {'api-token-verify' if name == 'token-verify' else name for name in names}
+        self.assertEqual(names - set(BUDGETS), set())
+        self.assertEqual(names, {endpoint[0] for endpoint in self.endpoints()})
+
+    def test_endpoint_budgets(self):
+        for name, method, url, data, user, expected_status in self.endpoints():
+            response, content, queries, elapsed = self.measure(method, url, data, user)
+            size = len(content)
+            limits = BUDGETS[name]
+            self.results.append({'name': name, 'method': method.upper(), 'status': response.status_code,
+                                 'queries': queries, 'ms': round(elapsed, 2), 'bytes': size, 'budget': limits})
+
+            with self.subTest(endpoint=name):
+                self.assertEqual(response.status_code, expected_status)
+                self.assertLessEqual(queries, limits['queries'])
+                if TIMING:
+                    self.assertLessEqual(elapsed, limits['ms'] * TIME_FACTOR)
+                self.assertLessEqual(size, limits['bytes'])
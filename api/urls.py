@@ -5,8 +5,11 @@ from django.conf.urls import url
 from rest_framework_jwt.views import obtain_jwt_token, refresh_jwt_token, verify_jwt_token
 
 from api import account
+from api import choices
+from api import export
+from api import files
 from api import journal
-from api.profile import ProfileDetailView, valid_titles, valid_countries
+from api.profile import ProfileDetailView
 
 urlpatterns = [
     # Account
@@ -18,25 +21,41 @@ urlpatterns = [
     url(r'^change-user-details/$', account.ChangeNameView.as_view(), name="api-change-user-details"),
     url(r'^account/users/$', account.UserListView.as_view(), name="api-list-users"),
     # Profile
-    url(r'^profile/valid_titles/$', valid_titles, name="api-profile-valid-titles"),
-    url(r'^profile/valid_countries/$', valid_countries, name="api-profile-valid-counties"),
+    url(r'^profile/valid_titles/$', choices.valid_titles, name="api-profile-valid-titles"),
+    url(r'^profile/valid_countries/$', choices.valid_countries, name="api-profile-valid-counties"),
     url(r'^profile/(?P<pk>[0-9]+)/$', ProfileDetailView.as_view(), name="api-get-profile"),
     # Journal
+    url(r'^papers/valid_statuses/$', choices.valid_paper_statuses, name="api-papers-valid-statuses"),
+    url(r'^review/valid_appropriate/$', choices.valid_review_appropriate, name="api-review-valid-appropriate"),
+    url(r'^review/valid_recommendations/$', choices.valid_review_recommendations,
+        name="api-review-valid-recommendations"),
     url(r'^papers/count/$', journal.papers_count, name="api-papers-count"),
+    url(r'^papers/search/$', journal.PaperSearchView.as_view(), name="api-papers-search"),
     url(r'^papers/all/$', journal.PaperListAllView.as_view(), name="api-papers-all"),
     url(r'^papers/editor/$', journal.PaperListEditorView.as_view(), name="api-papers-editor"),
     url(r'^papers/editor/self$', journal.PaperListEditorSelfView.as_view(), name="api-papers-editor-self"),
+    url(r'^dashboard/editor/$', journal.EditorDashboardView.as_view(), name="api-dashboard-editor"),
     url(r'^papers/reviewer/$', journal.PaperListReviewerView.as_view(), name="api-papers-reviewer"),
     url(r'^papers/(?P<pk>[0-9]+)/editor/$', journal.set_editor, name="api-papers-editor-add"),
     url(r'^papers/(?P<pk>[0-9]+)/reviewer/$', journal.AddRemoveReviewerView.as_view(), name="api-papers-reviewer-add"),
+    url(r'^papers/reviewers/$', journal.BulkReviewerView.as_view(), name="api-papers-reviewers-bulk"),
+    url(r'^papers/export\.(?P<export_format>ndjson|csv)$', export.PaperExportView.as_view(), name="api-papers-export"),
+    url(r'^papers/by-author/$', journal.PaperListAuthorView.as_view(), name="api-papers-by-author"),
     url(r'^papers/no-editor/$', journal.PaperListNoEditorView.as_view(), name="api-papers-no-editor"),
     url(r'^papers/(?P<pk>[0-9]+)/detail/$', journal.PaperDetailView.as_view(), name="api-paper-detail"),
     url(r'^papers/(?P<pk>[0-9]+)/review/$', journal.ReviewRetrieveUpdateView.as_view(), name="api-paper-review"),
     url(r'^papers/(?P<pk>[0-9]+)/reviews/$', journal.ReviewListView.as_view(), name="api-paper-reviews"),
     url(r'^papers/(?P<pk>[0-9]+)/reviews/editor/$', journal.EditorReviewView.as_view(),
         name="api-paper-reviews-editor"),
+    url(r'^papers/(?P<pk>[0-9]+)/reviews/summary/$', journal.ReviewSummaryView.as_view(),
+        name="api-paper-reviews-summary"),
+    url(r'^papers/reviews/summary/$', journal.ReviewSummaryListView.as_view(), name="api-papers-reviews-summary"),
     url(r'^papers/$', journal.PaperListSubmittedView.as_view(), name="api-papers-submitted"),
     url(r'^review/$', journal.ReviewAddView.as_view(), name="api-review-add"),
+    # Files
+    url(r'^papers/(?P<pk>[0-9]+)/files/(?P<field>manuscript|cover_letter|supplementary_materials)/$',
+        files.PaperFileView.as_view(), name="api-paper-file"),
+    url(r'^reviews/(?P<pk>[0-9]+)/file/$', files.ReviewFileView.as_view(), name="api-review-file"),
 
     # Test
     url(r'^prajituri/$', account.TestPermissionsView.as_view(), name="api-test-protected"),
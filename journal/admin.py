@@ -1,16 +1,33 @@
 from django.contrib import admin
+
+from api.fields import file_url
 from .models import Paper, Review
+from .search import search_papers
+from .transitions import review_saved, transition
 
 
 class PaperAdmin(admin.ModelAdmin):
     list_display = ['title', 'user', 'file_link', 'cover_letter_link', 'created']
-    search_fields = ['title', 'user']
+    search_fields = ['title', 'description', 'authors']
+    # The status follows the editor and the editor review, see journal.transitions.
+    readonly_fields = ['status']
     # Add raw_id_fields = ('user',) if you want to be able to search for users.
 
+    def save_model(self, request, obj, form, change):
+        super(PaperAdmin, self).save_model(request, obj, form, change)
+        if 'editor' in form.changed_data:
+            transition(obj, 'editor_assigned' if obj.editor_id else 'editor_removed')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Uses the full text index instead of icontains scans over search_fields.
+        if not search_term:
+            return queryset, False
+        return search_papers(queryset, search_term), False
+
     @classmethod
     def file_link(self, obj):
         if obj.manuscript:
-            return "<a href='{}' download>Download</a>".format(obj.manuscript.url)
+            return "<a href='{}' download>Download</a>".format(file_url(obj.manuscript))
         else:
             return "No attachment"
 
@@ -20,7 +37,7 @@ class PaperAdmin(admin.ModelAdmin):
     @classmethod
     def cover_letter_link(self, obj):
         if obj.cover_letter:
-            return "<a href='{}' download>Download</a>".format(obj.cover_letter.url)
+            return "<a href='{}' download>Download</a>".format(file_url(obj.cover_letter))
         else:
             return "No attachment"
 
@@ -31,6 +48,10 @@ class PaperAdmin(admin.ModelAdmin):
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ['user', 'paper', 'recommendation', 'appropriate', 'created']
 
+    def save_model(self, request, obj, form, change):
+        super(ReviewAdmin, self).save_model(request, obj, form, change)
+        review_saved(obj)
+
 
 admin.site.register(Paper, PaperAdmin)
 admin.site.register(Review, ReviewAdmin)
@@ -0,0 +1,47 @@
+"""
+    Parses the free text authors of a paper into the rows of the Author table.
+
+    Each author is written as "(First Name, Last Name, Email, Affiliation, Country, Corresponding Author)", usually
+    one per line. Affiliations may contain commas, the fields around them are matched from both ends.
+"""
+import re
+
+AUTHOR_RE = re.compile(r'\(([^()]*)\)')
+CORRESPONDING_VALUES = ('yes', 'y', 'true', '1', 'corresponding', 'corresponding author')
+# The max_length of the Author fields.
+NAME_LENGTH = 255
+EMAIL_LENGTH = 254
+COUNTRY_LENGTH = 64
+
+
+def parse_author(text):
+    """
+        '(Ann, Lee, Ann@Example.com, University, Inc., Romania, Yes)' ->
+        {'first_name': 'Ann', 'last_name': 'Lee', 'email': 'ann@example.com', 'affiliation': 'University, Inc.',
+         'country': 'Romania', 'corresponding': True}
+        Returns None if there's no last name.
+    """
+    parts = [part.strip() for part in text.split(',')]
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        return None
+    if len(parts) > 6:
+        parts = parts[:3] + [', '.join(parts[3:-2])] + parts[-2:]
+    parts += [''] * (6 - len(parts))
+    return {
+        'first_name': parts[0][:NAME_LENGTH],
+        'last_name': parts[1][:NAME_LENGTH],
+        'email': parts[2].lower()[:EMAIL_LENGTH],
+        'affiliation': parts[3][:NAME_LENGTH],
+        'country': parts[4][:COUNTRY_LENGTH],
+        'corresponding': parts[5].lower() in CORRESPONDING_VALUES,
+    }
+
+
+def parse_authors(text):
+    """
+        Returns the authors in the text of Paper.authors, as dicts, in the order they're written.
+        Authors are read from parentheses, text without any is read one author per line.
+    """
+    text = text or ''
+    entries = AUTHOR_RE.findall(text) or text.splitlines()
+    return [author for author in (parse_author(entry) for entry in entries) if author is not None]
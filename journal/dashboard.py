@@ -0,0 +1,71 @@
+"""
+    The editor dashboard: the papers of an editor with the progress of their reviews, so the dashboard is one request
+    instead of two per paper.
+
+    A page of papers costs three queries: the stamp its ETag is derived from, the papers, which carry their counts
+    from correlated subqueries on the reviewers table and on the (paper, editor_review) index of the reviews, and the
+    reviewers who haven't reviewed their paper yet, read for the whole page at once through the (user, paper) index of
+    the reviews.
+"""
+from collections import OrderedDict, defaultdict
+
+from django.db.models import Count, Max
+
+from journal.models import Paper, Review
+
+# The columns of the papers shown on the dashboard, the long text and the files aren't read.
+DASHBOARD_PAPER_FIELDS = ('id', 'user', 'editor', 'title', 'status', 'created', 'updated')
+
+
+def review_progress_selects():
+    """
+        Returns the extra() selects and their params that annotate papers with reviewers_count, reviews_count and
+        has_editor_review. Reviews of the editor are left out of the counts.
+    """
+    tables = {'paper': Paper._meta.db_table, 'reviewers': Paper.reviewers.through._meta.db_table,
+              'review': Review._meta.db_table}
+    selects = OrderedDict((
+        ('reviewers_count', 'SELECT COUNT(*) FROM {reviewers} WHERE {reviewers}.paper_id = {paper}.id'),
+        ('reviews_count',
+         'SELECT COUNT(*) FROM {review} WHERE {review}.paper_id = {paper}.id AND {review}.editor_review = %s'),
+        ('has_editor_review',
+         'EXISTS (SELECT 1 FROM {review} WHERE {review}.paper_id = {paper}.id AND {review}.editor_review = %s)'),
+    ))
+    return (OrderedDict((name, sql.format(**tables)) for name, sql in selects.items()), (False, True))
+
+
+def editor_papers(editor):
+    """
+        Returns the papers edited by editor, annotated with the progress of their reviews.
+    """
+    selects, params = review_progress_selects()
+    return Paper.objects.filter(editor=editor).only(*DASHBOARD_PAPER_FIELDS)\
+        .extra(select=selects, select_params=params)
+
+
+def dashboard_stamp(editor):
+    """
+        Returns what the dashboard of editor depends on, in one aggregate query: the papers and their updated
+        timestamps, which follow the changes of the reviewers, and the reviews.
+    """
+    stamp = Paper.objects.filter(editor=editor).aggregate(
+        papers=Count('pk', distinct=True), updated=Max('updated'), reviews=Count('reviews'),
+        reviewed=Max('reviews__updated'))
+    return tuple(stamp[name] for name in ('papers', 'updated', 'reviews', 'reviewed'))
+
+
+def pending_reviewers(paper_pks):
+    """
+        Returns the reviewers of the papers who haven't reviewed them yet, in one query, as a dict of paper pk to a
+        list of users.
+    """
+    through = Paper.reviewers.through
+    reviewed = ('NOT EXISTS (SELECT 1 FROM {review} WHERE {review}.paper_id = {reviewers}.paper_id '
+                'AND {review}.user_id = {reviewers}.user_id)').format(review=Review._meta.db_table,
+                                                                      reviewers=through._meta.db_table)
+    rows = through.objects.filter(paper_id__in=paper_pks).extra(where=[reviewed]).select_related('user')\
+        .order_by('pk')
+    pending = defaultdict(list)
+    for row in rows:
+        pending[row.paper_id].append(row.user)
+    return pending
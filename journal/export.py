@@ -0,0 +1,115 @@
+"""
+    Exports the papers with their submitter's profile, editor, reviewers and reviews as NDJSON or CSV.
+
+    The papers are read in chunks ordered by pk, each chunk starts after the last pk of the previous one. A chunk
+    costs three queries, its papers joined with the users and profile, its reviewers and its reviews, and only one
+    chunk is in memory at a time so the memory used doesn't grow with the number of papers. Chunks are read one after
+    the other, not in one snapshot, run the export in a transaction with repeatable reads for a consistent one.
+"""
+import csv
+import io
+import json
+from collections import OrderedDict, defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from journal.models import Paper, Review
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+EXPORT_CHUNK_SIZE = 1000
+
+PAPER_FIELDS = OrderedDict((
+    ('id', 'id'), ('title', 'title'), ('description', 'description'), ('authors', 'authors'), ('status', 'status'),
+    ('created', 'created'), ('updated', 'updated'),
+))
+SUBMITTER_FIELDS = OrderedDict((
+    ('id', 'user_id'), ('email', 'user__email'), ('first_name', 'user__first_name'),
+    ('last_name', 'user__last_name'), ('title', 'user__profile__title'),
+    ('affiliation', 'user__profile__affiliation'), ('country', 'user__profile__country'),
+))
+EDITOR_FIELDS = OrderedDict((
+    ('id', 'editor_id'), ('email', 'editor__email'), ('first_name', 'editor__first_name'),
+    ('last_name', 'editor__last_name'),
+))
+REVIEWER_FIELDS = OrderedDict((
+    ('id', 'user_id'), ('email', 'user__email'), ('first_name', 'user__first_name'), ('last_name', 'user__last_name'),
+))
+REVIEW_FIELDS = OrderedDict((
+    ('id', 'id'), ('user', 'user_id'), ('user_email', 'user__email'), ('editor_review', 'editor_review'),
+    ('appropriate', 'appropriate'), ('recommendation', 'recommendation'), ('created', 'created'),
+    ('comment', 'comment'), ('confidential_comment', 'confidential_comment'),
+))
+
+# One CSV row per review, the paper columns are repeated. Papers without reviews have a row with empty review columns.
+CSV_HEADER = (['paper_' + name for name in PAPER_FIELDS] + ['submitter_' + name for name in SUBMITTER_FIELDS] +
+              ['editor_email', 'reviewers'] + ['review_' + name for name in REVIEW_FIELDS])
+
+
+def pick(row, fields):
+    return OrderedDict((name, row[lookup]) for name, lookup in fields.items())
+
+
+def paper_chunks(queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+        Yields lists of papers, as dicts with their submitter, editor, reviewers and reviews, chunk_size at a time.
+    """
+    queryset = (Paper.objects.all() if queryset is None else queryset).order_by('pk')
+    lookups = list(PAPER_FIELDS.values()) + list(SUBMITTER_FIELDS.values()) + list(EDITOR_FIELDS.values())
+    through = Paper.reviewers.through
+    last = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last).values(*lookups)[:chunk_size])
+        if not rows:
+            return
+        last = rows[-1]['id']
+        pks = [row['id'] for row in rows]
+
+        reviewers, reviews = defaultdict(list), defaultdict(list)
+        reviewer_rows = through.objects.filter(paper_id__in=pks).order_by('pk')
+        for row in reviewer_rows.values('paper_id', *REVIEWER_FIELDS.values()):
+            reviewers[row['paper_id']].append(pick(row, REVIEWER_FIELDS))
+        for row in Review.objects.filter(paper_id__in=pks).order_by('pk').values('paper_id', *REVIEW_FIELDS.values()):
+            reviews[row['paper_id']].append(pick(row, REVIEW_FIELDS))
+
+        papers = []
+        for row in rows:
+            paper = pick(row, PAPER_FIELDS)
+            paper['submitter'] = pick(row, SUBMITTER_FIELDS)
+            paper['editor'] = pick(row, EDITOR_FIELDS) if row['editor_id'] else None
+            paper['reviewers'] = reviewers[row['id']]
+            paper['reviews'] = reviews[row['id']]
+            papers.append(paper)
+        yield papers
+
+
+def to_ndjson(papers):
+    return ''.join(json.dumps(paper, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n' for paper in papers)
+
+
+def to_csv(papers):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    empty_review = [''] * len(REVIEW_FIELDS)
+    for paper in papers:
+        columns = [paper[name] for name in PAPER_FIELDS] + list(paper['submitter'].values()) + [
+            paper['editor']['email'] if paper['editor'] else '',
+            ';'.join(reviewer['email'] for reviewer in paper['reviewers'])]
+        for review in paper['reviews'] or [None]:
+            writer.writerow(columns + (list(review.values()) if review else empty_review))
+    return buffer.getvalue()
+
+
+def export_papers(export_format, queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+        Yields the export of the papers in queryset, all of them by default, as text in export_format, one chunk of
+        papers at a time.
+    """
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(CSV_HEADER)
+        yield buffer.getvalue()
+
+    render = to_csv if export_format == 'csv' else to_ndjson
+    for papers in paper_chunks(queryset, chunk_size):
+        yield render(papers)
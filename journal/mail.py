@@ -1,33 +1,76 @@
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
 from acrevista.settings import EMAIL_NOREPLY
-from django.core.mail import send_mail
+from account.mail import queue_mail
+from account.models import loaded_values
 
+STAFF_RECIPIENTS_CACHE_KEY = 'journal:staff-recipients'
+# Unless the processes share the cache, only the one that changed a staff member forgets the list, the others keep
+# notifying the old staff members until it times out.
+STAFF_RECIPIENTS_CACHE_TIMEOUT = 60
 
-def get_staff_members():
-    staff_members = User.objects.filter(is_staff=True)
-    recipients = []
 
-    for member in staff_members:  # Every staff member should have a valid email.
-        if member.email:
-            recipients.append(member.email)
+def get_staff_members():
+    """
+    Returns the email addresses of the staff members. The list is cached until a staff member or a user's
+    staff status changes, see staff_recipients_saved.
+    """
+    recipients = cache.get(STAFF_RECIPIENTS_CACHE_KEY)
+    if recipients is None:
+        # Every staff member should have a valid email, the ones that don't are skipped.
+        recipients = list(User.objects.filter(is_staff=True).exclude(email='')
+                          .order_by('pk').values_list('email', flat=True))
+        cache.set(STAFF_RECIPIENTS_CACHE_KEY, recipients, STAFF_RECIPIENTS_CACHE_TIMEOUT)
     return recipients
 
 
+def forget_staff_members():
+    cache.delete(STAFF_RECIPIENTS_CACHE_KEY)
+    # A request may have cached the old list before the change was committed.
+    transaction.on_commit(lambda: cache.delete(STAFF_RECIPIENTS_CACHE_KEY))
+
+
+@receiver(post_init, sender=User)
+def staff_recipient_loaded(sender, instance, **kwargs):
+    instance._staff_recipient = loaded_values(instance, ('is_staff', 'email'))
+
+
+@receiver(post_save, sender=User)
+def staff_recipients_saved(sender, instance, created, **kwargs):
+    """
+        Forget the staff emails when a staff member is added, removed or changes their email.
+    """
+    loaded = (False, '') if created else getattr(instance, '_staff_recipient', (None, None))
+    current = (instance.is_staff, instance.email)
+    if loaded != current and (loaded[0] is not False or current[0]):
+        forget_staff_members()
+    instance._staff_recipient = current
+
+
+@receiver(post_delete, sender=User)
+def staff_recipients_deleted(sender, instance, **kwargs):
+    # The user is gone, a deferred staff status can't be loaded anymore.
+    is_staff, = loaded_values(instance, ('is_staff',))
+    if is_staff is not False:
+        forget_staff_members()
+
+
 def send_mail_to_staff(paper_title, authors):
     """
     Notifies all the staff members (editors) that a new paper has been submitted.
     :param paper_title: The title of the paper that will appear in the mail.
     :param authors: Tuple containing the authors of the paper.
     """
-    # Fixme: Perhaps make this async
-    # Send mail to everyone from the staff. Perhaps run async idk?
     recipients = get_staff_members()
 
     message = "A new paper: '{}' has been submitted by the following authors:" \
               "\n(First Name, Last Name, Email, Affiliation, Country \n{}".format(paper_title, authors)
     subject = "A new paper has been submitted!"
 
-    send_mail(subject, message, EMAIL_NOREPLY, recipients, fail_silently=True)
+    queue_mail(subject, message, EMAIL_NOREPLY, recipients)
 
 
 def send_mail_new_review(paper_title, recipient):
@@ -38,7 +81,7 @@ def send_mail_new_review(paper_title, recipient):
     """
     subject = "New review: {}".format(paper_title)
     message = "A new review for the paper {} has been added!".format(paper_title)
-    send_mail(subject, message, EMAIL_NOREPLY, (recipient,), fail_silently=False)
+    queue_mail(subject, message, EMAIL_NOREPLY, (recipient,))
 
 
 #https://stackoverflow.com/questions/1160019/django-send-email-on-model-change
@@ -46,4 +89,4 @@ def send_mail_paper_status_update(paper_title, old_status, new_status):
     recipients = get_staff_members()
     subject = "{} - Status was changed.".format(paper_title)
     message = "The status for {} was change from {} to {}.".format(paper_title, old_status, new_status)
-    send_mail(subject, message, EMAIL_NOREPLY, recipients, fail_silently=True)
+    queue_mail(subject, message, EMAIL_NOREPLY, recipients)
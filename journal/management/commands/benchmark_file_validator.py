@@ -0,0 +1,71 @@
+"""
+    Measures the time and the peak memory used by the paper file validator for different file sizes.
+"""
+import time
+import tracemalloc
+
+import magic
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand
+
+from journal.models import JOURNAL_PAPER_FILE_VALIDATOR
+
+SIZES = (1024, 64 * 1024, 1024 * 1024, 10 * 1024 * 1024, 50 * 1024 * 1024)
+
+
+def read_whole_file(data):
+    """
+        What the validator used to do: read the whole file to sniff its content type.
+    """
+    return magic.from_buffer(data.read(), mime=True)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the paper file validator against reading the whole upload, for 1 KB to 50 MB files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per file size, the best run is reported.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("{:>10} {:>14} {:>14} {:>14} {:>14}".format(
+            "size", "read() ms", "read() peak", "stream ms", "stream peak"))
+        for size in SIZES:
+            upload = self.make_upload(size)
+            try:
+                whole = self.measure(read_whole_file, upload, options['repeat'])
+                streamed = self.measure(JOURNAL_PAPER_FILE_VALIDATOR, upload, options['repeat'])
+            finally:
+                upload.close()
+            self.stdout.write("{:>10} {:>14.2f} {:>14} {:>14.2f} {:>14}".format(
+                size, whole[0], whole[1], streamed[0], streamed[1]))
+
+    def make_upload(self, size):
+        """
+            Writes a PDF like file of the given size to disk, the way Django stores big uploads.
+        """
+        upload = TemporaryUploadedFile('paper.pdf', 'application/pdf', size, None)
+        header = b"%PDF-1.4\n"
+        upload.write(header)
+        remaining = size - len(header)
+        block = b"0" * 64 * 1024
+        while remaining > 0:
+            upload.write(block[:remaining])
+            remaining -= len(block)
+        upload.seek(0)
+        return upload
+
+    def measure(self, function, upload, repeat):
+        """
+            Returns the best time in milliseconds and the peak of Python memory allocations in bytes.
+        """
+        best_time, peak = None, 0
+        for _ in range(repeat):
+            upload.seek(0)
+            tracemalloc.start()
+            start = time.perf_counter()
+            function(upload)
+            elapsed = (time.perf_counter() - start) * 1000
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            best_time = elapsed if best_time is None else min(best_time, elapsed)
+        return best_time, peak
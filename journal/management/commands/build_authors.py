@@ -0,0 +1,42 @@
+"""
+    Fills the Author table from the authors text of the existing papers.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from journal.models import Author, Paper
+
+
+class Command(BaseCommand):
+    """
+        The papers are read in chunks ordered by pk and the Author rows of a chunk are replaced in one transaction
+        with a bulk delete and a bulk insert. Running it again rebuilds the same rows.
+    """
+    help = "Parses the authors of every paper into the Author table, replacing the existing rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Papers handled per transaction.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        start = time.perf_counter()
+        papers = authors = last = 0
+        while True:
+            rows = list(Paper.objects.filter(pk__gt=last).order_by('pk').values_list('pk', 'authors')[:batch_size])
+            if not rows:
+                break
+            last = rows[-1][0]
+            with transaction.atomic():
+                Author.objects.filter(paper_id__in=[pk for pk, _ in rows]).delete()
+                created = Author.objects.bulk_create(
+                    [author for pk, text in rows for author in Author.rows_for(pk, text)])
+            papers += len(rows)
+            authors += len(created)
+
+        self.stdout.write("Created {} authors for {} papers in {:.2f}s.".format(
+            authors, papers, time.perf_counter() - start))
@@ -0,0 +1,36 @@
+"""
+    Exports the papers with their submitter's profile, editor, reviewers and reviews as NDJSON or CSV.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from journal.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_papers
+from journal.models import Paper
+
+
+class Command(BaseCommand):
+    help = "Writes the papers joined with their reviews, reviewers and submitter profiles as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson', help="The output format.")
+        parser.add_argument('--output', default=None, help="Write to this file instead of the standard output.")
+        parser.add_argument('--status', choices=[choice[0] for choice in Paper.STATUS_CHOICES], default=None,
+                            help="Only export the papers with this status.")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help="Papers read per batch.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        papers = Paper.objects.all()
+        if options['status']:
+            papers = papers.filter(status=options['status'])
+
+        chunks = export_papers(options['format'], papers, options['chunk_size'])
+        if options['output'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        # newline='' leaves the CSV line endings alone.
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in chunks:
+                output.write(chunk)
@@ -0,0 +1,221 @@
+"""
+    Fills the database with synthetic users, profiles, papers, authors, reviewer assignments and reviews for scale
+    testing.
+"""
+import bisect
+import datetime
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from account.models import Profile
+from journal.models import Author, Paper, PaperCounter, Review
+
+# Probability weights for the number of reviewers of a paper, index is the number of reviewers.
+REVIEWERS_WEIGHTS = (2, 5, 35, 38, 15, 5)
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+
+class WeightedChoice(object):
+    """
+        Picks items according to their weights in O(log n).
+    """
+
+    def __init__(self, rng, items, weights):
+        self.rng = rng
+        self.items = items
+        self.cumulative = list(itertools.accumulate(weights))
+
+    def __call__(self):
+        return self.items[bisect.bisect(self.cumulative, self.rng.random() * self.cumulative[-1])]
+
+
+class Command(BaseCommand):
+    """
+        Rows are built as plain tuples and written with one executemany() per table and batch. This skips model
+        instantiation, the ORM insert compiler and the model signals, which makes it fast enough to generate
+        millions of rows in a few minutes.
+    """
+    help = "Generates synthetic users, profiles, papers, reviewer assignments and reviews using bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help="Number of users to create.")
+        parser.add_argument('--papers', type=int, default=1000, help="Number of papers to create.")
+        parser.add_argument('--editors', type=int, default=None,
+                            help="Number of staff users that edit papers, defaults to 1%% of the users.")
+        parser.add_argument('--days', type=int, default=3 * 365, help="Spread the papers over this many days.")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Users or papers inserted per transaction.")
+        parser.add_argument('--password', default='password', help="Password of every generated user.")
+        parser.add_argument('--seed', type=int, default=None, help="Seed of the random generator.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        editors = options['editors'] if options['editors'] is not None else max(options['users'] // 100, 1)
+        editors = min(editors, options['users'])
+
+        user_ids = self.timed("users and profiles", self.create_users,
+                              options['users'], editors, make_password(options['password']))
+        if not user_ids or not options['papers']:
+            return
+
+        # A few editors hold most papers, Zipf like.
+        pick_editor = WeightedChoice(self.rng, user_ids[:editors], [1 / (rank + 1) for rank in range(editors)])
+        self.timed("papers, reviewer assignments and reviews", self.create_papers,
+                   options['papers'], user_ids, editors, pick_editor, options['days'])
+        PaperCounter.rebuild()
+
+    def timed(self, name, function, *args):
+        start = time.time()
+        result = function(*args)
+        elapsed = time.time() - start
+        rows = self.rows
+        self.stdout.write("Created {} rows of {} in {:.2f}s ({:.0f} rows/s).".format(
+            rows, name, elapsed, rows / elapsed if elapsed else rows))
+        return result
+
+    def insert(self, model, fields, rows):
+        """
+            Inserts rows, tuples of values in the order of fields, into the model's table.
+        """
+        if not rows:
+            return
+        quote = connection.ops.quote_name
+        columns = [model._meta.get_field(field).column for field in fields]
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(quote(model._meta.db_table),
+                                                       ", ".join(quote(column) for column in columns),
+                                                       ", ".join(["%s"] * len(columns)))
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+        self.rows += len(rows)
+
+    def inserted_ids(self, model, count, after):
+        """
+            Returns the primary keys of the last count rows inserted into model after the primary key after.
+            The generator is expected to be the only writer while it runs.
+        """
+        return list(model.objects.filter(pk__gt=after).order_by('pk').values_list('pk', flat=True)[:count])
+
+    def timestamp(self, value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def create_users(self, count, editors, password):
+        """
+            Creates the users and their profiles, the first editors users are staff members.
+            The post_save signal that creates profiles isn't sent so the profiles are inserted here too.
+        """
+        self.rows = 0
+        user_ids = []
+        start = User.objects.aggregate(last=Max('pk'))['last'] or 0
+        titles = [choice[0] for choice in Profile.TITLE_CHOICES]
+        countries = [choice[0] for choice in Profile.COUNTRY_CHOICES]
+
+        date_joined = self.timestamp(self.now)
+        for chunk in chunks(range(count), self.batch_size):
+            with transaction.atomic():
+                last = User.objects.aggregate(last=Max('pk'))['last'] or 0
+                self.insert(User, ('username', 'email', 'first_name', 'last_name', 'password', 'is_staff',
+                                   'is_superuser', 'is_active', 'date_joined'),
+                            [('synthetic{}_{}'.format(start, i), 'synthetic{}_{}@example.com'.format(start, i),
+                              'First{}'.format(i), 'Last{}'.format(i), password, len(user_ids) + n < editors,
+                              False, True, date_joined) for n, i in enumerate(chunk)])
+                ids = self.inserted_ids(User, len(chunk), last)
+                self.insert(Profile, ('user', 'title', 'country', 'phone', 'affiliation', 'lookup_email',
+                                      'lookup_name', 'lookup_last_name'),
+                            [(user_id, self.rng.choice(titles), self.rng.choice(countries), '',
+                              'University {}'.format(self.rng.randint(1, 500)),
+                              'synthetic{}_{}@example.com'.format(start, i), 'first{0} last{0}'.format(i),
+                              'last{}'.format(i)) for user_id, i in zip(ids, chunk)])
+                user_ids += ids
+        return user_ids
+
+    def create_papers(self, count, user_ids, editors, pick_editor, days):
+        """
+            Creates the papers along with their reviewer assignments and reviews. The rows are inserted in bulk,
+            without journal.transitions, so the paper status is computed here from its editor and editor review, as
+            the events of its TRANSITIONS table would set it.
+        """
+        self.rows = 0
+        through = Paper.reviewers.through
+        reviewers_count = WeightedChoice(self.rng, range(len(REVIEWERS_WEIGHTS)), REVIEWERS_WEIGHTS)
+        reviewer_pool = user_ids[editors:] or user_ids
+        appropriate = [choice[0] for choice in Review.APPROPRIATE_CHOICES]
+        recommendations = [choice[0] for choice in Review.RECOMMENDATION_CHOICES]
+
+        paper_fields = ('user', 'editor', 'status', 'title', 'created', 'updated', 'description', 'authors',
+                        'manuscript', 'cover_letter', 'supplementary_materials')
+        review_fields = ('paper', 'user', 'created', 'updated', 'editor_review', 'appropriate', 'recommendation',
+                         'comment', 'confidential_comment', 'additional_file')
+        for chunk in chunks(range(count), self.batch_size):
+            with transaction.atomic():
+                last = Paper.objects.aggregate(last=Max('pk'))['last'] or 0
+                papers, plans = [], []
+                for i in chunk:
+                    editor = pick_editor() if self.rng.random() < 0.8 else None
+                    created = self.now - datetime.timedelta(seconds=self.rng.randint(0, days * 86400))
+                    reviewers = self.rng.sample(reviewer_pool, min(reviewers_count(), len(reviewer_pool)))
+                    # The pool has editors when every user is one, the editor's review of a paper is its editor review.
+                    reviewers = [reviewer for reviewer in reviewers if reviewer != editor]
+                    editor_review = editor is not None and self.rng.random() < 0.4
+                    verdict = (self.rng.choice(appropriate), self.rng.choice(recommendations))
+                    if editor is None:
+                        status = Paper.STATUS_CHOICES[0][0]  # processing
+                    elif not editor_review:
+                        status = Paper.STATUS_CHOICES[1][0]  # under_review
+                    elif verdict == (Review.APPROPRIATE_CHOICES[0][0], Review.RECOMMENDATION_CHOICES[1][0]):
+                        status = Paper.STATUS_CHOICES[3][0]  # accepted
+                    else:
+                        status = Paper.STATUS_CHOICES[2][0]  # preliminary_reject
+
+                    authors = self.authors()
+                    papers.append((self.rng.choice(user_ids), editor, status, 'Synthetic paper {}'.format(i),
+                                   self.timestamp(created), self.timestamp(created),
+                                   ' '.join(['Abstract'] * self.rng.randint(20, 200)), authors,
+                                   'papers/synthetic/manuscript.pdf', 'papers/synthetic/cover_letter.pdf', None))
+                    plans.append((created, editor, reviewers, verdict if editor_review else None, authors))
+
+                self.insert(Paper, paper_fields, papers)
+                assignments, reviews, authors = [], [], []
+                for paper_id, (created, editor, reviewers, verdict, text) in zip(
+                        self.inserted_ids(Paper, len(papers), last), plans):
+                    authors += [(paper_id, author.position, author.first_name, author.last_name, author.email,
+                                 author.affiliation, author.country, author.corresponding)
+                                for author in Author.rows_for(paper_id, text)]
+                    for reviewer in reviewers:
+                        assignments.append((paper_id, reviewer))
+                        if self.rng.random() < 0.7:
+                            reviews.append(self.review(paper_id, reviewer, created, False,
+                                                       self.rng.choice(appropriate),
+                                                       self.rng.choice(recommendations)))
+                    if verdict:
+                        reviews.append(self.review(paper_id, editor, created, True, *verdict))
+                self.insert(through, ('paper', 'user'), assignments)
+                self.insert(Author, ('paper', 'position', 'first_name', 'last_name', 'email', 'affiliation', 'country',
+                                     'corresponding'), authors)
+                self.insert(Review, review_fields, reviews)
+
+    def review(self, paper_id, user_id, paper_created, editor_review, appropriate, recommendation):
+        created = self.timestamp(min(paper_created + datetime.timedelta(days=self.rng.randint(1, 90)), self.now))
+        return (paper_id, user_id, created, created, editor_review, appropriate, recommendation,
+                ' '.join(['Comment'] * self.rng.randint(10, 400)), '', '')
+
+    def authors(self):
+        return '\n'.join('(First{0}, Last{0}, author{0}@example.com, University {1}, Romania, {2})'.format(
+            self.rng.randint(1, 10 ** 6), self.rng.randint(1, 500), 'Yes' if n == 0 else 'No')
+            for n in range(self.rng.randint(1, 5)))
@@ -0,0 +1,63 @@
+"""
+    Moves the files uploaded before the content addressed storage was introduced into it.
+"""
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from journal.models import Paper, Review, StoredFile
+from journal.storage import paper_storage
+
+FILE_FIELDS = (
+    (Paper, ('manuscript', 'cover_letter', 'supplementary_materials')),
+    (Review, ('additional_file',)),
+)
+
+
+class Command(BaseCommand):
+    help = "Converts the paper and review files stored under MEDIA_ROOT to the content addressed storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true', default=False,
+                            help="Don't delete the original files after they were converted.")
+
+    def handle(self, *args, **options):
+        legacy = FileSystemStorage()
+        converted = {}  # Original name -> blob name, files shared by many rows are read only once.
+        blob_sizes = {}
+        missing = references = original_bytes = 0
+
+        for model, fields in FILE_FIELDS:
+            for row in model.objects.order_by().values_list('pk', *fields).iterator():
+                with transaction.atomic():
+                    updates = {}
+                    for field, name in zip(fields, row[1:]):
+                        if not name or name.startswith(paper_storage.prefix + '/'):
+                            continue
+
+                        if name in converted:
+                            StoredFile.objects.filter(name=converted[name]).update(references=F('references') + 1)
+                        elif legacy.exists(name):
+                            with legacy.open(name) as original:
+                                original_bytes += original.size
+                                converted[name] = paper_storage.save(name, original)
+                                blob_sizes[converted[name]] = original.size
+                        else:
+                            self.stderr.write("Missing file {} referenced by {} {}.".format(
+                                name, model.__name__, row[0]))
+                            missing += 1
+                            continue
+
+                        updates[field] = converted[name]
+                        references += 1
+                    if updates:
+                        model.objects.filter(pk=row[0]).update(**updates)
+
+        if not options['keep_originals']:
+            for name in converted:
+                legacy.delete(name)
+
+        self.stdout.write("Converted {} references to {} files into {} blobs, {} bytes stored instead of {}. "
+                          "{} files were missing.".format(references, len(converted), len(blob_sizes),
+                                                          sum(blob_sizes.values()), original_bytes, missing))
@@ -0,0 +1,19 @@
+"""
+    Recounts the paper counters from the papers table.
+"""
+from django.core.management.base import BaseCommand
+
+from journal.models import PaperCounter
+
+
+class Command(BaseCommand):
+    """
+        The counters follow the papers saved and deleted through the models. Papers written with bulk inserts or
+        queryset updates that bypass the signals need a rebuild, run while the papers aren't written.
+    """
+    help = "Recounts the paper counters: the total, by status and with or without an editor."
+
+    def handle(self, *args, **options):
+        PaperCounter.rebuild()
+        counters = PaperCounter.objects.order_by('name').values_list('name', 'value')
+        self.stdout.write(", ".join("{}: {}".format(name, value) for name, value in counters))
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.7 on 2026-10-17 17:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_counters(apps, schema_editor):
+    Paper = apps.get_model('journal', 'Paper')
+    PaperCounter = apps.get_model('journal', 'PaperCounter')
+    counts = {'total': 0, 'editor:yes': 0, 'editor:no': 0}
+    counts.update(('status:' + status, 0) for status in ('processing', 'under_review', 'preliminary_reject',
+                                                         'accepted'))
+    for row in Paper.objects.order_by().values('status').annotate(total=Count('id'), with_editor=Count('editor')):
+        counts['total'] += row['total']
+        counts['status:' + row['status']] = row['total']
+        counts['editor:yes'] += row['with_editor']
+    counts['editor:no'] = counts['total'] - counts['editor:yes']
+    PaperCounter.objects.bulk_create(PaperCounter(name=name, value=value) for name, value in counts.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaperCounter',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
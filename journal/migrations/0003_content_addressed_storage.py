@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.7 on 2026-10-17 17:23
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import journal.models
+import journal.storage
+import journal.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0002_papercounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('references', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='paper',
+            name='cover_letter',
+            field=models.FileField(storage=journal.storage.ContentAddressedStorage(), upload_to=journal.models.user_id_path, validators=[journal.validators.FileValidator(content_types=('application/pdf', 'text/html', 'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'text/plain'), max_size=52428800)]),
+        ),
+        migrations.AlterField(
+            model_name='paper',
+            name='manuscript',
+            field=models.FileField(storage=journal.storage.ContentAddressedStorage(), upload_to=journal.models.user_id_path, validators=[journal.validators.FileValidator(content_types=('application/pdf', 'text/html', 'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'text/plain'), max_size=52428800)]),
+        ),
+        migrations.AlterField(
+            model_name='paper',
+            name='supplementary_materials',
+            field=models.FileField(blank=True, default=None, null=True, storage=journal.storage.ContentAddressedStorage(), upload_to=journal.models.user_id_path, validators=[journal.validators.FileValidator(content_types=('application/pdf', 'text/html', 'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'text/plain'), max_size=52428800)]),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='additional_file',
+            field=models.FileField(blank=True, storage=journal.storage.ContentAddressedStorage(), upload_to=journal.models.review_user_id_path, validators=[journal.validators.FileValidator(content_types=('application/pdf', 'text/html', 'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'text/plain'), max_size=52428800)]),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_created(apps, schema_editor):
+    for model in ('Paper', 'Review'):
+        apps.get_model('journal', model).objects.update(updated=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0003_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paper',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created, migrations.RunPython.noop),
+    ]
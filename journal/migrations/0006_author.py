@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.7 on 2026-10-17 18:06
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0005_paper_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Author',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('first_name', models.CharField(max_length=255)),
+                ('last_name', models.CharField(max_length=255)),
+                ('email', models.CharField(blank=True, db_index=True, help_text='Lower case.', max_length=254)),
+                ('affiliation', models.CharField(blank=True, db_index=True, max_length=255)),
+                ('country', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('corresponding', models.BooleanField(default=False)),
+                ('paper', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='author_list', to='journal.Paper')),
+            ],
+            options={
+                'ordering': ('paper', 'position'),
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='author',
+            unique_together=set([('paper', 'position')]),
+        ),
+    ]
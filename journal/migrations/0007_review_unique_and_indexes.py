@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.7 on 2026-10-17 18:18
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def delete_duplicate_reviews(apps, schema_editor):
+    # Concurrent submissions could store a user's review of a paper twice, the first one is kept.
+    Review = apps.get_model('journal', 'Review')
+    duplicates = Review.objects.order_by().values('user', 'paper').annotate(count=Count('id'), first=Min('id'))\
+        .filter(count__gt=1)
+    for duplicate in duplicates:
+        Review.objects.filter(user=duplicate['user'], paper=duplicate['paper']).exclude(pk=duplicate['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('journal', '0006_author'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='review',
+            unique_together=set([('user', 'paper')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='paper',
+            index_together=set([('editor', 'status'), ('user', 'created')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='review',
+            index_together=set([('paper', 'editor_review')]),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.7 on 2026-10-17 18:28
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('journal', '0007_review_unique_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='paper',
+            index_together=set([('editor', 'status'), ('editor', 'created'), ('user', 'created')]),
+        ),
+    ]
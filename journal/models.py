@@ -2,9 +2,17 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.dispatch import receiver
 from django.urls import reverse
+from . import search
+from .authors import parse_authors
+from .storage import paper_storage
 from .validators import FileValidator
 from .mail import send_mail_paper_status_update
-from django.db.models.signals import post_save, pre_save
+from django.db.models import Count, F
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_init, post_migrate, post_save, pre_save, post_delete
+from django.utils import timezone
+from account.models import loaded_values
+from account.principal import forget_principals
 
 
 # This function is used by the Paper model class.
@@ -61,15 +69,35 @@ class Paper(models.Model):
                                          "Last Name, Email, Affiliation, Country, Corresponding Author)")
     reviewers = models.ManyToManyField(User, blank=True)
     created = models.DateTimeField(auto_now_add=True)
+    # Changes whenever the serialized paper changes, it's the validator of the conditional API requests.
+    updated = models.DateTimeField(auto_now=True, db_index=True)
+    # Moved by the events of journal.transitions, which follow the editor and the editor review.
     status = models.CharField(max_length=64, choices=STATUS_CHOICES, default='processing')
     # Files
-    manuscript = models.FileField(upload_to=user_id_path, blank=False, validators=[JOURNAL_PAPER_FILE_VALIDATOR])
-    cover_letter = models.FileField(upload_to=user_id_path, blank=False, validators=[JOURNAL_PAPER_FILE_VALIDATOR])
-    supplementary_materials = models.FileField(upload_to=user_id_path, blank=True, null=True, default=None,
-                                               validators=[JOURNAL_PAPER_FILE_VALIDATOR])
+    manuscript = models.FileField(upload_to=user_id_path, storage=paper_storage, blank=False,
+                                  validators=[JOURNAL_PAPER_FILE_VALIDATOR])
+    cover_letter = models.FileField(upload_to=user_id_path, storage=paper_storage, blank=False,
+                                    validators=[JOURNAL_PAPER_FILE_VALIDATOR])
+    supplementary_materials = models.FileField(upload_to=user_id_path, storage=paper_storage, blank=True, null=True,
+                                               default=None, validators=[JOURNAL_PAPER_FILE_VALIDATOR])
 
     class Meta:
         ordering = ('-created',)
+        # Editors of papers under review (UserIsEditorInActivePaper), the submitted and the edited papers, newest first.
+        index_together = (('editor', 'status'), ('user', 'created'), ('editor', 'created'))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Paper, cls).from_db(db, field_names, values)
+        if 'status' in field_names and 'editor_id' in field_names:
+            instance._loaded_counters = instance.counter_names()
+        return instance
+
+    def counter_names(self):
+        """
+            Returns the names of the PaperCounter rows that count this paper.
+        """
+        return ('total', 'status:' + self.status, 'editor:yes' if self.editor_id else 'editor:no')
 
     def get_absolute_url(self):
         return reverse('journal:paper_detail', args=[str(self.id)])
@@ -78,6 +106,68 @@ class Paper(models.Model):
         return self.title
 
 
+class PaperCounter(models.Model):
+    """
+        Materialized paper counts, one row per counter: the total, one per status and with or without an editor.
+        The rows are updated in the same transaction that creates, deletes or changes a paper so reading a count
+        is a primary key lookup instead of a table scan. They're built by a migration, and rebuilt by the
+        rebuild_paper_counters command after papers were written without signals.
+    """
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return "{}: {}".format(self.name, self.value)
+
+    @classmethod
+    def get_values(cls, names):
+        """
+            Returns a dict with the value of each counter in names, 0 for the missing ones.
+        """
+        values = dict(cls.objects.filter(name__in=names).values_list('name', 'value'))
+        return {name: values.get(name, 0) for name in names}
+
+    @classmethod
+    def add(cls, names, delta):
+        """
+            Atomically adds delta to the counters in names.
+        """
+        names = set(names)
+        if names and cls.objects.filter(name__in=names).update(value=F('value') + delta) != len(names):
+            # The rows of a flushed database, between tests for instance, start at 0 like its papers.
+            missing = names - set(cls.objects.filter(name__in=names).values_list('name', flat=True))
+            for name in missing:
+                cls.objects.get_or_create(name=name)
+            cls.objects.filter(name__in=missing).update(value=F('value') + delta)
+
+    @classmethod
+    def move(cls, old_names, new_names):
+        """
+            Moves a paper from the old_names counters to the new_names counters.
+        """
+        cls.add(set(old_names) - set(new_names), -1)
+        cls.add(set(new_names) - set(old_names), 1)
+
+    @classmethod
+    def rebuild(cls):
+        """
+            Recounts every counter from the papers table, row by row so it doesn't conflict with a concurrent rebuild.
+            The papers written while it counts may be missed, it's meant to run while they aren't written.
+        """
+        counts = {'total': 0, 'editor:yes': 0, 'editor:no': 0}
+        counts.update(('status:' + choice[0], 0) for choice in Paper.STATUS_CHOICES)
+        rows = Paper.objects.order_by().values('status').annotate(total=Count('id'), with_editor=Count('editor'))
+        for row in rows:
+            counts['total'] += row['total']
+            counts['status:' + row['status']] = row['total']
+            counts['editor:yes'] += row['with_editor']
+        counts['editor:no'] = counts['total'] - counts['editor:yes']
+
+        with transaction.atomic():
+            for name, value in sorted(counts.items()):
+                cls.objects.update_or_create(name=name, defaults={'value': value})
+
+
 # Each paper can have multiple reviews
 class Review(models.Model):
     APPROPRIATE_CHOICES = (
@@ -95,6 +185,7 @@ class Review(models.Model):
     user = models.ForeignKey(User, related_name='reviews')  # The submitter
     paper = models.ForeignKey(Paper, related_name='reviews')
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     editor_review = models.BooleanField()
 
     appropriate = models.CharField(max_length=64, choices=APPROPRIATE_CHOICES, default=None)
@@ -104,38 +195,249 @@ class Review(models.Model):
     confidential_comment = models.TextField(max_length=32768,
                                             help_text="This comment will not be shown to the author.")
 
-    additional_file = models.FileField(upload_to=review_user_id_path, blank=True,
+    additional_file = models.FileField(upload_to=review_user_id_path, storage=paper_storage, blank=True,
                                        validators=[JOURNAL_PAPER_FILE_VALIDATOR])
 
     class Meta:
         ordering = ('created',)
+        # A user reviews a paper once, ReviewAddView relies on it.
+        unique_together = (('user', 'paper'),)
+        # The editor review of a paper.
+        index_together = (('paper', 'editor_review'),)
 
     def __str__(self):
         return "{}'s review of {}".format(self.user.username, self.paper.title)
 
 
-@receiver(pre_save, sender=Paper)
-def editor_field_changed(sender, instance, **kwargs):
+class Author(models.Model):
     """
-        If there's an editor and paper status is processing. Change the status to under_review.
-        If there's no editor and the paper status is under_review, change the status to processing.
+        An author of a paper. The rows are parsed from Paper.authors whenever it changes, see journal.authors, so
+        the papers of an author, an affiliation or a country are found through an index.
     """
-    if instance.editor and instance.status == Paper.STATUS_CHOICES[0][0]:
-        instance.status = Paper.STATUS_CHOICES[1][0]  # under_review
-    elif instance.editor == None and instance.status == Paper.STATUS_CHOICES[1][0]:
-        instance.status = Paper.STATUS_CHOICES[0][0]  # processing
+    paper = models.ForeignKey(Paper, related_name='author_list')
+    position = models.PositiveSmallIntegerField()
+    first_name = models.CharField(max_length=255)
+    last_name = models.CharField(max_length=255)
+    email = models.CharField(max_length=254, blank=True, db_index=True, help_text="Lower case.")
+    affiliation = models.CharField(max_length=255, blank=True, db_index=True)
+    country = models.CharField(max_length=64, blank=True, db_index=True)
+    corresponding = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ('paper', 'position')
+        unique_together = (('paper', 'position'),)
+
+    @classmethod
+    def rows_for(cls, paper_id, authors):
+        """
+            Returns the unsaved Author rows of the paper paper_id for its authors text.
+        """
+        return [cls(paper_id=paper_id, position=position, **author)
+                for position, author in enumerate(parse_authors(authors))]
 
+    def __str__(self):
+        return "{} {}".format(self.first_name, self.last_name)
+
+
+class StoredFile(models.Model):
+    """
+        A blob of the content addressed paper storage and the number of file fields that reference it.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    references = models.PositiveIntegerField(default=0)
 
+    def __str__(self):
+        return self.name
+
+
+@receiver(post_delete, sender=Paper)
+@receiver(post_delete, sender=Review)
+def release_files(sender, instance, **kwargs):
+    """
+        Drop the references of a deleted paper or review to its files.
+    """
+    for field in instance._meta.get_fields():
+        if isinstance(field, models.FileField):
+            file = getattr(instance, field.name)
+            if file:
+                file.delete(save=False)
+
+
+def file_names(instance):
+    # A file is the stored name once loaded or saved, an unsaved upload until then.
+    attnames = [field.attname for field in instance._meta.concrete_fields if isinstance(field, models.FileField)]
+    values = loaded_values(instance, attnames)
+    return {attname: getattr(value, 'name', value) for attname, value in zip(attnames, values)}
+
+
+@receiver(post_init, sender=Paper)
+@receiver(post_init, sender=Review)
+def files_loaded(sender, instance, **kwargs):
+    instance._loaded_files = file_names(instance)
+
+
+@receiver(post_save, sender=Paper)
 @receiver(post_save, sender=Review)
-def reviews_changed(sender, instance, **kwargs):
-    """
-        If there's an editor review, set the paper status according to the result of the editor review.
-    """
-    if instance.editor_review:
-        # If the editor review is positive, change the paper status to published.
-        if instance.appropriate == Review.APPROPRIATE_CHOICES[0][0] \
-                and instance.recommendation == Review.RECOMMENDATION_CHOICES[1][0]:
-            instance.paper.status = Paper.STATUS_CHOICES[3][0]  # accepted
-        else:
-            instance.paper.status = Paper.STATUS_CHOICES[2][0]  # preliminary_reject
-        instance.paper.save()
+def release_replaced_files(sender, instance, created, raw, **kwargs):
+    """
+        Drop the references of a saved paper or review to the files it had when it was loaded and that were replaced
+        or cleared, once the change is committed.
+    """
+    names = file_names(instance)
+    if not (created or raw):
+        for attname, name in getattr(instance, '_loaded_files', {}).items():
+            if name and names.get(attname) != name:
+                storage = instance._meta.get_field(attname).storage
+                transaction.on_commit(lambda storage=storage, name=name: storage.delete(name))
+    instance._loaded_files = names
+
+
+@receiver(pre_save, sender=Paper)
+def paper_counters_load(sender, instance, raw, **kwargs):
+    """
+        Remember which counters an existing paper was in if it wasn't loaded from the database with its status.
+    """
+    if not raw and instance.pk and not hasattr(instance, '_loaded_counters'):
+        old = Paper.objects.filter(pk=instance.pk).values_list('status', 'editor_id').first()
+        if old:
+            instance._loaded_counters = Paper(status=old[0], editor_id=old[1]).counter_names()
+
+
+@receiver(post_save, sender=Paper)
+def paper_counters_saved(sender, instance, created, raw, **kwargs):
+    """
+        Keep the paper counters up to date when a paper is created or when its status or editor change.
+    """
+    if raw:
+        return
+    names = instance.counter_names()
+    old_names = getattr(instance, '_loaded_counters', None)
+    if created or old_names is None:
+        PaperCounter.add(names, 1)
+    elif old_names != names:
+        PaperCounter.move(old_names, names)
+    instance._loaded_counters = names
+
+
+@receiver(post_delete, sender=Paper)
+def paper_counters_deleted(sender, instance, **kwargs):
+    PaperCounter.add(getattr(instance, '_loaded_counters', instance.counter_names()), -1)
+
+
+# The User fields shown in a serialized paper.
+PAPER_USER_FIELDS = ('first_name', 'last_name', 'email', 'is_staff', 'is_active')
+
+
+def paper_user_values(user):
+    return loaded_values(user, PAPER_USER_FIELDS)
+
+
+@receiver(m2m_changed, sender=Paper.reviewers.through)
+def paper_reviewers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+        Adding or removing reviewers changes the paper, bump its updated timestamp.
+    """
+    if reverse and action == 'pre_clear':
+        # pk_set is None when a user is removed from all the papers they review, remember them.
+        instance._cleared_papers = list(sender.objects.filter(user=instance).values_list('paper_id', flat=True))
+    elif action == 'post_clear' and reverse:
+        pk_set = getattr(instance, '_cleared_papers', ())
+    elif action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        Paper.objects.filter(pk=instance.pk).update(updated=timezone.now())
+    elif pk_set:
+        Paper.objects.filter(pk__in=pk_set).update(updated=timezone.now())
+
+
+@receiver(post_init, sender=User)
+def paper_user_loaded(sender, instance, **kwargs):
+    instance._paper_user_values = paper_user_values(instance)
+
+
+@receiver(post_save, sender=User)
+def paper_users_changed(sender, instance, created, raw, **kwargs):
+    """
+        Papers show the name and email of their submitter, editor and reviewers, bump the papers of a changed user.
+    """
+    values = paper_user_values(instance)
+    changed = not (created or raw) and values != getattr(instance, '_paper_user_values', None)
+    instance._paper_user_values = values
+    if changed:
+        reviewed = Paper.reviewers.through.objects.filter(user=instance).values('paper')
+        Paper.objects.filter(models.Q(user=instance) | models.Q(editor=instance) | models.Q(pk__in=reviewed))\
+            .update(updated=timezone.now())
+
+
+def principal_paper_values(paper):
+    return loaded_values(paper, ('editor_id', 'status'))
+
+
+@receiver(post_init, sender=Paper)
+def principal_paper_loaded(sender, instance, **kwargs):
+    instance._principal_values = principal_paper_values(instance)
+
+
+@receiver(post_save, sender=Paper)
+def principal_editors_changed(sender, instance, created, **kwargs):
+    """
+        Whether an editor edits a paper under review is part of their cached principal, forget it when a paper
+        changes editor or status.
+    """
+    values = principal_paper_values(instance)
+    loaded = (None, None) if created else getattr(instance, '_principal_values', (None, None))
+    instance._principal_values = values
+    if values != loaded:
+        forget_principals([loaded[0], values[0]])
+
+
+@receiver(post_delete, sender=Paper)
+def principal_editor_deleted(sender, instance, **kwargs):
+    forget_principals([instance.editor_id])
+
+
+@receiver(m2m_changed, sender=Paper.reviewers.through)
+def principal_reviewers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+        The papers a user reviews are part of their cached principal, forget it when they're added or removed.
+    """
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            forget_principals([instance.pk])
+    elif action == 'pre_clear':
+        # pk_set is None when all the reviewers are removed, remember them.
+        instance._cleared_reviewers = list(sender.objects.filter(paper=instance).values_list('user_id', flat=True))
+    elif action == 'post_clear':
+        forget_principals(getattr(instance, '_cleared_reviewers', ()))
+    elif action in ('post_add', 'post_remove'):
+        forget_principals(pk_set or ())
+
+
+@receiver(post_init, sender=Paper)
+def paper_authors_loaded(sender, instance, **kwargs):
+    instance._loaded_authors, = loaded_values(instance, ('authors',))
+
+
+@receiver(post_save, sender=Paper)
+def paper_authors_saved(sender, instance, created, raw, **kwargs):
+    """
+        Keep the Author rows of a paper in sync with its authors text.
+    """
+    if raw or (not created and instance.authors == getattr(instance, '_loaded_authors', None)):
+        return
+    if not created:
+        Author.objects.filter(paper=instance).delete()
+    Author.objects.bulk_create(Author.rows_for(instance.pk, instance.authors))
+    instance._loaded_authors = instance.authors
+
+
+@receiver(post_migrate)
+def paper_search_index_installed(sender, using, **kwargs):
+    """
+        SQLite drops the search triggers whenever a migration rebuilds the paper table, put them back.
+    """
+    if sender.name == 'journal':
+        search.install(connections[using])
@@ -0,0 +1,81 @@
+"""
+    Bulk changes to the reviewers of the papers.
+
+    The reviewer rows are inserted and deleted in bulk, which doesn't send m2m_changed, so the changed papers get their
+    updated timestamp bumped and the changed users get their cached principals forgotten here instead.
+"""
+from collections import OrderedDict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from account.principal import forget_principals
+from journal.models import Paper
+
+# Bounds the size of the IN lists of a batch.
+MAX_REVIEWER_CHANGES = 500
+
+
+def error(index, paper, details, user=None):
+    result = OrderedDict([('operation', index), ('paper', paper)])
+    if user is not None:
+        result['user'] = user
+    result['details'] = details
+    return result
+
+
+@transaction.atomic
+def change_reviewers(operations):
+    """
+        Applies operations, a list of (paper pk, user pks to add, user pks to remove) tuples, in order and in one
+        transaction. An operation on a missing paper and the changes of missing users are skipped and reported, the
+        others are applied.
+        :return: A tuple of the changes, a list of {paper, added, removed} dicts in the order of the papers in
+        operations, and of the errors, a list of {operation, paper, user, details} dicts.
+    """
+    paper_pks = {paper for paper, _, _ in operations}
+    user_pks = {user for _, add, remove in operations for user in list(add) + list(remove)}
+    # Concurrent batches on the same papers are serialized, on the databases that support it.
+    papers = set(Paper.objects.select_for_update().filter(pk__in=paper_pks).order_by().values_list('pk', flat=True))
+    users = set(User.objects.filter(pk__in=user_pks).values_list('pk', flat=True))
+
+    through = Paper.reviewers.through
+    rows, reviewers = {}, {paper: set() for paper in papers}
+    for row_pk, paper, user in through.objects.filter(paper_id__in=papers).values_list('pk', 'paper_id', 'user_id'):
+        rows[paper, user] = row_pk
+        reviewers[paper].add(user)
+    current = {paper: set(users) for paper, users in reviewers.items()}
+
+    errors, order = [], OrderedDict()
+    for index, (paper, add, remove) in enumerate(operations):
+        if paper not in papers:
+            errors.append(error(index, paper, "Paper not found!"))
+            continue
+        order[paper] = True
+        both = set(add) & set(remove)
+        for user in list(add) + list(remove):
+            if user in both:
+                errors.append(error(index, paper, "User is both added and removed!", user))
+            elif user not in users:
+                errors.append(error(index, paper, "User not found!", user))
+        current[paper] |= (set(add) - both) & users
+        current[paper] -= (set(remove) - both) & users
+
+    changes, added_rows, removed_rows, changed_users = [], [], [], set()
+    for paper in order:
+        added, removed = sorted(current[paper] - reviewers[paper]), sorted(reviewers[paper] - current[paper])
+        added_rows += [through(paper_id=paper, user_id=user) for user in added]
+        removed_rows += [rows[paper, user] for user in removed]
+        changed_users.update(added, removed)
+        changes.append(OrderedDict([('paper', paper), ('added', added), ('removed', removed)]))
+
+    if added_rows:
+        through.objects.bulk_create(added_rows)
+    if removed_rows:
+        through.objects.filter(pk__in=removed_rows).delete()
+    changed_papers = [change['paper'] for change in changes if change['added'] or change['removed']]
+    if changed_papers:
+        Paper.objects.filter(pk__in=changed_papers).update(updated=timezone.now())
+    forget_principals(changed_users)
+    return changes, errors
@@ -0,0 +1,135 @@
+"""
+    Full text search over the title, description and authors of the papers.
+
+    The inverted index lives in the database and is kept in sync by triggers, so it also covers bulk inserts and
+    queryset updates that don't send model signals:
+        - SQLite: an external content FTS5 table, journal_paper_fts, ranked with bm25().
+        - PostgreSQL: a weighted tsvector column, journal_paper.search_vector, with a GIN index, ranked with
+          ts_rank_cd().
+    Other backends fall back to icontains lookups.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Relative weights of title, description and authors.
+SQLITE_WEIGHTS = (10.0, 1.0, 5.0)
+
+SQLITE_INSTALL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS journal_paper_fts USING fts5(
+        title, description, authors, content='journal_paper', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 1')""",
+    """CREATE TRIGGER IF NOT EXISTS journal_paper_fts_insert AFTER INSERT ON journal_paper BEGIN
+        INSERT INTO journal_paper_fts(rowid, title, description, authors)
+        VALUES (new.id, new.title, new.description, new.authors);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS journal_paper_fts_delete AFTER DELETE ON journal_paper BEGIN
+        INSERT INTO journal_paper_fts(journal_paper_fts, rowid, title, description, authors)
+        VALUES ('delete', old.id, old.title, old.description, old.authors);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS journal_paper_fts_update AFTER UPDATE OF title, description, authors
+    ON journal_paper BEGIN
+        INSERT INTO journal_paper_fts(journal_paper_fts, rowid, title, description, authors)
+        VALUES ('delete', old.id, old.title, old.description, old.authors);
+        INSERT INTO journal_paper_fts(rowid, title, description, authors)
+        VALUES (new.id, new.title, new.description, new.authors);
+    END""",
+)
+SQLITE_REBUILD = "INSERT INTO journal_paper_fts(journal_paper_fts) VALUES ('rebuild')"
+SQLITE_UNINSTALL = (
+    "DROP TRIGGER IF EXISTS journal_paper_fts_insert",
+    "DROP TRIGGER IF EXISTS journal_paper_fts_delete",
+    "DROP TRIGGER IF EXISTS journal_paper_fts_update",
+    "DROP TABLE IF EXISTS journal_paper_fts",
+)
+
+POSTGRESQL_VECTOR = """
+    setweight(to_tsvector('english', coalesce({0}.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({0}.authors, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({0}.description, '')), 'C')"""
+POSTGRESQL_INSTALL = (
+    "ALTER TABLE journal_paper ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS journal_paper_search_vector ON journal_paper USING gin(search_vector)",
+    """CREATE OR REPLACE FUNCTION journal_paper_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""".format(POSTGRESQL_VECTOR.format('NEW')),
+    "DROP TRIGGER IF EXISTS journal_paper_search_vector ON journal_paper",
+    """CREATE TRIGGER journal_paper_search_vector BEFORE INSERT OR UPDATE OF title, description, authors
+    ON journal_paper FOR EACH ROW EXECUTE PROCEDURE journal_paper_search_vector()""",
+)
+POSTGRESQL_REBUILD = "UPDATE journal_paper SET search_vector = {}".format(POSTGRESQL_VECTOR.format('journal_paper'))
+POSTGRESQL_UNINSTALL = (
+    "DROP TRIGGER IF EXISTS journal_paper_search_vector ON journal_paper",
+    "DROP FUNCTION IF EXISTS journal_paper_search_vector()",
+    "ALTER TABLE journal_paper DROP COLUMN IF EXISTS search_vector",
+)
+
+
+def install(connection):
+    """
+        Creates the index and its triggers if they're missing, then fills the index if the triggers were missing.
+        SQLite drops the triggers when a migration rebuilds the journal_paper table, so this runs after every migrate.
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN "
+                           "('journal_paper_fts_insert', 'journal_paper_fts_delete', 'journal_paper_fts_update')")
+            installed = cursor.fetchone()[0] == 3
+            if not installed:
+                for statement in SQLITE_INSTALL:
+                    cursor.execute(statement)
+                cursor.execute(SQLITE_REBUILD)
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_trigger WHERE tgname = 'journal_paper_search_vector'")
+            installed = cursor.fetchone()[0] == 1
+            if not installed:
+                for statement in POSTGRESQL_INSTALL:
+                    cursor.execute(statement)
+                cursor.execute(POSTGRESQL_REBUILD)
+
+
+def uninstall(connection):
+    statements = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRESQL_UNINSTALL}.get(connection.vendor, ())
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def search_papers(queryset, query):
+    """
+        Filters queryset, a Paper queryset, down to the papers matching every word of query, best match first.
+        A paper's rank is available in its search_rank attribute.
+    """
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        # Every token is quoted so FTS5 operators in the query are plain words, the last one matches prefixes.
+        match = ' '.join('"{}"'.format(token) for token in tokens) + '*'
+        return queryset.extra(
+            tables=['journal_paper_fts'],
+            where=['journal_paper_fts.rowid = journal_paper.id', 'journal_paper_fts MATCH %s'], params=[match],
+            # bm25() is lower for better matches.
+            select={'search_rank': 'bm25(journal_paper_fts, {}, {}, {})'.format(*SQLITE_WEIGHTS)},
+            order_by=['search_rank', '-id'])
+    elif vendor == 'postgresql':
+        tsquery = "to_tsquery('english', %s)"
+        match = ' & '.join(tokens) + ':*'
+        return queryset.extra(
+            where=['journal_paper.search_vector @@ ' + tsquery], params=[match],
+            select={'search_rank': 'ts_rank_cd(journal_paper.search_vector, {})'.format(tsquery)},
+            select_params=[match], order_by=['-search_rank', '-id'])
+
+    condition = Q()
+    for token in tokens:
+        condition &= Q(title__icontains=token) | Q(description__icontains=token) | Q(authors__icontains=token)
+    return queryset.filter(condition).order_by('-created', '-id')
@@ -0,0 +1,104 @@
+"""
+    Content addressed storage for the files uploaded with papers and reviews.
+"""
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+        Stores every file under the SHA-256 of its content, in a two level fanout: <prefix>/ab/cd/abcd...<ext>.
+        The name given by upload_to is only used for its extension. Identical files are stored once and a
+        StoredFile row counts the references to each blob, deleting a file removes the blob with its last reference.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, prefix='blobs', **kwargs):
+        super(ContentAddressedStorage, self).__init__(**kwargs)
+        self.prefix = prefix
+
+    def blob_name(self, digest, extension):
+        return '/'.join((self.prefix, digest[:2], digest[2:4], digest + extension.lower()))
+
+    def content_hash(self, content):
+        """
+            Returns the SHA-256 of content. FileValidator already computed it for validated uploads.
+        """
+        digest = getattr(content, 'sha256', None)
+        if digest:
+            return digest
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks(self.chunk_size):
+            digest.update(chunk)
+        content.seek(0)
+        return digest.hexdigest()
+
+    def get_available_name(self, name, max_length=None):
+        # The name only matters for its extension, the stored name is derived from the content.
+        return name
+
+    def _save(self, name, content):
+        from journal.models import StoredFile
+
+        digest = self.content_hash(content)
+        with transaction.atomic():
+            blob, created = StoredFile.objects.select_for_update().get_or_create(
+                sha256=digest, defaults={'name': self.blob_name(digest, os.path.splitext(name)[1]),
+                                         'size': content.size})
+            if created or not self.exists(blob.name):
+                self._write(blob.name, content)
+            StoredFile.objects.filter(pk=digest).update(references=F('references') + 1)
+        return blob.name
+
+    def _write(self, name, content):
+        """
+            Writes content to a temporary file next to name and renames it, readers never see a partial blob.
+        """
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+            if self.directory_permissions_mode is not None:
+                os.chmod(directory, self.directory_permissions_mode)
+
+        temporary = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+        try:
+            with open(temporary, 'wb') as blob:
+                for chunk in content.chunks(self.chunk_size):
+                    blob.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def delete(self, name):
+        """
+            Drops a reference to the blob, the blob itself is removed once the last reference is gone.
+        """
+        from journal.models import StoredFile
+
+        with transaction.atomic():
+            released = StoredFile.objects.filter(name=name, references__gt=1).update(references=F('references') - 1)
+            if not released:
+                StoredFile.objects.filter(name=name).delete()
+                transaction.on_commit(lambda: self._remove_unreferenced(name))
+
+    def _remove_unreferenced(self, name):
+        from journal.models import StoredFile
+
+        # The same content may have been uploaded again since the reference was dropped.
+        if not StoredFile.objects.filter(name=name).exists():
+            super(ContentAddressedStorage, self).delete(name)
+
+
+paper_storage = ContentAddressedStorage()
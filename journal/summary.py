@@ -0,0 +1,67 @@
+"""
+    Summaries of the reviews of papers, so editors can weigh a paper without loading every review.
+
+    The summaries of any number of papers are computed in one grouped query over the papers left joined with their
+    reviews, the comments and files of the reviews are never read. The counts and the mean score are over the reviews
+    of the reviewers, the editor's review is the verdict.
+"""
+from collections import OrderedDict
+
+from django.db.models import Avg, Case, CharField, Count, IntegerField, Max, Value, When
+
+from journal.models import Review
+
+# The recommendations from best to worst, with their scores.
+RECOMMENDATION_SCORES = OrderedDict(sorted(((value, int(value)) for value, _ in Review.RECOMMENDATION_CHOICES),
+                                           key=lambda item: -item[1]))
+# Bounds the size of the IN list of a batch.
+MAX_SUMMARY_PAPERS = 100
+
+
+def summary_annotations():
+    """
+        The aggregates of a summary, by their alias. The aliases of the counts are positional, the choice values
+        aren't valid aliases.
+    """
+    annotations = OrderedDict()
+    annotations['reviews_count'] = Count(Case(When(reviews__editor_review=False, then=1)))
+    for index, value in enumerate(RECOMMENDATION_SCORES):
+        annotations['recommendation_{}'.format(index)] = Count(Case(
+            When(reviews__editor_review=False, reviews__recommendation=value, then=1)))
+    for index, (value, _) in enumerate(Review.APPROPRIATE_CHOICES):
+        annotations['appropriate_{}'.format(index)] = Count(Case(
+            When(reviews__editor_review=False, reviews__appropriate=value, then=1)))
+    annotations['mean_score'] = Avg(Case(
+        *[When(reviews__editor_review=False, reviews__recommendation=value, then=Value(score))
+          for value, score in RECOMMENDATION_SCORES.items()], output_field=IntegerField()))
+    annotations['verdict_recommendation'] = Max(Case(
+        When(reviews__editor_review=True, then='reviews__recommendation'), output_field=CharField()))
+    annotations['verdict_appropriate'] = Max(Case(
+        When(reviews__editor_review=True, then='reviews__appropriate'), output_field=CharField()))
+    return annotations
+
+
+def review_summaries(papers):
+    """
+        Returns the summaries of the reviews of the papers in a Paper queryset, ordered by pk:
+            [{"paper": 1, "editor": 2, "reviews": 3,
+              "recommendations": {"+2": 1, "+1": 0, "0": 2, "-1": 0, "-2": 0},
+              "appropriate": {"appropriate": 3, "not_appropriate": 0},
+              "mean_score": 0.33, "editor_verdict": {"recommendation": "+1", "appropriate": "appropriate"}}, ...]
+        The mean score is None for a paper without reviews, the verdict is None until the editor reviews it.
+    """
+    rows = papers.order_by('pk').values('pk', 'editor_id').annotate(**summary_annotations())
+    summaries = []
+    for row in rows:
+        summary = OrderedDict([('paper', row['pk']), ('editor', row['editor_id']), ('reviews', row['reviews_count'])])
+        summary['recommendations'] = OrderedDict(
+            (value, row['recommendation_{}'.format(index)]) for index, value in enumerate(RECOMMENDATION_SCORES))
+        summary['appropriate'] = OrderedDict(
+            (value, row['appropriate_{}'.format(index)]) for index, (value, _) in enumerate(Review.APPROPRIATE_CHOICES))
+        summary['mean_score'] = row['mean_score']
+        summary['editor_verdict'] = None
+        if row['verdict_recommendation'] is not None:
+            summary['editor_verdict'] = OrderedDict([('recommendation', row['verdict_recommendation']),
+                                                     ('appropriate', row['verdict_appropriate'])])
+        summaries.append(summary)
+    return summaries
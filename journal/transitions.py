@@ -0,0 +1,104 @@
+"""
+    The status workflow of the papers: the events that move a paper from one status to another, from a table.
+
+    A transition is one UPDATE of the status, the updated timestamp and the other changed columns of the paper,
+    conditional on the status and editor it was read with, so concurrent editor changes and reviews can't overwrite
+    each other and the rest of the paper isn't written. When the paper changed since it was read, its status and editor
+    are read again and the transition is retried from them, at most MAX_TRANSITION_ATTEMPTS times. Queryset updates
+    don't send the signals, the paper counters and the cached principals of the editors are kept up to date here, in
+    the same transaction.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from account.principal import forget_principals
+from journal.models import Paper, PaperCounter, Review, principal_paper_values
+
+# A paper that keeps changing under a transition, or a database that keeps reading an outdated snapshot of it, fails it
+# after these attempts.
+MAX_TRANSITION_ATTEMPTS = 5
+
+PROCESSING, UNDER_REVIEW, PRELIMINARY_REJECT, ACCEPTED = [choice[0] for choice in Paper.STATUS_CHOICES]
+
+# event -> {status the event applies to: status it moves the paper to}, it leaves the other statuses alone.
+TRANSITIONS = {
+    'editor_assigned': {PROCESSING: UNDER_REVIEW},
+    'editor_removed': {UNDER_REVIEW: PROCESSING},
+    # The editor may change their mind by updating their review.
+    'editor_accepted': {UNDER_REVIEW: ACCEPTED, PRELIMINARY_REJECT: ACCEPTED},
+    'editor_rejected': {UNDER_REVIEW: PRELIMINARY_REJECT, ACCEPTED: PRELIMINARY_REJECT},
+}
+
+
+class TransitionConflict(Exception):
+    """
+        The paper kept changing, the transition wasn't applied.
+    """
+
+
+def current_state(paper_pk):
+    """
+        Returns the status and editor pk of the paper, None if it doesn't exist.
+    """
+    return Paper.objects.filter(pk=paper_pk).values_list('status', 'editor_id').first()
+
+
+# Like Model.save(), a failed transition rolls back the transaction it's part of instead of a savepoint.
+@transaction.atomic(savepoint=False)
+def transition(paper, event, **changes):
+    """
+        Moves paper along event if its status allows it and writes changes, a dict of field names to values, in one
+        conditional UPDATE. paper is updated in place.
+        :return: Whether the status of the paper changed.
+        :raise TransitionConflict: After MAX_TRANSITION_ATTEMPTS conditional updates that didn't match.
+    """
+    moves = TRANSITIONS[event]
+    status, editor_id = paper.status, paper.editor_id
+    now = timezone.now()
+    for _ in range(MAX_TRANSITION_ATTEMPTS):
+        new_status = moves.get(status, status)
+        if (new_status != status or changes) and Paper.objects.filter(pk=paper.pk, status=status, editor_id=editor_id)\
+                .update(status=new_status, updated=now, **changes):
+            break
+        state = current_state(paper.pk)
+        if state is None or (state == (status, editor_id) and new_status == status and not changes):
+            # The paper is gone or the event doesn't apply to its current status.
+            return False
+        status, editor_id = state
+    else:
+        raise TransitionConflict("Paper {} kept changing, {} failed after {} attempts.".format(
+            paper.pk, event, MAX_TRANSITION_ATTEMPTS))
+
+    old_counters = Paper(status=status, editor_id=editor_id).counter_names()
+    paper.status, paper.editor_id, paper.updated = new_status, editor_id, now
+    for name, value in changes.items():
+        setattr(paper, name, value)
+    # What the signals remember of a loaded paper is what was just written, for its next save().
+    paper._loaded_counters = paper.counter_names()
+    paper._principal_values = principal_paper_values(paper)
+    PaperCounter.move(old_counters, paper._loaded_counters)
+    if (editor_id, status) != paper._principal_values:
+        forget_principals([editor_id, paper.editor_id])
+    return new_status != status
+
+
+def change_editor(paper, editor):
+    """
+        Sets the editor of paper, None removes it, and moves the paper between processing and under review.
+        :return: Whether the status of the paper changed.
+    """
+    return transition(paper, 'editor_assigned' if editor is not None else 'editor_removed', editor=editor)
+
+
+def review_saved(review):
+    """
+        The verdict of an editor review sets the status of its paper: accepted if the paper is appropriate and can be
+        published unaltered, preliminary reject otherwise. The other reviews don't change the status.
+        :return: Whether the status of the paper changed.
+    """
+    if not review.editor_review:
+        return False
+    if review.appropriate == Review.APPROPRIATE_CHOICES[0][0] \
+            and review.recommendation == Review.RECOMMENDATION_CHOICES[1][0]:
+        return transition(review.paper, 'editor_accepted')
+    return transition(review.paper, 'editor_rejected')
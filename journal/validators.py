@@ -1,3 +1,5 @@
+import hashlib
+
 from django.utils.deconstruct import deconstructible
 from django.template.defaultfilters import filesizeformat
 from django.core.exceptions import ValidationError
@@ -19,6 +21,15 @@ def validate_authors(*args):
 
 @deconstructible
 class FileValidator(object):
+    """
+        Validates the size and the content type of a file. The file is read once, in chunks, and only its header
+        is kept in memory for content sniffing, so memory use doesn't depend on the file size. The SHA-256 of the
+        content is computed in the same pass and stored in the sha256 attribute of the validated file.
+    """
+    # libmagic doesn't look past the first megabyte of a file by default, a bigger header wouldn't change the result.
+    header_size = 1024 * 1024
+    chunk_size = 64 * 1024
+
     error_messages = {
         'max_size': "Ensure this file size is not greater than %(max_size)s. Your file size is %(size)s.",
         'min_size': "Ensure this file size is not less than %(min_size)s. Your file size is %(size)s.",
@@ -40,17 +51,35 @@ class FileValidator(object):
 
         if self.min_size is not None and data.size < self.min_size:
             params = {
-                'min_size': filesizeformat(self.mix_size),
+                'min_size': filesizeformat(self.min_size),
                 'size': filesizeformat(data.size)
             }
             raise ValidationError(self.error_messages['min_size'], 'min_size', params)
 
+        header, data.sha256 = self.scan(data)
+
         if self.content_types:
-            content_type = magic.from_buffer(data.read(), mime=True)
+            content_type = magic.from_buffer(header, mime=True)
             params = {'content_type': content_type}
 
             if content_type not in self.content_types:
                 raise ValidationError(self.error_messages['content_type'], 'content_type', params)
 
+    def scan(self, data):
+        """
+            Reads data chunk by chunk and rewinds it.
+            :return: A tuple containing the first header_size bytes of data and the hex SHA-256 of data.
+        """
+        header = bytearray()
+        digest = hashlib.sha256()
+        try:
+            for chunk in data.chunks(self.chunk_size):
+                if len(header) < self.header_size:
+                    header += chunk[:self.header_size - len(header)]
+                digest.update(chunk)
+        finally:
+            data.seek(0)
+        return bytes(header), digest.hexdigest()
+
     def __eq__(self, other):
         return isinstance(other, FileValidator)